@@ -90,33 +90,67 @@ ZONE_DIMENSIONS = {
     3703: {'map': 530, 'left': -1725.0, 'right': -2035.0, 'top': 5585.0, 'bottom': 5275.0},     # Shattrath City
 }
 
+# Буфер (ярды) вокруг прямоугольника зоны, чтобы не терять точки на границах, но не цеплять соседей
+ZONE_BOUNDS_PADDING = 100
+
+# Континенты (по географии, а не по MapID): стартовые зоны Blood Elf/Draenei лежат на карте 530, но в Азероте
+CONTINENT_BY_MAP = {0: 'Eastern Kingdoms', 1: 'Kalimdor', 530: 'Outland'}
+AZEROTH_ZONES_ON_MAP_530 = {
+    3430: 'Eastern Kingdoms', 3433: 'Eastern Kingdoms', 3487: 'Eastern Kingdoms', 4080: 'Eastern Kingdoms',
+    3524: 'Kalimdor', 3525: 'Kalimdor', 3557: 'Kalimdor',
+}
+
 def get_zone_dimensions(zone_id: int):
     return ZONE_DIMENSIONS.get(zone_id)
 
-def is_coords_in_bounds(zone_id: int, x: float, y: float) -> bool:
+def get_zone_bounds(zone_id: int, padding: float = ZONE_BOUNDS_PADDING):
     """
-    Проверяет, попадают ли мировые координаты в границы указанной зоны.
-    Если зоны нет в базе, возвращаем True (не можем проверить, считаем верным).
+    Возвращает прямоугольник зоны в мировых координатах (min_x, max_x, min_y, max_y) с буфером.
+    Если зоны нет в базе, возвращает None.
     """
     dims = ZONE_DIMENSIONS.get(zone_id)
     if not dims:
-        return True
+        return None
 
     # WoW X (Vertical): Top > Bottom
     # WoW Y (Horizontal): Left > Right
-    
-    # Проверка X (между Bottom и Top)
-    # Добавляем небольшой буфер (100), чтобы не терять точки на границах, но не цеплять соседей
-    min_x = min(dims['bottom'], dims['top']) - 100 
-    max_x = max(dims['bottom'], dims['top']) + 100
-    valid_x = min_x <= x <= max_x
-
-    # Проверка Y (между Right и Left)
-    min_y = min(dims['right'], dims['left']) - 100
-    max_y = max(dims['right'], dims['left']) + 100
-    valid_y = min_y <= y <= max_y
-
-    return valid_x and valid_y
+    min_x = min(dims['bottom'], dims['top']) - padding
+    max_x = max(dims['bottom'], dims['top']) + padding
+    min_y = min(dims['right'], dims['left']) - padding
+    max_y = max(dims['right'], dims['left']) + padding
+    return min_x, max_x, min_y, max_y
+
+def get_zone_continent(zone_id: int):
+    """Континент зоны ('Eastern Kingdoms', 'Kalimdor', 'Outland') или None, если зоны нет в базе."""
+    if zone_id in AZEROTH_ZONES_ON_MAP_530:
+        return AZEROTH_ZONES_ON_MAP_530[zone_id]
+    dims = ZONE_DIMENSIONS.get(zone_id)
+    return CONTINENT_BY_MAP.get(dims['map']) if dims else None
+
+def get_continent_zone_ids(continent: str) -> list:
+    """Все зоны из ZONE_DIMENSIONS, лежащие на континенте (имя без учета регистра)."""
+    name = continent.lower().strip()
+    return sorted(z for z in ZONE_DIMENSIONS if (get_zone_continent(z) or '').lower() == name)
+
+def get_zone_center(zone_id: int):
+    """Центр прямоугольника зоны: (map_id, x, y) или None, если зоны нет в базе."""
+    bounds = get_zone_bounds(zone_id, padding=0)
+    if not bounds:
+        return None
+    min_x, max_x, min_y, max_y = bounds
+    return ZONE_DIMENSIONS[zone_id]['map'], (min_x + max_x) / 2, (min_y + max_y) / 2
+
+def is_coords_in_bounds(zone_id: int, x: float, y: float) -> bool:
+    """
+    Проверяет, попадают ли мировые координаты в границы указанной зоны.
+    Если зоны нет в базе, возвращаем True (не можем проверить, считаем верным).
+    """
+    bounds = get_zone_bounds(zone_id)
+    if not bounds:
+        return True
+
+    min_x, max_x, min_y, max_y = bounds
+    return min_x <= x <= max_x and min_y <= y <= max_y
 
 def questie_to_world_coords(zone_id: int, q_x: float, q_y: float):
     """
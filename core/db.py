@@ -1,37 +1,134 @@
 # core/db.py
-import mysql.connector
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List
 import yaml
 from core.logger import get_logger
+from core.query_stats import QueryStats, DEFAULT_SLOW_QUERY_MS
+from core.db_fixtures import get_fixture_store
+from core.db_backends import create_backend, ReplayBackend
 
 logger = get_logger(__name__)
 
+DEFAULT_CONFIG_PATH = os.path.join('config', 'db.yaml')
+
+# Режимы работы с БД:
+#   live   - обычная работа с бэкендом (mysql / sqlite)
+#   record - работа с бэкендом + запись всех (запрос, параметры) -> строки в фикстуру
+#   replay - без сервера, ответы берутся из фикстуры
+DB_MODES = ('live', 'record', 'replay')
+
+# Переопределения на весь процесс (инструменты/CLI), приоритетнее config/db.yaml
+_MODE_OVERRIDE = {'mode': None, 'fixture_path': None}
+_CONFIG_OVERRIDE: Dict[str, Any] = {'path': None, 'backend': None}
+
+def configure_fixtures(mode: Optional[str], fixture_path: Optional[str] = None):
+    """Задает режим record/replay для всех последующих Database() в процессе."""
+    if mode is not None and mode not in DB_MODES:
+        raise ValueError(f"Неизвестный режим БД '{mode}', ожидается один из {DB_MODES}")
+    _MODE_OVERRIDE['mode'] = mode
+    _MODE_OVERRIDE['fixture_path'] = fixture_path
+
+def configure_database(config_path: Optional[str] = None, backend: Optional[str] = None):
+    """Задает файл конфигурации и/или бэкенд для всех последующих Database() в процессе."""
+    _CONFIG_OVERRIDE['path'] = config_path
+    _CONFIG_OVERRIDE['backend'] = backend
+
+def load_db_config(config_path: Optional[str] = None) -> Dict[str, Any]:
+    path = config_path or _CONFIG_OVERRIDE['path'] or os.environ.get('QUESTER_DB_CONFIG') or DEFAULT_CONFIG_PATH
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)['database']
+
 class Database:
-    def __init__(self):
-        with open('config/db.yaml', 'r') as f:
-            config = yaml.safe_load(f)['database']
-        self.conn = mysql.connector.connect(
-            host=config['host'],
-            user=config['user'],
-            password=config['password'],
-            database=config['database'],
-            port=config.get('port', 3306)
-        )
-        self.cursor = self.conn.cursor(dictionary=True)
-        logger.info("Database connection established.")
+    def __init__(self, stats: Optional[QueryStats] = None, mode: Optional[str] = None, fixture_path: Optional[str] = None,
+                 config: Optional[Dict[str, Any]] = None, config_path: Optional[str] = None, backend: Optional[str] = None):
+        if config is None:
+            config = load_db_config(config_path)
+        fixtures_cfg = config.get('fixtures') or {}
+
+        # Приоритет: аргументы -> configure_*()/переменные окружения -> config/db.yaml
+        self.mode = (mode or _MODE_OVERRIDE['mode'] or os.environ.get('QUESTER_DB_MODE')
+                     or fixtures_cfg.get('mode') or 'live')
+        if self.mode not in DB_MODES:
+            raise ValueError(f"Неизвестный режим БД '{self.mode}', ожидается один из {DB_MODES}")
+        self.fixture_path = (fixture_path or _MODE_OVERRIDE['fixture_path'] or os.environ.get('QUESTER_DB_FIXTURE')
+                             or fixtures_cfg.get('path') or os.path.join('fixtures', 'last_run.json.gz'))
+        backend_name = (backend or _CONFIG_OVERRIDE['backend'] or os.environ.get('QUESTER_DB_BACKEND')
+                        or config.get('backend') or 'mysql')
+
+        self.config = config
+        self.backend_name = backend_name
+
+        # Статистика запросов по формам (счетчики, латентность, вызывающие функции)
+        self.stats = stats if stats is not None else QueryStats(config.get('slow_query_ms', DEFAULT_SLOW_QUERY_MS))
+
+        if self.mode == 'replay':
+            self.backend = ReplayBackend(self.fixture_path)
+        else:
+            self.backend = create_backend(backend_name, config)
+        self.fixtures = get_fixture_store(self.fixture_path, for_replay=False) if self.mode == 'record' else None
+        if self.fixtures is not None:
+            self.fixtures.world = self.fingerprint()
+
+        logger.info(f"Database connection established ({self.backend.describe()}"
+                    + (f", recording to {self.fixture_path})." if self.mode == 'record' else ")."))
 
     def execute(self, query, params=None):
+        start = time.perf_counter()
         try:
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
-        except mysql.connector.Error as err:
+            rows = self.backend.execute(query, params)
+        except self.backend.errors as err:
             logger.error(f"Database error: {err}")
             raise
+        self.stats.record(query, params, time.perf_counter() - start, len(rows))
+        if self.fixtures is not None:
+            self.fixtures.record(query, params, rows)
+        return rows
+
+    def fingerprint(self) -> str:
+        """
+        Отпечаток данных мира: база/файл и его версия (размер и время изменения; для MySQL — CHECKSUM TABLE таблиц мира,
+        один раз на процесс: после правки мира в работающем процессе — core.db_backends.clear_world_fingerprints).
+        """
+        return self.backend.fingerprint(self.execute)
+
+    def clone(self) -> 'Database':
+        """Новое соединение с теми же настройками, режимом и общей статистикой (для рабочих потоков)."""
+        return Database(stats=self.stats, mode=self.mode, fixture_path=self.fixture_path,
+                        config=self.config, backend=self.backend_name)
 
     def close(self):
-        self.cursor.close()
-        self.conn.close()
+        if self.fixtures is not None:
+            self.fixtures.save()
+        self.backend.close()
         logger.info("Database connection closed.")
 
+class DatabasePool:
+    """
+    Соединения для пула потоков: каждый поток получает свое (Database.clone основного),
+    создается при первом обращении и живет до close(). Соединения MySQL/SQLite между потоками не делятся.
+    """
+    def __init__(self, db: Database):
+        self.db = db
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[Database] = []
+
+    def get(self) -> Database:
+        conn = getattr(self._local, 'db', None)
+        if conn is None:
+            conn = self._local.db = self.db.clone()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
 # Context manager usage: with Database() as db: ...
 def with_db(func):
     def wrapper(*args, **kwargs):
@@ -40,4 +137,4 @@ def with_db(func):
             return func(db, *args, **kwargs)
         finally:
             db.close()
-    return wrapper
\ No newline at end of file
+    return wrapper
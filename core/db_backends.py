@@ -0,0 +1,158 @@
+# core/db_backends.py
+import hashlib
+import os
+import re
+import sqlite3
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Type, Callable
+from core.db_fixtures import get_fixture_store, FixtureMissError
+
+# Репозитории пишут SQL в стиле MySQL: плейсхолдер %s и экранированный %% внутри литералов
+_FORMAT_TOKEN_RE = re.compile(r'%([%s])')
+
+@lru_cache(maxsize=1024)
+def format_to_qmark(query: str) -> str:
+    """Переводит плейсхолдеры %s -> ? и %% -> % (для драйверов с paramstyle qmark)."""
+    return _FORMAT_TOKEN_RE.sub(lambda m: '%' if m.group(1) == '%' else '?', query)
+
+# execute бэкенду для служебных запросов — Database.execute, чтобы они попадали в статистику и лог медленных
+Execute = Callable[..., List[Dict[str, Any]]]
+
+# Отпечатки MySQL: CHECKSUM TABLE читает таблицы целиком, поэтому считается один раз на процесс и базу
+_WORLD_FINGERPRINTS: Dict[str, str] = {}
+
+def clear_world_fingerprints():
+    """Сброс отпечатков — после правки таблиц мира в работающем процессе (UI, долгий батч)."""
+    _WORLD_FINGERPRINTS.clear()
+
+class DatabaseBackend:
+    """Интерфейс драйвера БД: выполнить запрос и вернуть список dict-строк."""
+    name = 'base'
+    # Исключения драйвера, которые Database логирует перед пробросом
+    errors: Tuple[Type[BaseException], ...] = ()
+
+    def execute(self, query: str, params=None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def describe(self) -> str:
+        return self.name
+
+    def fingerprint(self, execute: Execute) -> str:
+        """Меняется при изменении данных мира (для ключей кэшей результатов генерации)."""
+        return self.describe()
+
+# Таблицы мира, из которых генерация берет данные (ключи кэша сессий зависят от их содержимого)
+WORLD_TABLES = (
+    'quest_template', 'item_template',
+    'creature', 'creature_template', 'creature_questrelation', 'creature_involvedrelation', 'creature_loot_template',
+    'gameobject', 'gameobject_template', 'gameobject_questrelation', 'gameobject_involvedrelation', 'gameobject_loot_template',
+    'reference_loot_template',
+)
+
+def _file_fingerprint(label: str, path: str) -> str:
+    st = os.stat(path)
+    return f"{label}:{st.st_size}:{st.st_mtime_ns}"
+
+class MySQLBackend(DatabaseBackend):
+    name = 'mysql'
+
+    def __init__(self, config: Dict[str, Any]):
+        # Импорт здесь: для SQLite/реплея драйвер MySQL не нужен
+        import mysql.connector
+        self.errors = (mysql.connector.Error,)
+        self.database = config['database']
+        self.host, self.port = config['host'], config.get('port', 3306)
+        self.conn = mysql.connector.connect(
+            host=config['host'],
+            user=config['user'],
+            password=config['password'],
+            database=config['database'],
+            port=self.port
+        )
+        self.cursor = self.conn.cursor(dictionary=True)
+
+    def execute(self, query, params=None):
+        self.cursor.execute(query, params)
+        # DDL/DML (ALTER, INSERT...) не возвращают строк
+        return self.cursor.fetchall() if self.cursor.with_rows else []
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
+
+    def describe(self):
+        return f"mysql:{self.database}"
+
+    def fingerprint(self, execute):
+        # CHECKSUM TABLE читает данные целиком — только таблицы, которые читает генерация, и один раз на процесс.
+        # information_schema не годится: TABLE_ROWS — оценка InnoDB, UPDATE_TIME не переживает рестарт,
+        # и оба кэшируются (information_schema_stats_expiry)
+        key = f"{self.host}:{self.port}/{self.database}"
+        fingerprint = _WORLD_FINGERPRINTS.get(key)
+        if fingerprint is None:
+            rows = execute("CHECKSUM TABLE " + ", ".join(WORLD_TABLES))
+            digest = hashlib.sha256(repr(sorted((r['Table'], r['Checksum']) for r in rows)).encode('utf-8'))
+            fingerprint = _WORLD_FINGERPRINTS[key] = f"{self.describe()}:{digest.hexdigest()}"
+        return fingerprint
+
+class SQLiteBackend(DatabaseBackend):
+    name = 'sqlite'
+    errors = (sqlite3.Error,)
+
+    def __init__(self, config: Dict[str, Any]):
+        sqlite_cfg = config.get('sqlite') or {}
+        self.path = sqlite_cfg.get('path', os.path.join('data', 'world.sqlite'))
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"SQLite база не найдена: {self.path}")
+        # Соединение используется одним потоком за раз (DatabasePool), но закрывается из основного
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+    def execute(self, query, params=None):
+        cursor = self.conn.execute(format_to_qmark(query), tuple(params) if params is not None else ())
+        if cursor.description is None:
+            self.conn.commit()
+            return []
+        return [dict(row) for row in cursor.fetchall()]
+
+    def close(self):
+        self.conn.close()
+
+    def describe(self):
+        return f"sqlite:{self.path}"
+
+    def fingerprint(self, execute):
+        return _file_fingerprint(self.describe(), self.path)
+
+class ReplayBackend(DatabaseBackend):
+    """Ответы из записанной фикстуры, без сервера."""
+    name = 'replay'
+    errors = (FixtureMissError,)
+
+    def __init__(self, fixture_path: str):
+        self.fixture_path = fixture_path
+        self.fixtures = get_fixture_store(fixture_path, for_replay=True)
+
+    def execute(self, query, params=None):
+        return self.fixtures.lookup(query, params)
+
+    def describe(self):
+        return f"replay:{self.fixture_path}"
+
+    def fingerprint(self, execute):
+        # Данные реплея — данные записанной базы: дисковые кэши по ней (индекс лута) подходят и реплею
+        return self.fixtures.world or _file_fingerprint(self.describe(), self.fixture_path)
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+def create_backend(name: str, config: Dict[str, Any]) -> DatabaseBackend:
+    backend_cls = BACKENDS.get(name)
+    if backend_cls is None:
+        raise ValueError(f"Неизвестный бэкенд БД '{name}', доступны: {', '.join(BACKENDS)}")
+    return backend_cls(config)
@@ -0,0 +1,118 @@
+# core/db_fixtures.py
+import base64
+import datetime
+import gzip
+import json
+import os
+import re
+import threading
+from decimal import Decimal
+from typing import Dict, List, Any, Optional
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+FIXTURE_VERSION = 1
+
+_WS_RE = re.compile(r'\s+')
+
+class FixtureMissError(LookupError):
+    """Запрос не найден в записанной фикстуре (реплей не может ответить без сервера)."""
+
+def _encode_value(value):
+    # Типы, которые JSON теряет, сохраняем с тегом, чтобы реплей вернул ровно то же, что MySQL
+    if isinstance(value, Decimal):
+        return {'$dec': str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {'$bytes': base64.b64encode(bytes(value)).decode('ascii')}
+    if isinstance(value, datetime.datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'$date': value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {'$td': value.total_seconds()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict) and len(value) == 1:
+        tag, raw = next(iter(value.items()))
+        if tag == '$dec': return Decimal(raw)
+        if tag == '$bytes': return base64.b64decode(raw)
+        if tag == '$dt': return datetime.datetime.fromisoformat(raw)
+        if tag == '$date': return datetime.date.fromisoformat(raw)
+        if tag == '$td': return datetime.timedelta(seconds=raw)
+    return value
+
+def fixture_key(query: str, params) -> str:
+    """Ключ записи: запрос со схлопнутыми пробелами + параметры."""
+    q = _WS_RE.sub(' ', query).strip()
+    p = list(params) if params is not None else None
+    return json.dumps([q, p], ensure_ascii=False, default=str)
+
+class FixtureStore:
+    """Пары (запрос, параметры) -> строки результата, хранятся в сжатом JSON."""
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        # Отпечаток данных базы, на которой записана фикстура (Database.fingerprint); в старых фикстурах его нет
+        self.world: Optional[str] = None
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def load(self) -> 'FixtureStore':
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != FIXTURE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия фикстуры {data.get('version')} в {self.path}")
+        self._entries = data['entries']
+        self.world = data.get('world')
+        logger.info(f"Фикстура {self.path}: {len(self._entries)} запросов")
+        return self
+
+    def record(self, query: str, params, rows: List[Dict[str, Any]]):
+        key = fixture_key(query, params)
+        encoded = [{k: _encode_value(v) for k, v in row.items()} for row in rows]
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = encoded
+                self._dirty = True
+
+    def lookup(self, query: str, params) -> List[Dict[str, Any]]:
+        key = fixture_key(query, params)
+        encoded = self._entries.get(key)
+        if encoded is None:
+            raise FixtureMissError(f"Нет записи в фикстуре {self.path} для запроса: {key[:300]}")
+        # Каждый раз отдаем свежие dict: репозитории меняют строки на месте
+        return [{k: _decode_value(v) for k, v in row.items()} for row in encoded]
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({'version': FIXTURE_VERSION, 'world': self.world, 'entries': entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Фикстура сохранена: {self.path} ({len(entries)} запросов)")
+
+    def __len__(self):
+        return len(self._entries)
+
+# Одна фикстура на файл: все соединения процесса пишут/читают общее хранилище
+_STORES: Dict[str, FixtureStore] = {}
+_STORES_LOCK = threading.Lock()
+
+def get_fixture_store(path: str, for_replay: bool) -> FixtureStore:
+    key = os.path.abspath(path)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = FixtureStore(path)
+            # Запись всегда начинается с чистого листа (перезаписывает файл при сохранении)
+            if for_replay:
+                store.load()
+            _STORES[key] = store
+        return store
@@ -2,15 +2,15 @@
 import logging
 import os
 
-def get_logger(name):
+def get_logger(name, filename='quester_generator.log'):
     logger = logging.getLogger(name)
     if not logger.handlers:
         logger.setLevel(logging.INFO)
         os.makedirs('logs', exist_ok=True)
-        file_handler = logging.FileHandler('logs/quester_generator.log')
+        file_handler = logging.FileHandler(os.path.join('logs', filename))
         file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
         logger.addHandler(file_handler)
         logger.addHandler(console_handler)
-    return logger
\ No newline at end of file
+    return logger
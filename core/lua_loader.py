@@ -1,4 +1,5 @@
 # core/lua_loader.py
+import hashlib
 import re
 import os
 from core.logger import get_logger
@@ -8,9 +9,16 @@ logger = get_logger(__name__)
 # Кэш для хранения загруженных данных
 _QUESTIE_CACHE = {
     'npc': None,
-    'object': None
+    'object': None,
+    'quest_prereqs': None
 }
 
+# Файлы Questie, которые читает генератор (их хэш входит в ключи кэшей результатов)
+QUESTIE_FILES = ('tbcNpcDB.lua', 'tbcObjectDB.lua', 'tbcQuestDB.lua')
+
+# Хэши файлов: путь -> (размер, mtime, sha256); файл перечитывается только если изменился
+_QUESTIE_HASHES = {}
+
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 QUESTIE_PATH = os.path.join(project_root, 'resources', 'questie')
@@ -19,6 +27,10 @@ QUESTIE_PATH = os.path.join(project_root, 'resources', 'questie')
 NPC_SPAWNS_INDEX = 6  
 OBJ_SPAWNS_INDEX = 3  
 
+# Индексы в questData (questKeys - 1): preQuestGroup (нужны все) и preQuestSingle (нужен любой)
+QUEST_PRE_GROUP_INDEX = 11
+QUEST_PRE_SINGLE_INDEX = 12
+
 def smart_split_lua_row(row_content: str) -> list:
     """Разбивает строку элементов, корректно обрабатывая запятые внутри структур."""
     elements = []
@@ -26,11 +38,15 @@ def smart_split_lua_row(row_content: str) -> list:
     brace_level = 0
     in_quote = False
     quote_char = ''
+    escaped = False
     
     for char in row_content:
         if in_quote:
             buffer += char
-            if char == quote_char: in_quote = False
+            # Экранированная кавычка (\") внутри строки не закрывает ее
+            if escaped: escaped = False
+            elif char == '\\': escaped = True
+            elif char == quote_char: in_quote = False
         else:
             if char == '{':
                 brace_level += 1
@@ -140,3 +156,94 @@ def load_questie_data(db_type: str) -> dict:
 
     _QUESTIE_CACHE[db_type] = data
     return data
+
+
+def parse_int_list(content: str) -> list:
+    """Парсит Lua-список чисел: {2018,2019,} -> [2018, 2019]; nil -> []."""
+    if not content or content == 'nil': return []
+    return [int(x) for x in re.findall(r'-?\d+', content)]
+
+def load_questie_quest_prereqs() -> dict:
+    """
+    Пре-квесты из tbcQuestDB.lua: {quest_id: {'group': [...], 'single': [...]}}.
+    Только для квестов, у которых есть preQuestGroup или preQuestSingle.
+    """
+    global _QUESTIE_CACHE
+    if _QUESTIE_CACHE['quest_prereqs'] is not None: return _QUESTIE_CACHE['quest_prereqs']
+
+    filepath = os.path.join(QUESTIE_PATH, 'tbcQuestDB.lua')
+    if not os.path.exists(filepath):
+        logger.warning(f"Файл не найден: {filepath}")
+        _QUESTIE_CACHE['quest_prereqs'] = {}
+        return {}
+
+    logger.info("Загрузка tbcQuestDB.lua (пре-квесты)...")
+    data = {}
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+
+        start_marker = content.find('questData = [[')
+        pos = start_marker if start_marker >= 0 else 0
+        entry_re = re.compile(r'\[(\d+)\]\s*=\s*\{')
+        while True:
+            match = entry_re.search(content, pos)
+            if not match: break
+            entry_id = int(match.group(1))
+            current_pos = match.end()
+            balance = 1
+            in_quote = False
+            quote_char = ''
+            # Баланс скобок с учетом строк (в названиях и текстах бывают скобки)
+            while balance > 0 and current_pos < len(content):
+                char = content[current_pos]
+                if in_quote:
+                    if char == '\\': current_pos += 1
+                    elif char == quote_char: in_quote = False
+                elif char == '"' or char == "'":
+                    in_quote = True
+                    quote_char = char
+                elif char == '{': balance += 1
+                elif char == '}': balance -= 1
+                current_pos += 1
+
+            # Следующий поиск начинаем после записи, чтобы не принять вложенные [zoneID] = { за квесты
+            pos = current_pos
+            elements = smart_split_lua_row(content[match.end():current_pos - 1])
+            if len(elements) <= QUEST_PRE_SINGLE_INDEX: continue
+            group = parse_int_list(elements[QUEST_PRE_GROUP_INDEX])
+            single = parse_int_list(elements[QUEST_PRE_SINGLE_INDEX])
+            if group or single:
+                data[entry_id] = {'group': group, 'single': single}
+
+        logger.info(f"Пре-квесты Questie: {len(data)} квестов")
+
+    except Exception as e:
+        logger.error(f"Ошибка парсинга tbcQuestDB.lua: {e}")
+        return {}
+
+    _QUESTIE_CACHE['quest_prereqs'] = data
+    return data
+
+def clear_questie_cache():
+    """Сбрасывает разобранные файлы Questie — следующий вызов load_* прочитает их заново."""
+    for key in _QUESTIE_CACHE:
+        _QUESTIE_CACHE[key] = None
+
+def questie_fingerprint() -> str:
+    """sha256 по содержимому QUESTIE_FILES (отсутствующий файл тоже учитывается)."""
+    digest = hashlib.sha256()
+    for filename in QUESTIE_FILES:
+        filepath = os.path.join(QUESTIE_PATH, filename)
+        digest.update(filename.encode('utf-8'))
+        if not os.path.exists(filepath):
+            digest.update(b'missing')
+            continue
+        st = os.stat(filepath)
+        cached = _QUESTIE_HASHES.get(filepath)
+        if cached is None or cached[:2] != (st.st_size, st.st_mtime_ns):
+            with open(filepath, 'rb') as f:
+                cached = (st.st_size, st.st_mtime_ns, hashlib.sha256(f.read()).hexdigest())
+            _QUESTIE_HASHES[filepath] = cached
+        digest.update(cached[2].encode('ascii'))
+    return digest.hexdigest()
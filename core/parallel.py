@@ -0,0 +1,12 @@
+# core/parallel.py
+from concurrent.futures import Executor
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+def parallel_map(executor: Optional[Executor], fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """map через пул потоков (или по порядку, если пула нет); результат всегда в порядке items."""
+    if executor is None:
+        return [fn(item) for item in items]
+    return list(executor.map(fn, items))
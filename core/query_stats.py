@@ -0,0 +1,178 @@
+# core/query_stats.py
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Any
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+slow_logger = get_logger('slow_queries', filename='slow_queries.log')
+
+# Порог медленного запроса по умолчанию (перекрывается slow_query_ms в config/db.yaml)
+DEFAULT_SLOW_QUERY_MS = 250.0
+
+# Сколько замеров латентности хранить на одну форму запроса (для p50/p95)
+MAX_SAMPLES_PER_SHAPE = 5000
+
+# Форма вызывается столько раз и возвращает <= 1 строки -> вероятный N+1
+N_PLUS_ONE_CALLS = 50
+
+# Модули, которые сами выполняют запросы и не являются "вызывающими"
+_INTERNAL_MODULES = ('core.db', 'core.query_stats')
+
+_WS_RE = re.compile(r'\s+')
+_STR_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUM_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+
+def normalize_query(query: str) -> str:
+    """
+    Приводит запрос к "форме": схлопывает пробелы, заменяет литералы и плейсхолдеры на '?',
+    списки IN (?, ?, ...) сворачивает в IN (...).
+    """
+    q = _WS_RE.sub(' ', query).strip()
+    q = _STR_RE.sub('?', q)
+    q = q.replace('%s', '?')
+    q = _NUM_RE.sub('?', q)
+    q = _IN_LIST_RE.sub('IN (...)', q)
+    return q
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[idx]
+
+def _find_caller() -> str:
+    """Ищет первую функцию в стеке за пределами слоя БД (обычно функцию репозитория)."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(_INTERNAL_MODULES):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+class _ShapeStats:
+    __slots__ = ('shape', 'sample_query', 'sample_params', 'calls', 'total_s', 'rows', 'samples', 'callers')
+
+    def __init__(self, shape: str, query: str, params):
+        self.shape = shape
+        self.sample_query = query
+        self.sample_params = params
+        self.calls = 0
+        self.total_s = 0.0
+        self.rows = 0
+        self.samples: List[float] = []
+        self.callers: Counter = Counter()
+
+class QueryStats:
+    """Накопитель статистики запросов по нормализованной форме."""
+    def __init__(self, slow_threshold_ms: float = DEFAULT_SLOW_QUERY_MS):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._shapes: Dict[str, _ShapeStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, query: str, params, elapsed_s: float, row_count: int):
+        shape = normalize_query(query)
+        caller = _find_caller()
+        with self._lock:
+            st = self._shapes.get(shape)
+            if st is None:
+                st = self._shapes[shape] = _ShapeStats(shape, query, params)
+            st.calls += 1
+            st.total_s += elapsed_s
+            st.rows += row_count
+            st.callers[caller] += 1
+            if len(st.samples) < MAX_SAMPLES_PER_SHAPE:
+                st.samples.append(elapsed_s)
+
+        elapsed_ms = elapsed_s * 1000.0
+        if self.slow_threshold_ms and elapsed_ms >= self.slow_threshold_ms:
+            slow_logger.warning(f"Медленный запрос {elapsed_ms:.1f} мс ({row_count} строк) из {caller}: {shape} | params={params}")
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+    def merge(self, other: 'QueryStats'):
+        """Добавляет статистику другого накопителя (например, рабочих соединений)."""
+        with other._lock:
+            items = list(other._shapes.values())
+        with self._lock:
+            for src in items:
+                st = self._shapes.get(src.shape)
+                if st is None:
+                    st = self._shapes[src.shape] = _ShapeStats(src.shape, src.sample_query, src.sample_params)
+                st.calls += src.calls
+                st.total_s += src.total_s
+                st.rows += src.rows
+                st.callers.update(src.callers)
+                room = MAX_SAMPLES_PER_SHAPE - len(st.samples)
+                if room > 0:
+                    st.samples.extend(src.samples[:room])
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Возвращает статистику по формам, отсортированную по суммарному времени."""
+        with self._lock:
+            items = list(self._shapes.values())
+        result = []
+        for st in items:
+            samples = sorted(st.samples)
+            result.append({
+                'shape': st.shape,
+                'sample_query': st.sample_query,
+                'sample_params': st.sample_params,
+                'calls': st.calls,
+                'total_ms': st.total_s * 1000.0,
+                'p50_ms': _percentile(samples, 50) * 1000.0,
+                'p95_ms': _percentile(samples, 95) * 1000.0,
+                'rows': st.rows,
+                'callers': dict(st.callers.most_common()),
+                'n_plus_one': st.calls >= N_PLUS_ONE_CALLS and st.rows <= st.calls,
+            })
+        result.sort(key=lambda r: r['total_ms'], reverse=True)
+        return result
+
+    def format_summary(self, top: int = 25) -> str:
+        rows = self.snapshot()
+        if not rows:
+            return "SQL: запросов не выполнялось."
+
+        total_calls = sum(r['calls'] for r in rows)
+        total_ms = sum(r['total_ms'] for r in rows)
+        lines = [f"SQL: {total_calls} запросов, {len(rows)} форм, {total_ms:.1f} мс суммарно"]
+        lines.append(f"{'calls':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'rows':>8}  caller / query")
+        for r in rows[:top]:
+            callers = ", ".join(f"{name} x{cnt}" for name, cnt in list(r['callers'].items())[:3])
+            mark = "  [N+1?]" if r['n_plus_one'] else ""
+            lines.append(f"{r['calls']:>7} {r['total_ms']:>10.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['rows']:>8}  {callers}{mark}")
+            shape = r['shape'] if len(r['shape']) <= 150 else r['shape'][:147] + "..."
+            lines.append(f"{'':>46}{shape}")
+        if len(rows) > top:
+            lines.append(f"... ещё {len(rows) - top} форм")
+        return "\n".join(lines)
+
+# Статистика последней генерации профиля (для UI)
+_LAST_GENERATION: Optional[QueryStats] = None
+
+def set_last_generation_stats(stats: QueryStats):
+    global _LAST_GENERATION
+    _LAST_GENERATION = stats
+
+def dump_generation_stats(stats: QueryStats, path: str = os.path.join('logs', 'query_stats_last.txt')):
+    """Пишет сводку SQL за генерацию в лог и в файл, запоминает ее для UI."""
+    summary = stats.format_summary()
+    logger.info(f"Статистика SQL за генерацию:\n{summary}")
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(summary)
+    except OSError as e:
+        logger.error(f"Не удалось сохранить статистику SQL в {path}: {e}")
+    set_last_generation_stats(stats)
+
+def get_last_generation_stats() -> Optional[QueryStats]:
+    return _LAST_GENERATION
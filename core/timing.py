@@ -0,0 +1,137 @@
+# core/timing.py
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Сколько самых медленных квестов показывать в отчете
+SLOWEST_QUESTS = 10
+
+class _Span:
+    __slots__ = ('name', 'start', 'duration', 'thread', 'depth', 'args')
+
+    def __init__(self, name: str, start: float, thread: int, depth: int, args: Dict[str, Any]):
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.thread = thread
+        self.depth = depth
+        self.args = args
+
+class GenerationTimer:
+    """
+    Вложенные замеры этапов генерации. Спаны пишутся из любого потока (у каждого потока свой стек),
+    спан с аргументом quest попадает в список самых медленных квестов.
+    """
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._spans: List[_Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name: str, **args):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        item = _Span(name, time.perf_counter(), threading.get_ident(), len(stack), args)
+        stack.append(item)
+        try:
+            yield item
+        finally:
+            item.duration = time.perf_counter() - item.start
+            stack.pop()
+            with self._lock:
+                self._spans.append(item)
+
+    def spans(self) -> List[_Span]:
+        with self._lock:
+            return sorted(self._spans, key=lambda s: s.start)
+
+    def stages(self) -> List[Dict[str, Any]]:
+        """Сводка по имени спана: вызовы, суммарное и максимальное время; по убыванию суммы."""
+        agg: Dict[str, Dict[str, Any]] = {}
+        for s in self.spans():
+            st = agg.setdefault(s.name, {'name': s.name, 'depth': s.depth, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            st['calls'] += 1
+            st['total_ms'] += s.duration * 1000.0
+            st['max_ms'] = max(st['max_ms'], s.duration * 1000.0)
+            st['depth'] = min(st['depth'], s.depth)
+        return sorted(agg.values(), key=lambda r: r['total_ms'], reverse=True)
+
+    def slowest_quests(self, top: int = SLOWEST_QUESTS) -> List[Dict[str, Any]]:
+        """Квесты по суммарному времени их спанов (цели, хотспоты, запись)."""
+        per_quest: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for s in self.spans():
+            quest = s.args.get('quest')
+            if quest is not None:
+                per_quest[quest][s.name] += s.duration * 1000.0
+        rows = [{'quest': q, 'total_ms': sum(parts.values()), 'stages': dict(parts)} for q, parts in per_quest.items()]
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows[:top]
+
+    def to_dict(self) -> Dict[str, Any]:
+        spans = self.spans()
+        wall = max((s.start + s.duration for s in spans), default=self.origin) - self.origin
+        return {'wall_ms': wall * 1000.0, 'stages': self.stages(), 'slowest_quests': self.slowest_quests()}
+
+    def format_summary(self) -> str:
+        data = self.to_dict()
+        lines = [f"Генерация: {data['wall_ms']:.1f} мс", f"{'calls':>7} {'total ms':>10} {'max ms':>9}  этап"]
+        for r in data['stages']:
+            lines.append(f"{r['calls']:>7} {r['total_ms']:>10.1f} {r['max_ms']:>9.1f}  {'  ' * r['depth']}{r['name']}")
+        if data['slowest_quests']:
+            lines.append("Самые медленные квесты:")
+            for r in data['slowest_quests']:
+                parts = ", ".join(f"{name} {ms:.1f}" for name, ms in sorted(r['stages'].items(), key=lambda p: -p[1]))
+                lines.append(f"  {r['quest']:>7} {r['total_ms']:>9.1f} мс  ({parts})")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Формат Trace Event (chrome://tracing, Perfetto): полные события 'X' в микросекундах."""
+        pid = os.getpid()
+        events = [{
+            'name': s.name, 'ph': 'X', 'pid': pid, 'tid': s.thread,
+            'ts': (s.start - self.origin) * 1e6, 'dur': s.duration * 1e6, 'args': s.args,
+        } for s in self.spans()]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+# Активный замер: спаны из глубины (Questie, индекс лута, граф) пишутся в него без передачи аргументов
+_ACTIVE: Dict[str, Optional[GenerationTimer]] = {'timer': None}
+
+def set_active_timer(timer: Optional[GenerationTimer]):
+    _ACTIVE['timer'] = timer
+
+@contextmanager
+def span(name: str, **args):
+    """Спан в активном замере; без активного замера ничего не делает."""
+    timer = _ACTIVE['timer']
+    if timer is None:
+        yield None
+        return
+    with timer.span(name, **args) as item:
+        yield item
+
+def dump_generation_timing(timer: GenerationTimer, report_dir: str = 'logs', trace_path: Optional[str] = None):
+    """Пишет отчет по этапам в лог, logs/generation_timing_last.{txt,json} и (по запросу) Chrome trace."""
+    summary = timer.format_summary()
+    logger.info(f"Время этапов генерации:\n{summary}")
+    try:
+        os.makedirs(report_dir, exist_ok=True)
+        with open(os.path.join(report_dir, 'generation_timing_last.txt'), 'w', encoding='utf-8') as f:
+            f.write(summary)
+        with open(os.path.join(report_dir, 'generation_timing_last.json'), 'w', encoding='utf-8') as f:
+            json.dump(timer.to_dict(), f, indent=2, ensure_ascii=False)
+        if trace_path:
+            os.makedirs(os.path.dirname(trace_path) or '.', exist_ok=True)
+            with open(trace_path, 'w', encoding='utf-8') as f:
+                json.dump(timer.chrome_trace(), f)
+            logger.info(f"Chrome trace записан: {trace_path}")
+    except OSError as e:
+        logger.error(f"Не удалось сохранить отчет по времени: {e}")
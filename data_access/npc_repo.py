@@ -2,10 +2,12 @@
 from core.db import Database
 from core.logger import get_logger
 from typing import Optional, Dict, Any, List
-from core.coord_converter import is_coords_in_bounds, get_zone_dimensions
 
 logger = get_logger(__name__)
 
+# Сколько quest ID передавать в одном IN (...)
+RELATION_BATCH_SIZE = 500
+
 def get_quest_starter_type(db: Database, quest_id: int) -> str:
     # 1. Проверяем NPC
     npc_query = "SELECT id FROM creature_questrelation WHERE quest = %s LIMIT 1"
@@ -18,6 +20,27 @@ def get_quest_starter_type(db: Database, quest_id: int) -> str:
     if db.execute(item_query, (quest_id,)): return 'item'
     return 'unknown'
 
+def get_quest_starter_types_bulk(db: Database, quest_ids: List[int]) -> Dict[int, str]:
+    """
+    get_quest_starter_type сразу для набора квестов: три запроса на пачку вместо трех на квест.
+    Приоритет тот же: npc -> object -> item -> unknown.
+    """
+    ids = sorted(set(int(q) for q in quest_ids))
+    result = {q: 'unknown' for q in ids}
+    sources = [
+        ('item', "SELECT startquest AS quest FROM item_template WHERE startquest IN ({})"),
+        ('object', "SELECT quest FROM gameobject_questrelation WHERE quest IN ({})"),
+        ('npc', "SELECT quest FROM creature_questrelation WHERE quest IN ({})"),
+    ]
+    for start in range(0, len(ids), RELATION_BATCH_SIZE):
+        batch = ids[start:start + RELATION_BATCH_SIZE]
+        placeholders = ", ".join(["%s"] * len(batch))
+        # От низшего приоритета к высшему: последующий тип перезаписывает предыдущий
+        for starter_type, query in sources:
+            for row in db.execute(query.format(placeholders), tuple(batch)):
+                result[int(row['quest'])] = starter_type
+    return result
+
 def get_quest_starter_npc(db: Database, quest_id: int) -> Optional[Dict[str, Any]]:
     query = """
     SELECT ct.entry AS entity_id, ct.Name AS entity_name, c.position_x AS x, c.position_y AS y, c.position_z AS z, c.map
@@ -78,57 +101,54 @@ def get_quest_ender_go(db: Database, quest_id: int) -> Optional[Dict[str, Any]]:
         return res
     return None
 
-def get_zone_vendors(db: Database, zone_id: int) -> List[Dict[str, Any]]:
-    dims = get_zone_dimensions(zone_id)
-    if not dims: return []
-    query = """
-    SELECT c.id as entry, ct.Name as name, ct.NpcFlags as npcflag, c.position_x, c.position_y, c.position_z
-    FROM creature c JOIN creature_template ct ON c.id = ct.entry
-    WHERE c.map = %s AND (ct.NpcFlags & 128 = 128 OR ct.NpcFlags & 4096 = 4096)
-    """
-    results = db.execute(query, (dims['map'],))
-    vendors = []
-    seen = set()
-    for row in results:
-        px, py, pz = float(row['position_x']), float(row['position_y']), float(row['position_z'])
-        if is_coords_in_bounds(zone_id, px, py):
-            if row['entry'] not in seen:
-                flags = row['npcflag']
-                t = "VendorRepair" if (flags&128 and flags&4096) else ("Vendor" if flags&128 else "Repair")
-                vendors.append({'Id': row['entry'], 'Name': row['name'], 'Type': t, 'X': px, 'Y': py, 'Z': pz})
-                seen.add(row['entry'])
-    return vendors
+# (ключ, таблица связей, таблица спавнов, таблица шаблонов, колонка имени)
+QUEST_RELATION_SOURCES = [
+    ('starter_npc', 'creature_questrelation', 'creature', 'creature_template', 'Name'),
+    ('starter_go', 'gameobject_questrelation', 'gameobject', 'gameobject_template', 'name'),
+    ('ender_npc', 'creature_involvedrelation', 'creature', 'creature_template', 'Name'),
+    ('ender_go', 'gameobject_involvedrelation', 'gameobject', 'gameobject_template', 'name'),
+]
 
-def get_continent_flight_masters(db: Database, map_id: int) -> List[Dict[str, Any]]:
-    query = """
-    SELECT c.id as entry, ct.Name as name, c.position_x, c.position_y, c.position_z
-    FROM creature c JOIN creature_template ct ON c.id = ct.entry
-    WHERE c.map = %s AND (ct.NpcFlags & 8192 = 8192)
+def get_quest_relations_bulk(db: Database, quest_ids: List[int]) -> Dict[int, Dict[str, List[Dict[str, Any]]]]:
     """
-    results = db.execute(query, (map_id,))
-    fms = []
-    seen = set()
-    for row in results:
-        if row['entry'] not in seen:
-            fms.append({'Id': row['entry'], 'Name': row['name'], 'Type': "FlightMaster", 'X': float(row['position_x']), 'Y': float(row['position_y']), 'Z': float(row['position_z'])})
-            seen.add(row['entry'])
-    return fms
+    Загружает стартеров и завершителей (NPC и GO) сразу для набора квестов:
+    по одному запросу на тип связи (на каждую пачку из RELATION_BATCH_SIZE квестов).
+    Возвращает ВСЕ спавны связанных сущностей — конкретный спавн выбирает logic.spawn_selector.
+    """
+    ids = sorted(set(int(q) for q in quest_ids))
+    result: Dict[int, Dict[str, List[Dict[str, Any]]]] = {
+        q: {key: [] for key, *_ in QUEST_RELATION_SOURCES} for q in ids
+    }
+    for start in range(0, len(ids), RELATION_BATCH_SIZE):
+        batch = ids[start:start + RELATION_BATCH_SIZE]
+        placeholders = ", ".join(["%s"] * len(batch))
+        for key, rel_table, spawn_table, tpl_table, name_col in QUEST_RELATION_SOURCES:
+            query = f"""
+            SELECT rel.quest, t.entry AS entity_id, t.{name_col} AS entity_name, s.position_x AS x, s.position_y AS y, s.position_z AS z, s.map
+            FROM {rel_table} rel
+            JOIN {spawn_table} s ON rel.id = s.id
+            JOIN {tpl_table} t ON rel.id = t.entry
+            WHERE rel.quest IN ({placeholders})
+            """
+            for row in db.execute(query, tuple(batch)):
+                quest_id = int(row.pop('quest'))
+                row['x'], row['y'], row['z'] = float(row['x']), float(row['y']), float(row['z'])
+                result[quest_id][key].append(row)
+    return result
 
-def get_class_trainers(db: Database, map_id: int) -> List[Dict[str, Any]]:
-    """Находит учителей классов на континенте. NPC Flag 16 (0x10) = Trainer."""
-    query = """
-    SELECT c.id as entry, ct.Name as name, ct.SubName as subname, c.position_x, c.position_y, c.position_z
-    FROM creature c JOIN creature_template ct ON c.id = ct.entry
-    WHERE c.map = %s AND (ct.NpcFlags & 16 = 16)
+# Флаги "сервисных" NPC: тренер (16), вендор (128), ремонт (4096), мастер полетов (8192)
+SERVICE_NPC_FLAGS = 16 | 128 | 4096 | 8192
+
+def get_service_npc_spawns(db: Database, map_id: int) -> List[Dict[str, Any]]:
+    """Все спавны сервисных NPC на карте одним запросом (основа для logic.service_npcs)."""
+    query = f"""
+    SELECT c.id, ct.Name, ct.SubName, ct.NpcFlags, c.position_x, c.position_y, c.position_z
+    FROM creature c
+    JOIN creature_template ct ON c.id = ct.entry
+    WHERE c.map = %s AND (ct.NpcFlags & {SERVICE_NPC_FLAGS}) > 0
+    ORDER BY c.guid
     """
     results = db.execute(query, (map_id,))
-    trainers = []
-    seen = set()
     for row in results:
-        if row['entry'] not in seen:
-            trainers.append({
-                'Id': row['entry'], 'Name': row['name'], 'SubName': row['subname'],
-                'Type': "Trainer", 'X': float(row['position_x']), 'Y': float(row['position_y']), 'Z': float(row['position_z'])
-            })
-            seen.add(row['entry'])
-    return trainers
+        row['position_x'], row['position_y'], row['position_z'] = float(row['position_x']), float(row['position_y']), float(row['position_z'])
+    return results
@@ -0,0 +1,118 @@
+# data_access/quest_table.py
+import numpy as np
+from typing import List, Optional, Iterable
+from core.db import Database
+from core.logger import get_logger
+from core.models import Quest
+
+logger = get_logger(__name__)
+
+# Колонки quest_template, нужные для выборок (Title хранится отдельным списком)
+QUEST_DTYPE = np.dtype([
+    ('entry', 'i4'),
+    ('min_level', 'i2'),
+    ('quest_level', 'i2'),
+    ('zone_or_sort', 'i4'),
+    ('required_races', 'i4'),
+    ('prev_quest_id', 'i4'),
+    ('next_quest_id', 'i4'),
+    ('next_quest_in_chain', 'i4'),
+    ('special_flags', 'i4'),
+    ('suggested_players', 'i4'),
+])
+
+# Поля Quest в порядке dataclass (без title)
+_QUEST_FIELDS = ('entry', 'min_level', 'quest_level', 'zone_or_sort', 'required_races',
+                 'prev_quest_id', 'next_quest_id', 'next_quest_in_chain', 'special_flags')
+
+# Кэш таблицы: quest_template не меняется за время работы приложения
+_QUEST_TABLE = {'table': None}
+
+def races_allowed(required_races: np.ndarray, mask: int) -> np.ndarray:
+    """Квест доступен, если RequiredRaces == 0 или пересекается с маской фракции (mask 0 = без фильтра)."""
+    if mask == 0:
+        return np.ones(len(required_races), dtype=bool)
+    return (required_races == 0) | ((required_races & mask) != 0)
+
+class QuestTable:
+    """
+    Все квесты quest_template одним NumPy structured array, отсортированным как ORDER BY MinLevel, entry.
+    Выборки (зоны, уровни, расы, флаги) — векторные маски над колонками.
+    """
+    def __init__(self, rows: List[dict]):
+        data = np.array([
+            (r['entry'], r['min_level'], r['quest_level'], r['zone_or_sort'], r['required_races'],
+             r['prev_quest_id'], r['next_quest_id'], r['next_quest_in_chain'], r['special_flags'], r['suggested_players'])
+            for r in rows
+        ], dtype=QUEST_DTYPE)
+        order = np.lexsort((data['entry'], data['min_level']))
+        self.data = data[order]
+        self.titles = [rows[i]['title'] for i in order]
+        self._entry_order = np.argsort(self.data['entry'])
+
+    def __len__(self):
+        return len(self.data)
+
+    def mask(self, zone_ids: Optional[Iterable[int]] = None, race_mask: int = 0,
+             min_level: Optional[int] = None, max_level: Optional[int] = None,
+             level_field: str = 'quest_level', available_only: bool = True) -> np.ndarray:
+        """
+        Булева маска строк. available_only повторяет условие окна зоны:
+        SpecialFlags = 0 AND SuggestedPlayers = 0 (без повторяемых и групповых).
+        """
+        d = self.data
+        m = races_allowed(d['required_races'], race_mask)
+        if zone_ids is not None:
+            m &= np.isin(d['zone_or_sort'], np.fromiter(zone_ids, dtype='i4'))
+        if min_level is not None:
+            m &= d[level_field] >= min_level
+        if max_level is not None:
+            m &= d[level_field] <= max_level
+        if available_only:
+            m &= (d['special_flags'] == 0) & (d['suggested_players'] == 0)
+        return m
+
+    def quests(self, mask: np.ndarray) -> List[Quest]:
+        """Строки маски как Quest (в порядке MinLevel, entry)."""
+        return self._quests_at(np.flatnonzero(mask))
+
+    def _quests_at(self, idx: np.ndarray) -> List[Quest]:
+        values = self.data[list(_QUEST_FIELDS)][idx].tolist()
+        return [Quest(**dict(zip(_QUEST_FIELDS, v)), title=self.titles[i]) for i, v in zip(idx.tolist(), values)]
+
+    def get(self, entry: int) -> Optional[Quest]:
+        pos = np.searchsorted(self.data['entry'], entry, sorter=self._entry_order)
+        if pos >= len(self.data):
+            return None
+        i = self._entry_order[pos]
+        if self.data['entry'][i] != entry:
+            return None
+        return self._quests_at(np.array([i]))[0]
+
+def load_quest_table(db: Database) -> QuestTable:
+    query = """
+    SELECT
+        entry,
+        Title AS title,
+        MinLevel AS min_level,
+        QuestLevel AS quest_level,
+        ZoneOrSort AS zone_or_sort,
+        RequiredRaces AS required_races,
+        PrevQuestId AS prev_quest_id,
+        NextQuestId AS next_quest_id,
+        NextQuestInChain AS next_quest_in_chain,
+        SpecialFlags AS special_flags,
+        SuggestedPlayers AS suggested_players
+    FROM quest_template
+    """
+    table = QuestTable(db.execute(query))
+    logger.info(f"Таблица квестов загружена: {len(table)} квестов")
+    return table
+
+def get_quest_table(db: Database) -> QuestTable:
+    if _QUEST_TABLE['table'] is None:
+        _QUEST_TABLE['table'] = load_quest_table(db)
+    return _QUEST_TABLE['table']
+
+def clear_quest_table():
+    _QUEST_TABLE['table'] = None
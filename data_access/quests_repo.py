@@ -2,46 +2,36 @@
 from core.db import Database
 from core.logger import get_logger
 from core.models import Quest, Objective
+from data_access.quest_table import get_quest_table
 from typing import List, Dict
 
 logger = get_logger(__name__)
 
 def get_quests_by_zone(db: Database, zone_id: int) -> List[Quest]:
-    query = """
-    SELECT
-        entry,
-        Title AS title,
-        MinLevel AS min_level,
-        QuestLevel AS quest_level,
-        ZoneOrSort AS zone_or_sort,
-        RequiredRaces AS required_races,
-        PrevQuestId AS prev_quest_id,
-        NextQuestId AS next_quest_id,
-        NextQuestInChain AS next_quest_in_chain,
-        SpecialFlags AS special_flags
-    FROM quest_template
-    WHERE ZoneOrSort = %s
-      AND SpecialFlags = 0
-      AND SuggestedPlayers = 0
-    ORDER BY MinLevel, entry
-    """
-    results = db.execute(query, (zone_id,))
-    quests = [Quest(**row) for row in results]
+    """Квесты зоны (SpecialFlags = 0, SuggestedPlayers = 0) в порядке MinLevel, entry — выборка из QuestTable."""
+    table = get_quest_table(db)
+    quests = table.quests(table.mask(zone_ids=[zone_id]))
     logger.info(f"Загружено {len(quests)} квестов для зоны {zone_id}")
     return quests
 
-def get_objectives_for_quest(db: Database, quest_id: int) -> List[Objective]:
-    """
-    Извлекает цели квеста из quest_template. 
-    Логика классификации перенесена из SQL в Python для корректной обработки отрицательных ID (GameObjects).
-    """
-    query = """
-    SELECT
+OBJECTIVE_COLUMNS = """
         entry AS quest_id,
         ReqCreatureOrGOId1, ReqCreatureOrGOId2, ReqCreatureOrGOId3, ReqCreatureOrGOId4,
         ReqItemId1, ReqItemId2, ReqItemId3, ReqItemId4,
         ReqCreatureOrGOCount1, ReqCreatureOrGOCount2, ReqCreatureOrGOCount3, ReqCreatureOrGOCount4,
         ReqItemCount1, ReqItemCount2, ReqItemCount3, ReqItemCount4
+"""
+
+# Сколько quest ID передавать в одном IN (...)
+OBJECTIVES_BATCH_SIZE = 500
+
+def get_objectives_for_quest(db: Database, quest_id: int) -> List[Objective]:
+    """
+    Извлекает цели квеста из quest_template. 
+    Логика классификации перенесена из SQL в Python для корректной обработки отрицательных ID (GameObjects).
+    """
+    query = f"""
+    SELECT{OBJECTIVE_COLUMNS}
     FROM quest_template
     WHERE entry = %s
     """
@@ -49,7 +39,27 @@ def get_objectives_for_quest(db: Database, quest_id: int) -> List[Objective]:
     if not results:
         return []
     
-    row = results[0]
+    objs = objectives_from_row(quest_id, results[0])
+    logger.debug(f"Для квеста {quest_id} найдено {len(objs)} целей")
+    return objs
+
+def get_objectives_for_quests(db: Database, quest_ids: List[int]) -> Dict[int, List[Objective]]:
+    """Цели сразу для набора квестов (пачками по OBJECTIVES_BATCH_SIZE)."""
+    ids = sorted(set(quest_ids))
+    result: Dict[int, List[Objective]] = {q: [] for q in ids}
+    for start in range(0, len(ids), OBJECTIVES_BATCH_SIZE):
+        batch = ids[start:start + OBJECTIVES_BATCH_SIZE]
+        query = f"""
+        SELECT{OBJECTIVE_COLUMNS}
+        FROM quest_template
+        WHERE entry IN ({", ".join(["%s"] * len(batch))})
+        """
+        for row in db.execute(query, tuple(batch)):
+            quest_id = int(row['quest_id'])
+            result[quest_id] = objectives_from_row(quest_id, row)
+    return result
+
+def objectives_from_row(quest_id: int, row: Dict) -> List[Objective]:
     objs = []
     
     for i in range(1, 5):
@@ -89,8 +99,6 @@ def get_objectives_for_quest(db: Database, quest_id: int) -> List[Objective]:
                 item_id=None,
                 count=target_count
             ))
-            
-    logger.debug(f"Для квеста {quest_id} найдено {len(objs)} целей")
     return objs
 
 def get_quest_details(db: Database, quest_id: int) -> Dict[str, str]:
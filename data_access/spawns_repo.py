@@ -1,7 +1,10 @@
 # data_access/spawns_repo.py
-from core.db import Database
+from concurrent.futures import Executor
+from core.db import Database, DatabasePool
+from core.parallel import parallel_map
 from core.logger import get_logger
-from typing import List, Dict, Optional
+from core.timing import span
+from typing import List, Dict, Optional, Iterable
 from core.lua_loader import load_questie_data
 from core.coord_converter import questie_to_world_coords
 
@@ -23,20 +26,18 @@ def get_spawns_from_questie(entry: int, db_type: str) -> List[Dict[str, float]]:
                 spawns.append(world_coords)
     return spawns
 
-def get_creature_spawns(db: Database, entry: int, zone_id: Optional[int] = None) -> List[Dict[str, float]]:
-    # 1. ЖЕСТКИЙ ПРИОРИТЕТ: Questie
-    q_spawns = get_spawns_from_questie(entry, 'npc')
-    if q_spawns:
-        logger.info(f"NPC {entry}: Координаты взяты из Questie ({len(q_spawns)} точек).")
-        return q_spawns
+# Сколько entry передавать в одном IN (...)
+SPAWN_BATCH_SIZE = 500
+
+# db_type Questie -> (таблица спавнов, метка для логов)
+SPAWN_TABLES = {'npc': ('creature', 'NPC'), 'object': ('gameobject', 'GO')}
+
+# Спавны по entry на все время работы приложения (мир не меняется)
+_SPAWN_CACHE: Dict[str, Dict[int, List[Dict[str, float]]]] = {'npc': {}, 'object': {}}
 
-    # 2. ФОЛЛБЕК: База Данных
-    logger.warning(f"NPC {entry}: Нет в Questie, ищем в БД...")
-    query = "SELECT position_x, position_y, position_z, map FROM creature WHERE id = %s"
-    results = db.execute(query, (entry,))
-    
+def _valid_db_spawns(rows: List[Dict]) -> List[Dict[str, float]]:
     valid_db_spawns = []
-    for row in results:
+    for row in rows:
         # !!! КРИТИЧЕСКОЕ ИСПРАВЛЕНИЕ: Конвертируем Decimal в float !!!
         row['position_x'] = float(row['position_x'])
         row['position_y'] = float(row['position_y'])
@@ -44,33 +45,65 @@ def get_creature_spawns(db: Database, entry: int, zone_id: Optional[int] = None)
         
         if is_valid_spawn(row):
             valid_db_spawns.append(row)
-    
-    if valid_db_spawns:
-        return valid_db_spawns
-    return []
+    return valid_db_spawns
 
-def get_gameobject_spawns(db: Database, entry: int, zone_id: Optional[int] = None) -> List[Dict[str, float]]:
-    # 1. ЖЕСТКИЙ ПРИОРИТЕТ: Questie
-    q_spawns = get_spawns_from_questie(entry, 'object')
-    if q_spawns:
-        logger.info(f"GO {entry}: Координаты взяты из Questie ({len(q_spawns)} точек).")
-        return q_spawns
+def resolve_spawns(db: Database, entries: Iterable[int], db_type: str) -> Dict[int, List[Dict[str, float]]]:
+    """
+    Спавны сразу для набора entry. ЖЕСТКИЙ ПРИОРИТЕТ: Questie (из памяти),
+    промахи — одним запросом WHERE id IN (...) пачками. Результат запоминается по entry.
+    """
+    entries = list(entries)
+    cache = _SPAWN_CACHE[db_type]
+    table, label = SPAWN_TABLES[db_type]
+    pending = sorted(set(e for e in entries if e not in cache))
 
-    # 2. ФОЛЛБЕК: База Данных
-    logger.warning(f"GO {entry}: Нет в Questie, ищем в БД...")
-    query = "SELECT position_x, position_y, position_z, map FROM gameobject WHERE id = %s"
-    results = db.execute(query, (entry,))
-    
-    valid_db_spawns = []
-    for row in results:
-        # !!! КРИТИЧЕСКОЕ ИСПРАВЛЕНИЕ: Конвертируем Decimal в float !!!
-        row['position_x'] = float(row['position_x'])
-        row['position_y'] = float(row['position_y'])
-        row['position_z'] = float(row['position_z'])
+    misses = []
+    for entry in pending:
+        q_spawns = get_spawns_from_questie(entry, db_type)
+        if q_spawns: cache[entry] = q_spawns
+        else: misses.append(entry)
 
-        if is_valid_spawn(row):
-            valid_db_spawns.append(row)
-    
-    if valid_db_spawns:
-        return valid_db_spawns
-    return []
\ No newline at end of file
+    # ФОЛЛБЕК: База Данных
+    for start in range(0, len(misses), SPAWN_BATCH_SIZE):
+        batch = misses[start:start + SPAWN_BATCH_SIZE]
+        query = f"""
+        SELECT id, position_x, position_y, position_z, map
+        FROM {table}
+        WHERE id IN ({", ".join(["%s"] * len(batch))})
+        """
+        by_entry: Dict[int, List[Dict]] = {e: [] for e in batch}
+        for row in db.execute(query, tuple(batch)):
+            by_entry[int(row.pop('id'))].append(row)
+        for entry, rows in by_entry.items():
+            cache[entry] = _valid_db_spawns(rows)
+
+    if pending:
+        logger.info(f"{label}: спавны для {len(pending)} entry (Questie: {len(pending) - len(misses)}, БД: {len(misses)})")
+    return {e: cache[e] for e in entries}
+
+def prefetch_spawns(db: Database, creature_entries: Iterable[int], gameobject_entries: Iterable[int],
+                    executor: Optional[Executor] = None, pool: Optional[DatabasePool] = None):
+    """
+    Разрешает спавны всех целей генерации заранее — дальше get_*_spawns берут их из памяти.
+    С пулом потоков пачки грузятся параллельно, каждый поток своим соединением из pool.
+    """
+    jobs = []
+    for db_type, entries in (('npc', creature_entries), ('object', gameobject_entries)):
+        entries = sorted(set(entries))
+        jobs.extend((entries[i:i + SPAWN_BATCH_SIZE], db_type) for i in range(0, len(entries), SPAWN_BATCH_SIZE))
+    if not jobs: return
+    # Questie парсится один раз до раздачи потокам
+    with span("questie"):
+        load_questie_data('npc')
+        load_questie_data('object')
+    parallel_map(executor, lambda job: resolve_spawns(pool.get() if pool else db, *job), jobs)
+
+def clear_spawn_cache():
+    for cache in _SPAWN_CACHE.values():
+        cache.clear()
+
+def get_creature_spawns(db: Database, entry: int, zone_id: Optional[int] = None) -> List[Dict[str, float]]:
+    return resolve_spawns(db, [entry], 'npc')[entry]
+
+def get_gameobject_spawns(db: Database, entry: int, zone_id: Optional[int] = None) -> List[Dict[str, float]]:
+    return resolve_spawns(db, [entry], 'object')[entry]
@@ -0,0 +1,160 @@
+# exporter/batch.py
+# Генерация профилей без UI: один project.json -> один XML. Tk здесь не импортируется.
+import glob
+import os
+import time
+from typing import List, Dict, Optional, Tuple, Iterable
+
+from core.logger import get_logger
+from logic.session_manager import SessionManager
+from exporter.easy_quest_xml import generate_easy_quest_xml, GENERATION_WORKERS
+from exporter.profile_patch import patch_easy_quest_xml
+from exporter.split_output import SplitSpec, generate_split_profiles
+from exporter.matrix import Variant, generate_profile_matrix
+
+logger = get_logger(__name__)
+
+def pattern_root(pattern: str) -> str:
+    """Каталог шаблона до первой части с '*?[': 'projects/**/*.json' -> 'projects'; у пути без шаблона — его каталог."""
+    root = os.path.dirname(pattern)
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root
+
+def expand_inputs_with_roots(patterns: Iterable[str]) -> List[Tuple[str, str]]:
+    """Пути и glob-шаблоны -> [(файл, каталог его шаблона)] без повторов (в порядке шаблонов, внутри — по имени)."""
+    result, seen = [], set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            logger.warning(f"Шаблон {pattern}: файлов не найдено")
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                result.append((path, pattern_root(pattern)))
+    return result
+
+def expand_inputs(patterns: Iterable[str]) -> List[str]:
+    """Пути и glob-шаблоны -> список файлов без повторов (в порядке шаблонов, внутри шаблона — по имени)."""
+    return [path for path, _ in expand_inputs_with_roots(patterns)]
+
+def output_path_for(project_path: str, output_dir: Optional[str] = None, root: Optional[str] = None) -> str:
+    """
+    Профиль пишется рядом с проектом (или в output_dir) с тем же именем и расширением .xml.
+    В output_dir сохраняется путь проекта относительно root (каталог шаблона, pattern_root):
+    projects/a/project.json по 'projects/**/*.json' -> out/a/project.xml.
+    """
+    if output_dir is None:
+        return os.path.splitext(project_path)[0] + '.xml'
+    name = os.path.basename(project_path)
+    if root is not None:
+        relative = os.path.relpath(project_path, root or '.')
+        if not relative.startswith(os.pardir):
+            name = relative
+    return os.path.join(output_dir, os.path.splitext(name)[0] + '.xml')
+
+def trace_path_for(output_path: str) -> str:
+    """Chrome trace генерации лежит рядом с профилем: profile.xml -> profile.trace.json."""
+    return os.path.splitext(output_path)[0] + '.trace.json'
+
+def split_dir_for(project_path: str, output_dir: Optional[str] = None, root: Optional[str] = None) -> str:
+    """Файлы разбивки проекта лежат в каталоге с его именем: project.json -> project/58 - 67 Outland.xml."""
+    return os.path.splitext(output_path_for(project_path, output_dir, root))[0]
+
+def _load_sessions(project_path: str):
+    if not os.path.exists(project_path):
+        raise FileNotFoundError(f"Проект не найден: {project_path}")
+    sessions = SessionManager(project_path).load()
+    if not sessions:
+        raise ValueError(f"В проекте {project_path} нет зон")
+    return sessions
+
+def generate_profile(project_path: str, output_path: Optional[str] = None, workers: int = GENERATION_WORKERS,
+                     trace: bool = False, use_cache: bool = True) -> str:
+    """Генерирует профиль по одному project.json. Возвращает путь к XML."""
+    sessions = _load_sessions(project_path)
+    output_path = output_path or output_path_for(project_path)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    start = time.perf_counter()
+    generate_easy_quest_xml(sessions, output_path, workers=workers, trace_path=trace_path_for(output_path) if trace else None,
+                            use_cache=use_cache)
+    logger.info(f"Профиль {output_path} сгенерирован за {time.perf_counter() - start:.2f} с")
+    return output_path
+
+def generate_split_profile(project_path: str, spec: SplitSpec, output_dir: Optional[str] = None,
+                           workers: int = GENERATION_WORKERS, trace: bool = False, use_cache: bool = True) -> List[str]:
+    """Несколько профилей по одному project.json (см. generate_split_profiles). Возвращает пути к XML."""
+    sessions = _load_sessions(project_path)
+    output_dir = output_dir or split_dir_for(project_path)
+
+    start = time.perf_counter()
+    paths = generate_split_profiles(sessions, spec, output_dir, workers=workers,
+                                    trace_path=os.path.join(output_dir, 'split.trace.json') if trace else None, use_cache=use_cache)
+    logger.info(f"Профили {output_dir} ({len(paths)}) сгенерированы за {time.perf_counter() - start:.2f} с")
+    return paths
+
+def generate_matrix_profile(project_path: str, variants: List[Variant], output_dir: Optional[str] = None,
+                            workers: int = GENERATION_WORKERS, trace: bool = False) -> List[str]:
+    """Профили фракция x класс по одному project.json (см. generate_profile_matrix). Возвращает пути к XML."""
+    sessions = _load_sessions(project_path)
+    output_dir = output_dir or split_dir_for(project_path)
+
+    start = time.perf_counter()
+    paths = generate_profile_matrix(sessions, variants, output_dir, workers=workers,
+                                    trace_path=os.path.join(output_dir, 'matrix.trace.json') if trace else None)
+    logger.info(f"Профили {output_dir} ({len(paths)}) сгенерированы за {time.perf_counter() - start:.2f} с")
+    return paths
+
+def patch_profile(project_path: str, profile_path: str, output_path: Optional[str] = None,
+                  workers: int = GENERATION_WORKERS, trace: bool = False) -> Dict[str, int]:
+    """Обновляет существующий профиль по project.json (см. patch_easy_quest_xml). Возвращает число записей по решениям."""
+    if not os.path.exists(project_path):
+        raise FileNotFoundError(f"Проект не найден: {project_path}")
+    sessions = SessionManager(project_path).load()
+    output_path = output_path or profile_path
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    start = time.perf_counter()
+    counts = patch_easy_quest_xml(sessions, profile_path, output_path, workers=workers,
+                                  trace_path=trace_path_for(output_path) if trace else None)
+    logger.info(f"Профиль {output_path} обновлен за {time.perf_counter() - start:.2f} с")
+    return counts
+
+def generate_profiles(patterns: Iterable[str], output_dir: Optional[str] = None,
+                      workers: int = GENERATION_WORKERS, trace: bool = False, use_cache: bool = True,
+                      split: Optional[SplitSpec] = None,
+                      matrix: Optional[List[Variant]] = None) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Профиль на каждый проект из patterns (со split или matrix — набор профилей в каталоге проекта, split_dir_for).
+    Ошибка одного проекта не останавливает остальные. Проект, чей выход совпал с выходом предыдущего
+    (одинаковые относительные пути из разных шаблонов), не генерируется и попадает в неудачные.
+    Возвращает (успешные [(проект, xml)], неудачные [(проект, ошибка)]).
+    Кэши мира (таблица квестов, граф, индекс лута, спавны) общие для всех проектов.
+    """
+    done, failed = [], []
+    claimed: Dict[str, str] = {}
+    for project_path, root in expand_inputs_with_roots(patterns):
+        if split is not None or matrix is not None:
+            target = split_dir_for(project_path, output_dir, root)
+        else:
+            target = output_path_for(project_path, output_dir, root)
+        owner = claimed.setdefault(os.path.normcase(os.path.abspath(target)), project_path)
+        if owner != project_path:
+            logger.error(f"Проект {project_path}: выход {target} уже занят проектом {owner}")
+            failed.append((project_path, f"выход {target} совпадает с выходом {owner}"))
+            continue
+        try:
+            if split is not None:
+                paths = generate_split_profile(project_path, split, target, workers, trace, use_cache)
+                done.extend((project_path, path) for path in paths)
+                continue
+            if matrix is not None:
+                paths = generate_matrix_profile(project_path, matrix, target, workers, trace)
+                done.extend((project_path, path) for path in paths)
+                continue
+            done.append((project_path, generate_profile(project_path, target, workers, trace, use_cache)))
+        except Exception as e:
+            logger.error(f"Проект {project_path}: {e}")
+            failed.append((project_path, str(e)))
+    return done, failed
@@ -1,49 +1,44 @@
 # exporter/easy_quest_xml.py
 import xml.etree.ElementTree as ET
-import re
-import math
-from typing import List, Dict, Any
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Set, Tuple
 
-from core.db import Database
+from core.db import Database, DatabasePool
+from core.parallel import parallel_map
 from core.logger import get_logger
+from core.query_stats import dump_generation_stats
+from core.timing import GenerationTimer, set_active_timer, span, dump_generation_timing
 from core.models import Quest, Objective
 from logic.session_manager import ZoneSession
-from data_access.spawns_repo import get_creature_spawns, get_gameobject_spawns
-from data_access.npc_repo import (
-    get_quest_starter_npc, get_quest_ender_npc, 
-    get_quest_starter_go, get_quest_ender_go
-)
+from data_access.spawns_repo import prefetch_spawns
 from logic.clustering import cluster_spawns
+from logic.shared_hotspots import SharedHotspots, quest_target_spawns, target_groups
 from logic.loot_resolver import resolve_loot_to_kills, resolve_loot_to_gos
+from logic.loot_index import get_loot_index
 from logic.npc_registry import NPCRegistry
 from logic.quest_sorter import sort_quests_with_dependencies
-from core.coord_converter import get_zone_dimensions, is_coords_in_bounds
+from logic.quest_graph import get_quest_graph
+from logic.quest_relations import QuestRelationResolver, NpcQuestMap
+from core.coord_converter import get_zone_dimensions, get_zone_center
+from logic.service_npcs import get_service_npc_index
+from core.lua_loader import questie_fingerprint
+from data_access.quests_repo import get_quests_by_zone, get_objectives_for_quests
+from exporter.xml_writer import XmlStreamWriter
+from exporter.session_cache import session_cache_key, load_session_output, save_session_output
 
 logger = get_logger(__name__)
 
-def indent(elem, level=0):
-    """Функция для красивого форматирования XML без использования minidom (который ломает текст)."""
-    i = "\n" + level*"  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for elem in elem:
-            indent(elem, level+1)
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
+XSI_URL = "http://www.w3.org/2001/XMLSchema-instance"
+XSD_URL = "http://www.w3.org/2001/XMLSchema"
+
+# Потоков на разрешение квестов (запросы к БД, кластеризация); 1 — все в основном потоке
+GENERATION_WORKERS = 4
 
 def clean_name(text: str) -> str:
     if not text: return "Unknown"
     return "".join(c for c in text if c.isalnum())
 
-def get_distance(x1, y1, x2, y2):
-    return math.sqrt((x1 - x2)**2 + (y1 - y2)**2)
-
 def is_gameobject(db: Database, entry: int) -> bool:
     if not entry: return False
     query = "SELECT entry FROM gameobject_template WHERE entry = %s"
@@ -74,19 +69,10 @@ def get_targets_for_objectives(db: Database, objs: List[Objective]):
                 mobs.extend(resolve_loot_to_kills(db, obj.item_id))
     return list(set(mobs)), list(set(gos))
 
-def get_hotspots(db: Database, quest_id: int, mobs: List[int], gos: List[int]):
-    raw_spawns = []
-    for tid in gos: raw_spawns.extend(get_gameobject_spawns(db, tid))
-    for tid in mobs: raw_spawns.extend(get_creature_spawns(db, tid))
-    
-    starter = get_quest_starter_npc(db, quest_id) or get_quest_starter_go(db, quest_id)
-    if starter and raw_spawns:
-        sx, sy, smap = float(starter['x']), float(starter['y']), int(starter['map'])
-        valid = [s for s in raw_spawns if int(s['map']) == smap and get_distance(sx, sy, s['position_x'], s['position_y']) <= 3000]
-        return cluster_spawns(valid if valid else raw_spawns)
-    return cluster_spawns(raw_spawns) if raw_spawns else []
-
-def add_quest_to_xml(easy_quests_node, quest, objs, quest_type, db, xsi_url):
+def get_hotspots(db: Database, relations: QuestRelationResolver, quest_id: int, mobs: List[int], gos: List[int]):
+    return cluster_spawns(quest_target_spawns(db, relations, quest_id, mobs, gos))
+
+def add_quest_to_xml(easy_quests_node, quest, objs, quest_type, db, relations, xsi_url, targets=None, hotspots=None):
     name = f"{clean_name(quest.title)}{quest.entry}"
     eq = ET.SubElement(easy_quests_node, "EasyQuest")
     ET.SubElement(eq, "Name").text = name
@@ -96,7 +82,7 @@ def add_quest_to_xml(easy_quests_node, quest, objs, quest_type, db, xsi_url):
     q_class_type = f"{quest_type if quest_type != 'None' else 'KillAndLoot'}EasyQuestClass"
     qc = ET.SubElement(eq, "QuestClass", attrib={f"{{{xsi_url}}}type": q_class_type})
     
-    mobs, gos = get_targets_for_objectives(db, objs)
+    mobs, gos = targets if targets is not None else get_targets_for_objectives(db, objs)
     if mobs:
         et = ET.SubElement(qc, "EntryTarget")
         for m in mobs: ET.SubElement(et, "int").text = str(m)
@@ -105,7 +91,7 @@ def add_quest_to_xml(easy_quests_node, quest, objs, quest_type, db, xsi_url):
         for g in gos: ET.SubElement(eo, "int").text = str(g)
     
     hs_node = ET.SubElement(qc, "HotSpots")
-    hotspots = get_hotspots(db, quest.entry, mobs, gos)
+    if hotspots is None: hotspots = get_hotspots(db, relations, quest.entry, mobs, gos)
     for h in hotspots:
         # Формат координат: точка вместо запятой
         x_str = f"{h.center_x:.4f}".replace(',', '.')
@@ -152,75 +138,41 @@ public class MyCustomScript
 }
 """
 
-def resolve_trainer_type(subname: str) -> str:
-    """
-    Определяет точный тип тренера для wRobot на основе SubName (подзаголовка NPC).
-    wRobot требует точные типы: RogueTrainer, WarriorTrainer и т.д.
-    Если тип не найден, возвращает 'None', чтобы избежать краша.
-    """
-    if not subname: 
-        return "None"
-    
-    s = subname.lower()
-    if "rogue" in s: return "RogueTrainer"
-    if "warrior" in s: return "WarriorTrainer"
-    if "paladin" in s: return "PaladinTrainer"
-    if "hunter" in s: return "HunterTrainer"
-    if "priest" in s: return "PriestTrainer"
-    if "shaman" in s: return "ShamanTrainer"
-    if "mage" in s: return "MageTrainer"
-    if "warlock" in s: return "WarlockTrainer"
-    if "druid" in s: return "DruidTrainer"
-    if "demon" in s and "hunter" in s: return "DemonHunterTrainer" # На будущее
-    if "death" in s and "knight" in s: return "DeathKnightTrainer" # WotLK
-    
-    # Можно добавить профессии, если wRobot их поддерживает в этом списке
-    # Но для безопасности пока возвращаем None для всего остального
-    return "None"
-
 def fetch_npcs_spatially(db: Database, zone_id: int, map_id: int, flag_mask: int, type_name: str) -> List[Dict]:
     """
     Ищет NPC на карте по флагам и проверяет, попадают ли они в границы зоны.
+    Выборка идет по сетке сервисных NPC карты (logic.service_npcs), загруженной один раз.
     """
-    query = f"""
-    SELECT c.id, ct.Name, ct.SubName, c.position_x, c.position_y, c.position_z, ct.NpcFlags
-    FROM creature c
-    JOIN creature_template ct ON c.id = ct.entry
-    WHERE c.map = %s AND (ct.NpcFlags & {flag_mask}) > 0
-      AND ct.Name NOT LIKE '[%%]'
-    """
-    results = db.execute(query, (map_id,))
+    results = get_service_npc_index(db, map_id).in_zone(zone_id, flag_mask)
     valid = []
     for row in results:
-        if is_coords_in_bounds(zone_id, float(row['position_x']), float(row['position_y'])):
-            
-            final_type = type_name
-            
-            # --- ЛОГИКА ОПРЕДЕЛЕНИЯ ТИПА ---
-            if type_name == "Vendor":
-                flags = row['NpcFlags']
-                if (flags & 4096):
-                    final_type = "Repair"
-                elif (flags & 128):
-                    final_type = "Vendor"
-            
-            elif type_name == "Trainer":
-                # Используем новую функцию для определения класса тренера
-                final_type = resolve_trainer_type(row['SubName'])
-                if final_type == "None":
-                    continue
-            
-            logger.info(f"Добавлен NPC: {row['Name']} ({final_type}) в зоне {zone_id}")
-            
-            valid.append({
-                'Id': row['id'], 
-                'Name': row['Name'], 
-                'Type': final_type, 
-                'X': row['position_x'], 
-                'Y': row['position_y'], 
-                'Z': row['position_z'], 
-                'Map': map_id
-            })
+        final_type = type_name
+        
+        # --- ЛОГИКА ОПРЕДЕЛЕНИЯ ТИПА ---
+        if type_name == "Vendor":
+            flags = row['NpcFlags']
+            if (flags & 4096):
+                final_type = "Repair"
+            elif (flags & 128):
+                final_type = "Vendor"
+        
+        elif type_name == "Trainer":
+            # Класс тренера уже определен при построении индекса (resolve_trainer_type)
+            final_type = row['TrainerType']
+            if final_type == "None":
+                continue
+        
+        logger.info(f"Добавлен NPC: {row['Name']} ({final_type}) в зоне {zone_id}")
+        
+        valid.append({
+            'Id': row['id'], 
+            'Name': row['Name'], 
+            'Type': final_type, 
+            'X': row['position_x'], 
+            'Y': row['position_y'], 
+            'Z': row['position_z'], 
+            'Map': map_id
+        })
     return valid
 
 def add_grind_to_xml(easy_quests_node, session: ZoneSession, xsi_url):
@@ -323,6 +275,44 @@ def add_follow_path_to_xml(easy_quests_node, session: ZoneSession, xsi_url):
     ET.SubElement(eq, "MinLevel").text = "0"
     ET.SubElement(eq, "WoWClass").text = "None"
 
+# Список ВСЕХ валидных типов. Добавил сюда классовых тренеров.
+VALID_WROBOT_NPC_TYPES = {
+    "Vendor", "Repair", "Auctioneer", "Mailbox", "SpiritHealer", "None",
+    "RogueTrainer", "WarriorTrainer", "PaladinTrainer", "HunterTrainer",
+    "PriestTrainer", "ShamanTrainer", "MageTrainer", "WarlockTrainer", 
+    "DruidTrainer", "DeathKnightTrainer"
+}
+
+def build_npc_element(n: Dict[str, Any]):
+    npc_node = ET.Element("Npc")
+    
+    pos_x = f"{float(n['X']):.4f}".replace(',', '.')
+    pos_y = f"{float(n['Y']):.4f}".replace(',', '.')
+    pos_z = f"{float(n['Z']):.4f}".replace(',', '.')
+    
+    # Атрибут Type="Flying" только у вендоров и ремонтников (как в примере)
+    raw_type = n.get('Type', 'None')
+    position_attribs = {"X": pos_x, "Y": pos_y, "Z": pos_z}
+    if raw_type in ["Vendor", "Repair"]:
+         position_attribs["Type"] = "Flying"
+         
+    ET.SubElement(npc_node, "Position", **position_attribs)
+    
+    ET.SubElement(npc_node, "Entry").text = str(n['Id'])
+    ET.SubElement(npc_node, "Name").text = n['Name'] if n['Name'] else "Unknown Entity"
+    ET.SubElement(npc_node, "GossipOption").text = "-1"
+    ET.SubElement(npc_node, "Active").text = "true"
+    ET.SubElement(npc_node, "Faction").text = "Neutral"
+    
+    # Проверяем, есть ли наш тип в списке разрешенных.
+    # Если это RogueTrainer — он пройдет. Если просто Trainer (не определился класс) — станет None.
+    final_xml_type = raw_type if raw_type in VALID_WROBOT_NPC_TYPES else "None"
+    ET.SubElement(npc_node, "Type").text = final_xml_type
+    
+    continent_name = get_continent_name_by_map_id(int(n.get('Map', 0)))
+    ET.SubElement(npc_node, "ContinentId").text = continent_name
+    return npc_node
+
 def get_continent_name_by_map_id(map_id: int) -> str:
     """
     Возвращает имя континента (Kalimdor, Azeroth и т.д.) по ID карты.
@@ -334,165 +324,320 @@ def get_continent_name_by_map_id(map_id: int) -> str:
     if map_id == 571: return "Northrend"
     return "None"
 
-def generate_easy_quest_xml(sessions: List[ZoneSession], filename: str):
-    db = Database()
-    registry = NPCRegistry()
-    xsi_url = "http://www.w3.org/2001/XMLSchema-instance"
-    xsd_url = "http://www.w3.org/2001/XMLSchema"
-    ET.register_namespace('xsi', xsi_url)
-    ET.register_namespace('xsd', xsd_url)
-    
-    root = ET.Element("EasyQuestProfile")
-    quests_sorted = ET.SubElement(root, "QuestsSorted")
-    npc_quest_section = ET.SubElement(root, "NpcQuest")
-    npc_section = ET.SubElement(root, "Npc")
-    ET.SubElement(root, "Blackspots")
-    ET.SubElement(root, "BlackGuids")
-    easy_quests_node = ET.SubElement(root, "EasyQuests")
-    
-    from data_access.quests_repo import get_quests_by_zone, get_objectives_for_quest
-    
-    added_npc_quests = {} 
+def resolve_quest_targets(db: Database, quest_objectives: Dict[int, List[Objective]],
+                          executor: Optional[Executor] = None, pool: Optional[DatabasePool] = None, prefetch: bool = True):
+    """
+    Цели квестов (с лутом) и (если prefetch) спавны всех целей. С пулом потоков квесты раздаются рабочим,
+    каждый со своим соединением; результат собирается в порядке quest_objectives.
+    """
+    # Общий индекс лута грузится один раз до раздачи потокам
+    get_loot_index(db)
+    quest_ids = list(quest_objectives)
 
+    def targets_of(q_id: int):
+        with span("targets", quest=q_id):
+            return get_targets_for_objectives(pool.get() if pool else db, quest_objectives[q_id])
+
+    targets = parallel_map(executor, targets_of, quest_ids)
+    quest_targets = dict(zip(quest_ids, targets))
+    if prefetch:
+        with span("spawns"):
+            prefetch_spawns(db, {m for mobs, _ in targets for m in mobs}, {g for _, gos in targets for g in gos}, executor, pool)
+    return quest_targets
+
+def load_session_quests(db: Database, sessions: List[ZoneSession]) -> List[Tuple[ZoneSession, List[Quest]]]:
+    """Выбранные квесты каждой сессии с зоной в порядке выполнения (с учетом зависимостей через другие зоны)."""
+    with span("quest_graph"):
+        graph = get_quest_graph(db)
+    session_quests = []
     for session in sessions:
         if not session.zone_id: continue
-        
-        # 1. Загрузка квестов
-        zone_quests = get_quests_by_zone(db, session.zone_id)
-        selected = [q for q in zone_quests if q.entry in session.selected_quest_ids]
-        
-        # Сортируем квесты: сначала преквесты, потом следующие, и по уровню
-        selected = sort_quests_with_dependencies(selected)
-        
-        # 2. Обработка квестов
+        with span("load_quests", zone=session.zone_id):
+            zone_quests = get_quests_by_zone(db, session.zone_id)
+            selected_ids = set(session.selected_quest_ids)
+            selected = [q for q in zone_quests if q.entry in selected_ids]
+            # Сортируем квесты: сначала преквесты, потом следующие, и по уровню
+            session_quests.append((session, sort_quests_with_dependencies(selected, graph)))
+
+    all_selected = {q.entry for _, selected in session_quests for q in selected}
+    for _, selected in session_quests:
         for q in selected:
-            name = f"{clean_name(q.title)}{q.entry}"
-            objs = get_objectives_for_quest(db, q.entry)
-            q_type = determine_quest_type(db, q, objs)
-            
-            ET.SubElement(quests_sorted, "QuestsSorted", Action="PickUp", NameClass=name)
-            if q_type != "None": ET.SubElement(quests_sorted, "QuestsSorted", Action="Pulse", NameClass=name)
-            ET.SubElement(quests_sorted, "QuestsSorted", Action="TurnIn", NameClass=name)
-            
-            add_quest_to_xml(easy_quests_node, q, objs, q_type, db, xsi_url)
-            
-            npc_targets = [
-                (get_quest_starter_npc(db, q.entry), False, "PickUp"),
-                (get_quest_starter_go(db, q.entry), True, "PickUp"),
-                (get_quest_ender_npc(db, q.entry), False, "TurnIn"),
-                (get_quest_ender_go(db, q.entry), True, "TurnIn")
-            ]
-            
-            for target, is_go, action in npc_targets:
-                if not target: continue
-                key = (target['entity_id'], is_go)
-                if key not in added_npc_quests:
-                    nq = ET.SubElement(npc_quest_section, "NPCQuest", Id=str(target['entity_id']), Name=target['entity_name'], GameObject="true" if is_go else "false")
-                    ET.SubElement(nq, "PickUpQuests")
-                    ET.SubElement(nq, "TurnInQuests")
-                    
-                    x_str = f"{float(target['x']):.4f}".replace(',', '.')
-                    y_str = f"{float(target['y']):.4f}".replace(',', '.')
-                    z_str = f"{float(target['z']):.4f}".replace(',', '.')
-                    
-                    ET.SubElement(nq, "Position", X=x_str, Y=y_str, Z=z_str)
-                    added_npc_quests[key] = nq
-                
-                nq_elem = added_npc_quests[key]
-                section = nq_elem.find(f"{action}Quests")
-                if section is not None:
-                    if not any(child.text == str(q.entry) for child in section.findall("int")):
-                        ET.SubElement(section, "int").text = str(q.entry)
-
-        # 3. Гриндинг
-        # Проверяем наличие mob_id, hotspots ИЛИ списка mob_ids
-        has_mob_ids = getattr(session.grind_settings, 'mob_ids', None)
-        if session.grind_settings.mob_id or session.grind_settings.hotspots or has_mob_ids:
-            target_lvl = session.grind_settings.target_level if session.grind_settings.target_level > 0 else 100
-            grind_name = f"Grind{clean_name(session.zone_name)}{target_lvl}"
-            ET.SubElement(quests_sorted, "QuestsSorted", Action="Pulse", NameClass=grind_name)
-            add_grind_to_xml(easy_quests_node, session, xsi_url)
-
-        # 4. Точки пути
-        if session.run_to_points:
-            run_to_name = f"RunTo{clean_name(session.zone_name)}"
-            ET.SubElement(quests_sorted, "QuestsSorted", Action="Pulse", NameClass=run_to_name)
-            add_follow_path_to_xml(easy_quests_node, session, xsi_url)
+            missing = graph.get_parents(q.entry) - all_selected
+            if missing:
+                logger.info(f"Квест {q.entry}: пре-квесты {sorted(missing)} не выбраны ни в одной зоне")
+    return session_quests
 
-        # 5. Логистика (Вендоры, Тренеры и т.д.)
-        dims = get_zone_dimensions(session.zone_id)
-        map_id = dims['map'] if dims else 0
-        if selected:
-            s_npc = get_quest_starter_npc(db, selected[0].entry)
-            if s_npc: map_id = s_npc['map']
+def resolve_relations(db: Database, session_quests: List[Tuple[ZoneSession, List[Quest]]]) -> QuestRelationResolver:
+    relations = QuestRelationResolver(db)
+    with span("relations"):
+        relations.resolve([q.entry for _, selected in session_quests for q in selected])
+        for session, selected in session_quests:
+            # Из нескольких спавнов стартера/завершителя берется ближайший к центру зоны
+            relations.set_anchor([q.entry for q in selected], get_zone_center(session.zone_id))
+    return relations
+
+@contextmanager
+def generation_pool(db: Database, workers: int):
+    """(executor, pool) для разрешения квестов; при workers <= 1 — (None, None), все в основном потоке."""
+    pool = DatabasePool(db) if workers > 1 else None
+    executor = ThreadPoolExecutor(max_workers=workers) if pool else None
+    try:
+        yield executor, pool
+    finally:
+        if executor: executor.shutdown()
+        if pool: pool.close()
 
+def target_group_index(quest_targets: Dict[int, Tuple[List[int], List[int]]]) -> Dict[int, List[int]]:
+    """Квест -> его группа общих целей (target_groups)."""
+    return {q: group for group in target_groups(quest_targets) for q in group}
+
+def build_shared_hotspots(db: Database, relations: QuestRelationResolver, quest_targets, quest_ids: Set[int],
+                          executor: Optional[Executor] = None, pool: Optional[DatabasePool] = None) -> SharedHotspots:
+    """
+    Спавны и общие хотспоты квестов quest_ids. quest_ids должны быть замкнуты по группам общих целей
+    (target_group_index) — иначе хотспоты не совпадут с полной генерацией.
+    """
+    pending_targets = {q: t for q, t in quest_targets.items() if q in quest_ids}
+    with span("spawns"):
+        prefetch_spawns(db, {m for mobs, _ in pending_targets.values() for m in mobs},
+                        {g for _, gos in pending_targets.values() for g in gos}, executor, pool)
+    # Квесты с общими целями получают общие хотспоты (каждый набор спавнов кластеризуется один раз)
+    with span("hotspots"):
+        shared_hotspots = SharedHotspots(db, relations)
+        for q_id, (mobs, gos) in pending_targets.items():
+            shared_hotspots.add_quest(q_id, mobs, gos)
+        shared_hotspots.build(executor)
+    return shared_hotspots
+
+def session_logistics(db: Database, relations: QuestRelationResolver, session: ZoneSession, selected: List[Quest]) -> List[Dict]:
+    """NPC логистики зоны (тренеры, распорядители полетов, вендоры) в порядке добавления в реестр."""
+    dims = get_zone_dimensions(session.zone_id)
+    map_id = dims['map'] if dims else 0
+    if selected:
+        s_npc = relations.get(selected[0].entry)['starter_npc']
+        if s_npc: map_id = s_npc['map']
+
+    npcs = []
+    with span("logistics", zone=session.zone_id):
         if session.include_trainers:
             # ТЕПЕРЬ здесь будет вызываться логика определения класса (Rogue, Warrior и т.д.)
-            for t in fetch_npcs_spatially(db, session.zone_id, map_id, 16, "Trainer"):
-                registry.add_npc(t)
-        
+            npcs.extend(fetch_npcs_spatially(db, session.zone_id, map_id, 16, "Trainer"))
         if session.include_flight_masters:
-            for f in fetch_npcs_spatially(db, session.zone_id, map_id, 8192, "FlightMaster"):
-                registry.add_npc(f)
-
+            npcs.extend(fetch_npcs_spatially(db, session.zone_id, map_id, 8192, "FlightMaster"))
         if session.include_vendors:
-            for v in fetch_npcs_spatially(db, session.zone_id, map_id, 128 | 4096, "Vendor"):
-                registry.add_npc(v)
+            npcs.extend(fetch_npcs_spatially(db, session.zone_id, map_id, 128 | 4096, "Vendor"))
+    return npcs
 
-    # 6. Финальная выгрузка
-    
-    # Список ВСЕХ валидных типов. Добавил сюда классовых тренеров.
-    valid_wrobot_types = {
-        "Vendor", "Repair", "Auctioneer", "Mailbox", "SpiritHealer", "None",
-        "RogueTrainer", "WarriorTrainer", "PaladinTrainer", "HunterTrainer",
-        "PriestTrainer", "ShamanTrainer", "MageTrainer", "WarlockTrainer", 
-        "DruidTrainer", "DeathKnightTrainer"
-    }
+def session_cache_keys(db: Database, session_quests, quest_targets, relations: QuestRelationResolver,
+                       group_of: Dict[int, List[int]]) -> List[str]:
+    """
+    Ключ кэша каждой сессии. Хотспоты квеста зависят от всех квестов его группы общих целей
+    (group_of, см. target_groups), поэтому в ключ входят цели и связи квестов этих групп, даже из других вкладок.
+    """
+    world, questie = db.fingerprint(), questie_fingerprint()
+    keys = []
+    for session, selected in session_quests:
+        closure = sorted({q for sq in selected for q in group_of[sq.entry]})
+        context = [[q, quest_targets[q], relations.get(q)] for q in closure]
+        keys.append(session_cache_key(session.to_dict(), world, questie, context))
+    return keys
 
-    for n in registry.get_all():
-        npc_node = ET.SubElement(npc_section, "Npc")
-        
-        pos_x = f"{float(n['X']):.4f}".replace(',', '.')
-        pos_y = f"{float(n['Y']):.4f}".replace(',', '.')
-        pos_z = f"{float(n['Z']):.4f}".replace(',', '.')
-        
-        # Атрибут Type="Flying" только у вендоров и ремонтников (как в примере)
-        raw_type = n.get('Type', 'None')
-        position_attribs = {"X": pos_x, "Y": pos_y, "Z": pos_z}
-        if raw_type in ["Vendor", "Repair"]:
-             position_attribs["Type"] = "Flying"
-             
-        ET.SubElement(npc_node, "Position", **position_attribs)
-        
-        ET.SubElement(npc_node, "Entry").text = str(n['Id'])
-        ET.SubElement(npc_node, "Name").text = n['Name'] if n['Name'] else "Unknown Entity"
-        ET.SubElement(npc_node, "GossipOption").text = "-1"
-        ET.SubElement(npc_node, "Active").text = "true"
-        ET.SubElement(npc_node, "Faction").text = "Neutral"
-        
-        # Проверяем, есть ли наш тип в списке разрешенных.
-        # Если это RogueTrainer — он пройдет. Если просто Trainer (не определился класс) — станет None.
-        final_xml_type = raw_type if raw_type in valid_wrobot_types else "None"
-        ET.SubElement(npc_node, "Type").text = final_xml_type
-        
-        continent_name = get_continent_name_by_map_id(int(n.get('Map', 0)))
-        ET.SubElement(npc_node, "ContinentId").text = continent_name
+class ResolvedQuests:
+    """Разрешенные за один проход данные квестов: из них пишется любой набор файлов."""
+    def __init__(self, db: Database, relations: QuestRelationResolver, quest_objectives: Dict[int, List[Objective]],
+                 quest_types: Dict[int, str], quest_targets, shared_hotspots: SharedHotspots):
+        self.db = db
+        self.relations = relations
+        self.quest_objectives = quest_objectives
+        self.quest_types = quest_types
+        self.quest_targets = quest_targets
+        self.shared_hotspots = shared_hotspots
+
+def resolve_sessions(db: Database, sessions: List[ZoneSession], workers: int = GENERATION_WORKERS,
+                     use_cache: bool = True) -> Tuple[ResolvedQuests, List[Dict[str, Any]]]:
+    """
+    Разрешает квесты, связи, цели, хотспоты и логистику всех сессий.
+    Возвращает данные и части профиля по сессиям: {'session', 'quests', 'extras', 'npcs', 'cached', 'cache_key'}.
+    Для частей с cached (готовый вывод из exporter.session_cache) хотспоты не считаются.
+    """
+    # 1. Загрузка квестов всех зон сразу, чтобы стартеры/завершители подтянулись пачкой
+    session_quests = load_session_quests(db, sessions)
+    all_selected = {q.entry for _, selected in session_quests for q in selected}
+    relations = resolve_relations(db, session_quests)
+
+    # Цели, спавны и хотспоты всех квестов: пул потоков, у каждого потока свое соединение
+    with span("objectives"):
+        quest_objectives = get_objectives_for_quests(db, list(all_selected))
+    with generation_pool(db, workers) as (executor, pool):
+        with span("resolve_targets"):
+            quest_targets = resolve_quest_targets(db, quest_objectives, executor, pool, prefetch=False)
+
+        # Сессии, чьи входы не менялись, берутся из кэша; спавны и хотспоты считаются только для остальных
+        group_of = target_group_index(quest_targets)
+        cache_keys, cached = [None] * len(session_quests), [None] * len(session_quests)
+        if use_cache and db.mode != 'live':
+            # Запись фикстуры должна содержать все запросы генерации, реплей — их проверить
+            logger.info(f"Кэш сессий отключен в режиме БД '{db.mode}'")
+            use_cache = False
+        if use_cache:
+            with span("session_cache"):
+                cache_keys = session_cache_keys(db, session_quests, quest_targets, relations, group_of)
+                cached = [load_session_output(key) for key in cache_keys]
+            logger.info(f"Кэш сессий: {sum(c is not None for c in cached)} из {len(cached)} без пересчета")
+        pending = {q for (_, selected), hit in zip(session_quests, cached) if hit is None
+                   for sq in selected for q in group_of[sq.entry]}
+        shared_hotspots = build_shared_hotspots(db, relations, quest_targets, pending, executor, pool)
+
+    # 2. Типы квестов и логистика
+    quest_types = {}
+    parts = []
+    for (session, selected), hit, key in zip(session_quests, cached, cache_keys):
+        for q in selected:
+            quest_types[q.entry] = determine_quest_type(db, q, quest_objectives[q.entry])
+        # 5. Логистика (Вендоры, Тренеры и т.д.)
+        npcs = hit['npcs'] if hit is not None else session_logistics(db, relations, session, selected)
+        parts.append({'session': session, 'quests': selected, 'extras': True, 'npcs': npcs, 'cached': hit, 'cache_key': key})
+    return ResolvedQuests(db, relations, quest_objectives, quest_types, quest_targets, shared_hotspots), parts
+
+def render_quest_fragments(resolved: ResolvedQuests, quests: List[Quest], workers: int = GENERATION_WORKERS) -> Dict[int, str]:
+    """
+    Готовые XML-фрагменты <EasyQuest> (как их пишет write_profile). Фрагмент зависит только от квеста —
+    строится один раз для всех профилей, собираемых из одних данных.
+    """
+    writer = XmlStreamWriter(None, "EasyQuestProfile", {'xsi': XSI_URL, 'xsd': XSD_URL})
+    with span("render_quests", quests=len(quests)), generation_pool(resolved.db, workers) as (executor, pool):
+        def render(q: Quest) -> str:
+            node = ET.Element("EasyQuests")
+            add_quest_to_xml(node, q, resolved.quest_objectives[q.entry], resolved.quest_types[q.entry],
+                             pool.get() if pool else resolved.db, resolved.relations, XSI_URL,
+                             resolved.quest_targets[q.entry], resolved.shared_hotspots.get(q.entry))
+            return writer.fragment(node[0])
+        return dict(zip([q.entry for q in quests], parallel_map(executor, render, quests)))
+
+def write_profile(filename: str, parts: List[Dict[str, Any]], resolved: ResolvedQuests, sessions: List[ZoneSession],
+                  quest_fragments: Optional[Dict[int, str]] = None):
+    """
+    Пишет профиль из частей resolve_sessions (сессия целиком или подмножество ее квестов).
+    extras — добавлять гринд и маршрут сессии; sessions — для скрипта профиля;
+    quest_fragments — готовые <EasyQuest> (render_quest_fragments) вместо построения заново.
+    """
+    db, relations = resolved.db, resolved.relations
+    quest_types = resolved.quest_types
+    registry = NPCRegistry()
+    npc_quests = NpcQuestMap()
+    for part in parts:
+        for q in part['quests']:
+            npc_quests.add_quest(q.entry, relations.get(q.entry))
+        for n in part['npcs']:
+            registry.add_npc(n)
+
+    # 6. Выгрузка: секции пишутся в файл по мере построения, целого дерева в памяти нет
+    with span("write", file=filename):
+        with open(filename, "w", encoding="utf-16") as f:
+            writer = XmlStreamWriter(f, "EasyQuestProfile", {'xsi': XSI_URL, 'xsd': XSD_URL})
+            writer.start_document()
 
-    script_node = ET.SubElement(root, "Script")
-    script_node.text = generate_csharp_script(sessions, db)
-    ET.SubElement(root, "OffMeshConnections")
+            writer.start_section("QuestsSorted")
+            for part in parts:
+                session = part['session']
+                for q in part['quests']:
+                    name = f"{clean_name(q.title)}{q.entry}"
+                    writer.child(ET.Element("QuestsSorted", Action="PickUp", NameClass=name))
+                    if quest_types[q.entry] != "None": writer.child(ET.Element("QuestsSorted", Action="Pulse", NameClass=name))
+                    writer.child(ET.Element("QuestsSorted", Action="TurnIn", NameClass=name))
+                if not part['extras']: continue
 
-    # Форматируем XML
-    indent(root)
-    xml_content = ET.tostring(root, encoding='unicode')
+                # 3. Гриндинг
+                # Проверяем наличие mob_id, hotspots ИЛИ списка mob_ids
+                has_mob_ids = getattr(session.grind_settings, 'mob_ids', None)
+                if session.grind_settings.mob_id or session.grind_settings.hotspots or has_mob_ids:
+                    target_lvl = session.grind_settings.target_level if session.grind_settings.target_level > 0 else 100
+                    grind_name = f"Grind{clean_name(session.zone_name)}{target_lvl}"
+                    writer.child(ET.Element("QuestsSorted", Action="Pulse", NameClass=grind_name))
 
-    # ВАЖНО: Добавляем пространства имен в корневой тег вручную, иначе WRobot не видит типы квестов
-    # Используем regex для надежной замены, так как ET может сам добавить xmlns:xsi, но забыть xmlns:xsd
-    new_root_tag = f'<EasyQuestProfile xmlns:xsi="{xsi_url}" xmlns:xsd="{xsd_url}">'
-    xml_content = re.sub(r'<EasyQuestProfile[^>]*>', new_root_tag, xml_content, count=1)
+                # 4. Точки пути
+                if session.run_to_points:
+                    run_to_name = f"RunTo{clean_name(session.zone_name)}"
+                    writer.child(ET.Element("QuestsSorted", Action="Pulse", NameClass=run_to_name))
+            writer.end_section()
 
-    final_xml = '<?xml version="1.0" encoding="utf-16"?>\n' + xml_content
+            writer.start_section("NpcQuest")
+            for nq in npc_quests.elements():
+                writer.child(nq)
+            writer.end_section()
 
-    with open(filename, "w", encoding="utf-16") as f:
-        f.write(final_xml)
-    db.close()
\ No newline at end of file
+            writer.start_section("Npc")
+            for n in registry.get_all():
+                writer.child(build_npc_element(n))
+            writer.end_section()
+
+            writer.element(ET.Element("Blackspots"))
+            writer.element(ET.Element("BlackGuids"))
+
+            # add_*_to_xml дописывают в контейнер — сразу выгружаем (готовыми фрагментами для кэша) и очищаем его
+            easy_quests_node = ET.Element("EasyQuests")
+            fragments: List[str] = []
+            def flush_easy_quests():
+                for eq in easy_quests_node:
+                    fragments.append(writer.fragment(eq))
+                    writer.child_xml(fragments[-1])
+                easy_quests_node.clear()
+
+            writer.start_section("EasyQuests")
+            for part in parts:
+                session, hit = part['session'], part.get('cached')
+                if hit is not None:
+                    for xml in hit['easy_quests']:
+                        writer.child_xml(xml)
+                    continue
+                fragments = []
+                for q in part['quests']:
+                    if quest_fragments is not None and q.entry in quest_fragments:
+                        fragments.append(quest_fragments[q.entry])
+                        writer.child_xml(fragments[-1])
+                        continue
+                    with span("write_quest", quest=q.entry):
+                        add_quest_to_xml(easy_quests_node, q, resolved.quest_objectives[q.entry], quest_types[q.entry], db,
+                                         relations, XSI_URL, resolved.quest_targets[q.entry], resolved.shared_hotspots.get(q.entry))
+                        flush_easy_quests()
+                if part['extras']:
+                    has_mob_ids = getattr(session.grind_settings, 'mob_ids', None)
+                    if session.grind_settings.mob_id or session.grind_settings.hotspots or has_mob_ids:
+                        add_grind_to_xml(easy_quests_node, session, XSI_URL)
+                    if session.run_to_points:
+                        add_follow_path_to_xml(easy_quests_node, session, XSI_URL)
+                    flush_easy_quests()
+                if part.get('cache_key') is not None:
+                    save_session_output(part['cache_key'], fragments, part['npcs'])
+            writer.end_section()
+
+            script_node = ET.Element("Script")
+            script_node.text = generate_csharp_script(sessions, db)
+            writer.element(script_node)
+            writer.element(ET.Element("OffMeshConnections"))
+            writer.end_document()
+
+def generate_easy_quest_xml(sessions: List[ZoneSession], filename: str, workers: int = GENERATION_WORKERS,
+                            trace_path: Optional[str] = None, use_cache: bool = True):
+    """
+    Генерирует профиль. Время этапов пишется в logs/generation_timing_last.{txt,json};
+    trace_path — дополнительно Chrome trace (chrome://tracing, Perfetto).
+    use_cache — сессии с неизменными входами (exporter.session_cache) берутся готовыми, без пересчета.
+    """
+    timer = GenerationTimer()
+    set_active_timer(timer)
+    try:
+        with span("generate", file=filename):
+            _generate_easy_quest_xml(sessions, filename, workers, use_cache)
+    finally:
+        set_active_timer(None)
+        dump_generation_timing(timer, trace_path=trace_path)
+
+def _generate_easy_quest_xml(sessions: List[ZoneSession], filename: str, workers: int, use_cache: bool):
+    db = Database()
+    ET.register_namespace('xsi', XSI_URL)
+    ET.register_namespace('xsd', XSD_URL)
+    resolved, parts = resolve_sessions(db, sessions, workers, use_cache)
+    write_profile(filename, parts, resolved, sessions)
+    dump_generation_stats(db.stats)
+    db.close()
@@ -0,0 +1,103 @@
+# exporter/matrix.py
+# Матрица профилей фракция x класс из одного прохода разрешения: общие данные считаются один раз.
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from core.db import Database
+from core.logger import get_logger
+from core.parallel import parallel_map
+from core.query_stats import dump_generation_stats
+from core.timing import GenerationTimer, set_active_timer, span, dump_generation_timing
+from logic.faction_filter import get_faction_mask, filter_quests_by_faction
+from logic.session_manager import ZoneSession
+from exporter.easy_quest_xml import (
+    GENERATION_WORKERS, XSI_URL, XSD_URL, resolve_sessions, render_quest_fragments, write_profile,
+)
+from exporter.split_output import safe_file_name
+
+logger = get_logger(__name__)
+
+FACTIONS = ('Alliance', 'Horde')
+# Классы TBC; в TBC каждый доступен обеим фракциям (паладин — кровавым эльфам, шаман — дренеям)
+WOW_CLASSES = ('Warrior', 'Paladin', 'Hunter', 'Rogue', 'Priest', 'Shaman', 'Mage', 'Warlock', 'Druid')
+
+# (фракция, класс); класс None — профиль со всеми классовыми тренерами, как обычная генерация
+Variant = Tuple[str, Optional[str]]
+
+def _parse_names(text: str, known: Tuple[str, ...], what: str) -> List[str]:
+    by_lower = {k.lower(): k for k in known}
+    if text.strip().lower() == 'all':
+        return list(known)
+    names = [c.strip() for c in text.split(',') if c.strip()]
+    unknown = [n for n in names if n.lower() not in by_lower]
+    if not names or unknown:
+        raise ValueError(f"Неизвестные {what} {unknown or text!r}, ожидаются {known} через ',' или 'all'")
+    return list(dict.fromkeys(by_lower[n.lower()] for n in names))
+
+def parse_matrix(factions: str, classes: Optional[str] = None) -> List[Variant]:
+    """'horde,alliance' x 'Rogue,Mage' (или 'all') -> [(фракция, класс)]; без классов — по профилю на фракцию."""
+    faction_names = _parse_names(factions, FACTIONS, "фракции")
+    class_names = _parse_names(classes, WOW_CLASSES, "классы") if classes else [None]
+    return [(f, c) for f in faction_names for c in class_names]
+
+def variant_name(variant: Variant) -> str:
+    faction, wow_class = variant
+    return f"{faction} {wow_class}" if wow_class else faction
+
+def keep_npc(npc: Dict[str, Any], wow_class: Optional[str]) -> bool:
+    """Классовые тренеры (resolve_trainer_type) — только своего класса; остальная логистика общая."""
+    npc_type = npc.get('Type', 'None')
+    return wow_class is None or not npc_type.endswith("Trainer") or npc_type == f"{wow_class}Trainer"
+
+def variant_parts(parts: List[Dict[str, Any]], variant: Variant) -> List[Dict[str, Any]]:
+    """Части resolve_sessions для варианта: квесты — по расам фракции, тренеры — по классу."""
+    faction, wow_class = variant
+    mask = get_faction_mask(faction)
+    return [dict(part, quests=filter_quests_by_faction(part['quests'], mask),
+                 npcs=[n for n in part['npcs'] if keep_npc(n, wow_class)], cached=None, cache_key=None)
+            for part in parts]
+
+def generate_profile_matrix(sessions: List[ZoneSession], variants: List[Variant], output_dir: str,
+                            workers: int = GENERATION_WORKERS, trace_path: Optional[str] = None) -> List[str]:
+    """
+    Профиль на каждый вариант (фракция, класс). Квесты, связи, цели, спавны, хотспоты, логистика и XML квестов
+    строятся один раз на объединение квестов всех фракций; на варианты расходятся только фильтры и запись файлов.
+    Хотспоты общих целей считаются по всем квестам сессий, а не по квестам одной фракции. Возвращает пути.
+    """
+    timer = GenerationTimer()
+    set_active_timer(timer)
+    try:
+        with span("generate_matrix", dir=output_dir, variants=len(variants)):
+            return _generate_profile_matrix(sessions, variants, output_dir, workers)
+    finally:
+        set_active_timer(None)
+        dump_generation_timing(timer, trace_path=trace_path)
+
+def _generate_profile_matrix(sessions: List[ZoneSession], variants: List[Variant], output_dir: str, workers: int) -> List[str]:
+    db = Database()
+    ET.register_namespace('xsi', XSI_URL)
+    ET.register_namespace('xsd', XSD_URL)
+    # Кэш сессий хранит вывод под одну фракцию и без хотспотов для общих фрагментов — здесь не используется
+    resolved, parts = resolve_sessions(db, sessions, workers, use_cache=False)
+    quest_fragments = render_quest_fragments(resolved, [q for p in parts for q in p['quests']], workers)
+
+    os.makedirs(output_dir, exist_ok=True)
+    def write_variant(variant: Variant) -> str:
+        path = os.path.join(output_dir, f"{safe_file_name(variant_name(variant))}.xml")
+        group = variant_parts(parts, variant)
+        write_profile(path, group, resolved, sessions, quest_fragments)
+        logger.info(f"Профиль {path}: {sum(len(p['quests']) for p in group)} квестов, "
+                    f"{sum(len(p['npcs']) for p in group)} NPC логистики")
+        return path
+
+    # С готовыми фрагментами квестов запись в БД не ходит — варианты пишутся параллельно
+    if workers > 1 and len(variants) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(variants))) as executor:
+            paths = parallel_map(executor, write_variant, variants)
+    else:
+        paths = parallel_map(None, write_variant, variants)
+    dump_generation_stats(db.stats)
+    db.close()
+    return paths
@@ -0,0 +1,487 @@
+# exporter/profile_patch.py
+# Обновление существующего профиля: пересобираются только изменившиеся квесты, ручные правки остаются.
+import hashlib
+import io
+import json
+import os
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Any, Optional, Tuple, TextIO, Iterator
+
+from core.db import Database
+from core.logger import get_logger
+from core.query_stats import dump_generation_stats
+from core.timing import GenerationTimer, set_active_timer, span, dump_generation_timing
+from core.lua_loader import questie_fingerprint
+from logic.session_manager import ZoneSession
+from logic.npc_registry import NPCRegistry
+from logic.quest_relations import NpcQuestMap
+from exporter.xml_writer import XmlStreamWriter
+from exporter.session_cache import session_cache_key
+from exporter.easy_quest_xml import (
+    GENERATION_WORKERS, XSI_URL, XSD_URL, clean_name, determine_quest_type, add_quest_to_xml, add_grind_to_xml, add_follow_path_to_xml,
+    build_npc_element, generate_csharp_script, load_session_quests, resolve_relations, generation_pool,
+    resolve_quest_targets, target_group_index, build_shared_hotspots, session_logistics,
+)
+from data_access.quests_repo import get_objectives_for_quests
+
+logger = get_logger(__name__)
+
+# Версия формата файла-спутника; при несовпадении все записи профиля считаются ручными
+MANIFEST_VERSION = 1
+PARSE_CHUNK_SIZE = 64 * 1024
+
+# Секции первого уровня в порядке, в котором их пишет генератор
+SECTION_ORDER = ['QuestsSorted', 'NpcQuest', 'Npc', 'Blackspots', 'BlackGuids', 'EasyQuests', 'Script', 'OffMeshConnections']
+PATCHED_SECTIONS = ('QuestsSorted', 'NpcQuest', 'Npc', 'EasyQuests')
+
+# Решения по записи профиля
+KEEP, MANUAL, REPLACE, ADD, REMOVE, SKIP = 'keep', 'manual', 'replace', 'add', 'remove', 'skip'
+# Записи, которые после обновления остаются в файле на своем месте
+PRESENT = (KEEP, MANUAL, REPLACE)
+
+def manifest_path_for(profile_path: str) -> str:
+    """Сведения о сгенерированных записях лежат рядом с профилем: profile.xml -> profile.gen.json."""
+    return os.path.splitext(profile_path)[0] + '.gen.json'
+
+def detect_encoding(path: str) -> str:
+    """Кодировка по BOM. Примеры профилей объявляют utf-16, а записаны в UTF-8 с BOM."""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    if head.startswith(b'\xef\xbb\xbf'): return 'utf-8-sig'
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')): return 'utf-16'
+    return 'utf-8'
+
+def element_digest(elem) -> str:
+    """Хэш содержимого элемента без учета отступов: теги, атрибуты, текст, дети."""
+    def canon(e):
+        return [e.tag, sorted(e.attrib.items()), (e.text or '').strip(), [canon(c) for c in e]]
+    return hashlib.sha256(json.dumps(canon(elem), ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def easy_quest_id(elem) -> str:
+    """Ключ EasyQuest: по QuestId, у гринда и маршрутов (QuestId пустой) — по имени."""
+    quest_id = (elem.findtext('QuestId/int') or '').strip()
+    return f"quest:{int(quest_id)}" if quest_id.isdigit() else f"name:{(elem.findtext('Name') or '').strip()}"
+
+def npc_id(elem) -> str:
+    return f"npc:{(elem.findtext('Entry') or '').strip()}"
+
+def iter_profile(stream: TextIO) -> Iterator[Tuple[str, Any, int]]:
+    """
+    Потоковый разбор профиля: (событие, элемент, глубина), корень — глубина 0, секции — 1.
+    Элементы второго уровня после обработки нужно убирать из секции (section.remove), чтобы не копить дерево.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    depth = 0
+    while True:
+        chunk = stream.read(PARSE_CHUNK_SIZE)
+        if not chunk: break
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == 'start':
+                yield event, elem, depth
+                depth += 1
+            else:
+                depth -= 1
+                yield event, elem, depth
+    parser.close()
+
+class ProfileIndex:
+    """Записи существующего профиля по ID и имени (без самих элементов — только имена и хэши содержимого)."""
+    def __init__(self, encoding: str = 'utf-16'):
+        self.encoding = encoding
+        self.sections: List[str] = []
+        # EasyQuest: ключ -> {'name', 'digest'}; имя -> ключ
+        self.easy_quests: Dict[str, Dict[str, str]] = {}
+        self.by_name: Dict[str, str] = {}
+        # NPCQuest: (Id, GameObject) -> {'PickUp': [...], 'TurnIn': [...]}
+        self.npc_quests: Dict[Tuple[int, bool], Dict[str, List[int]]] = {}
+        # Npc: ключ -> хэш
+        self.npcs: Dict[str, str] = {}
+        self.quests_sorted: List[Tuple[str, str]] = []
+
+def _int_list(elem, tag: str) -> List[int]:
+    container = elem.find(tag)
+    return [] if container is None else [int(i.text) for i in container if (i.text or '').strip().isdigit()]
+
+def index_profile(path: str) -> ProfileIndex:
+    index = ProfileIndex(detect_encoding(path))
+    with span("index_profile"), open(path, 'r', encoding=index.encoding) as f:
+        section = None
+        for event, elem, depth in iter_profile(f):
+            if depth == 1:
+                if event == 'start':
+                    section = elem
+                    index.sections.append(elem.tag)
+                continue
+            if event != 'end' or depth != 2: continue
+
+            if section.tag == 'EasyQuests':
+                key = easy_quest_id(elem)
+                name = (elem.findtext('Name') or '').strip()
+                if key not in index.easy_quests:
+                    index.easy_quests[key] = {'name': name, 'digest': element_digest(elem)}
+                index.by_name.setdefault(name, key)
+            elif section.tag == 'NpcQuest':
+                entity = (int(elem.get('Id', 0)), elem.get('GameObject') == 'true')
+                index.npc_quests.setdefault(entity, {'PickUp': _int_list(elem, 'PickUpQuests'),
+                                                     'TurnIn': _int_list(elem, 'TurnInQuests')})
+            elif section.tag == 'Npc':
+                index.npcs.setdefault(npc_id(elem), element_digest(elem))
+            elif section.tag == 'QuestsSorted':
+                index.quests_sorted.append((elem.get('Action', ''), elem.get('NameClass', '')))
+            section.remove(elem)
+    return index
+
+def load_manifest(path: str) -> Dict[str, Dict[str, str]]:
+    """Записи, которые генератор писал в профиль: ключ -> {'key': входы, 'digest': что было записано}."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Файл {path} не читается ({e}), все записи профиля считаются ручными")
+        return {}
+    return data.get('items', {}) if data.get('version') == MANIFEST_VERSION else {}
+
+def save_manifest(path: str, items: Dict[str, Dict[str, str]]):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'version': MANIFEST_VERSION, 'items': items}, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+def decide(new_key: Optional[str], existing_digest: Optional[str], record: Optional[Dict[str, str]]) -> str:
+    """
+    Что делать с записью. new_key is None — генератор ее больше не выдает.
+    Запись, которой генератор не писал или которую после него правили руками, не трогается.
+    """
+    if existing_digest is None:
+        if new_key is None: return SKIP
+        # Сгенерированную раньше запись удалили руками — не возвращаем
+        return SKIP if record else ADD
+    if record is None or record['digest'] != existing_digest:
+        return MANUAL
+    if new_key is None: return REMOVE
+    return KEEP if record['key'] == new_key else REPLACE
+
+def _placement(items: List[Dict[str, Any]], actions: Dict[str, str], present) -> Tuple[Dict[str, list], Dict[str, list], list]:
+    """
+    Куда вставить новые записи: после ближайшей предыдущей (в порядке генерации) записи, которая есть в секции;
+    если предыдущих нет — перед ближайшей следующей; если нет никаких — в конец (tail).
+    """
+    before, after, head, prev = {}, {}, [], None
+    for item in items:
+        if actions[item['id']] == ADD:
+            if prev is None: head.append(item)
+            else: after.setdefault(prev, []).append(item)
+        elif item['id'] in present:
+            if prev is None and head:
+                before[item['id']], head = head, []
+            prev = item['id']
+    return before, after, head
+
+class ProfilePatcher:
+    """Второй проход: переписывает профиль потоком, меняя только решенные записи."""
+    def __init__(self, writer: XmlStreamWriter, index: ProfileIndex, items: List[Dict[str, Any]],
+                 npc_items: List[Dict[str, Any]], actions: Dict[str, str], npc_quests: NpcQuestMap, changed_quests):
+        self.writer = writer
+        self.index = index
+        self.items = items
+        self.npc_items = npc_items
+        self.actions = actions
+        self.npc_quests = npc_quests
+        self.changed_quests = changed_quests
+        self.by_id = {item['id']: item for item in items + npc_items}
+        self.quest_rank = {item['quest'].entry: rank for rank, item in enumerate(i for i in items if 'quest' in i)}
+        self._seen = set()
+
+    def _output_name(self, item_id: str) -> str:
+        if self.actions[item_id] in (REPLACE, ADD): return self.by_id[item_id]['name']
+        return self.index.easy_quests[item_id]['name']
+
+    def _first(self, item_id: str) -> bool:
+        """Повторы одной записи в файле (два EasyQuest с одним QuestId) пишутся как есть."""
+        if item_id in self._seen: return False
+        self._seen.add(item_id)
+        return True
+
+    def quests_sorted(self, entries: list):
+        dropped = {self.index.easy_quests[i]['name']: i for i, a in self.actions.items()
+                   if a in (REPLACE, REMOVE) and i in self.index.easy_quests}
+        out, replaced = [], set()
+        for e in entries:
+            item_id = dropped.get(e.get('NameClass'))
+            if item_id is None:
+                out.append(e)
+            elif self.actions[item_id] == REPLACE and item_id not in replaced:
+                # Новые шаги пересобранного квеста — на месте первого старого
+                replaced.add(item_id)
+                out.extend(self.by_id[item_id]['sorted'])
+
+        names = {}
+        for item in self.items:
+            if self.actions[item['id']] in PRESENT:
+                names.setdefault(self._output_name(item['id']), item['id'])
+        last = {}
+        for pos, e in enumerate(out):
+            if e.get('NameClass') in names: last[names[e.get('NameClass')]] = pos
+        before, after, tail = _placement(self.items, self.actions, set(last))
+        # Шаги, оставшиеся от удаленного руками EasyQuest, не дублируются
+        existing = {e.get('NameClass') for e in out}
+        def emit(added_items):
+            for added in added_items:
+                if added['name'] in existing: continue
+                for s in added['sorted']: self.writer.child(s)
+
+        first_seen = set()
+        for pos, e in enumerate(out):
+            item_id = names.get(e.get('NameClass'))
+            if item_id in before and item_id not in first_seen:
+                emit(before[item_id])
+            first_seen.add(item_id)
+            self.writer.child(e)
+            if item_id is not None and last[item_id] == pos:
+                emit(after.get(item_id, []))
+        emit(tail)
+
+    def _patch_npc_quest(self, nq, entity: Optional[Dict[str, Any]]) -> bool:
+        """Меняет в <NPCQuest> только изменившиеся квесты. False — элемент опустел и не нужен."""
+        had_any, has_any = False, False
+        for tag, action in (('PickUpQuests', 'PickUp'), ('TurnInQuests', 'TurnIn')):
+            old = _int_list(nq, tag)
+            new = [q for q in old if q not in self.changed_quests]
+            for q in (entity[action] if entity else []):
+                if q not in new: new.insert(self._rank_position(new, q), q)
+            had_any, has_any = had_any or bool(old), has_any or bool(new)
+            if new == old: continue
+            container = nq.find(tag)
+            if container is None:
+                pickups = nq.find('PickUpQuests')
+                container = ET.Element(tag)
+                nq.insert(0 if pickups is None else list(nq).index(pickups) + 1, container)
+            container.clear()
+            for q in new: ET.SubElement(container, "int").text = str(q)
+        return has_any or not had_any
+
+    def _rank_position(self, quests: List[int], quest_id: int) -> int:
+        """Позиция после последнего квеста списка, идущего раньше quest_id в порядке генерации (ручные пропускаются)."""
+        rank, pos = self.quest_rank[quest_id], 0
+        for i, q in enumerate(quests):
+            if self.quest_rank.get(q, rank) < rank: pos = i + 1
+        return pos
+
+    def npc_quest(self, entries: list):
+        for nq in entries:
+            entity = self.npc_quests.entities.pop((int(nq.get('Id', 0)), nq.get('GameObject') == 'true'), None)
+            if self._patch_npc_quest(nq, entity):
+                self.writer.child(nq)
+        # Оставшиеся — сущности, которых в профиле не было
+        for nq in self.npc_quests.elements():
+            self.writer.child(nq)
+
+    def _stream_child(self, elem, item_id: str, after: Dict[str, list], before: Dict[str, list]):
+        for added in before.pop(item_id, []):
+            self.writer.child(added['element'])
+        action = self.actions.get(item_id) if self._first(item_id) else None
+        if action == REPLACE:
+            self.writer.child(self.by_id[item_id]['element'])
+        elif action != REMOVE:
+            self.writer.child(elem)
+        for added in after.pop(item_id, []):
+            self.writer.child(added['element'])
+
+    def write(self, source: TextIO):
+        present = {i for i, a in self.actions.items() if a in PRESENT}
+        eq_before, eq_after, eq_tail = _placement(self.items, self.actions, present)
+        npc_tail = [item for item in self.npc_items if self.actions[item['id']] == ADD]
+        written = set()
+
+        def open_section(tag: str):
+            self.writer.start_section(tag)
+            written.add(tag)
+
+        def close_section(tag: str, entries: list):
+            if tag == 'QuestsSorted': self.quests_sorted(entries)
+            elif tag == 'NpcQuest': self.npc_quest(entries)
+            elif tag == 'Npc':
+                for added in npc_tail: self.writer.child(added['element'])
+            elif tag == 'EasyQuests':
+                for added in eq_tail: self.writer.child(added['element'])
+            self.writer.end_section()
+
+        def missing_before(tag: Optional[str]):
+            # Секций, в которые есть что добавить, в файле может не быть — пишем их на обычном месте
+            limit = SECTION_ORDER.index(tag) if tag in SECTION_ORDER else len(SECTION_ORDER)
+            for missing in PATCHED_SECTIONS:
+                if missing not in written and SECTION_ORDER.index(missing) < limit:
+                    open_section(missing)
+                    close_section(missing, [])
+
+        self.writer.start_document()
+        section, buffered = None, []
+        for event, elem, depth in iter_profile(source):
+            if depth == 1:
+                if event == 'start':
+                    section, buffered = elem, []
+                    missing_before(elem.tag)
+                    if elem.tag in PATCHED_SECTIONS: open_section(elem.tag)
+                elif elem.tag in PATCHED_SECTIONS:
+                    close_section(elem.tag, buffered)
+                else:
+                    self.writer.element(elem)
+                    written.add(elem.tag)
+                continue
+            if event != 'end' or depth != 2 or section.tag not in PATCHED_SECTIONS: continue
+
+            if section.tag in ('QuestsSorted', 'NpcQuest'):
+                buffered.append(elem)
+            elif section.tag == 'Npc':
+                self._stream_child(elem, npc_id(elem), {}, {})
+            else:
+                self._stream_child(elem, easy_quest_id(elem), eq_after, eq_before)
+            section.remove(elem)
+        missing_before(None)
+        self.writer.end_document()
+
+def _skeleton(script: str) -> str:
+    """Пустой профиль (как у генератора) — источник для второго прохода, когда файла еще нет."""
+    buf = io.StringIO()
+    writer = XmlStreamWriter(buf, "EasyQuestProfile", {'xsi': XSI_URL, 'xsd': XSD_URL})
+    writer.start_document()
+    for tag in ('QuestsSorted', 'NpcQuest', 'Npc'):
+        writer.start_section(tag)
+        writer.end_section()
+    writer.element(ET.Element("Blackspots"))
+    writer.element(ET.Element("BlackGuids"))
+    writer.start_section("EasyQuests")
+    writer.end_section()
+    script_node = ET.Element("Script")
+    script_node.text = script
+    writer.element(script_node)
+    writer.element(ET.Element("OffMeshConnections"))
+    writer.end_document()
+    return buf.getvalue()
+
+def patch_easy_quest_xml(sessions: List[ZoneSession], profile_path: str, output_path: Optional[str] = None,
+                         workers: int = GENERATION_WORKERS, trace_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Обновляет профиль profile_path (результат — в output_path, по умолчанию на месте).
+    Квесты с неизменными входами и записи, правленные руками, остаются как есть; хотспоты считаются
+    только для пересобираемых квестов. Если профиля нет — он создается (как generate_easy_quest_xml).
+    Возвращает число записей по решениям (keep/manual/replace/add/remove/skip).
+    """
+    timer = GenerationTimer()
+    set_active_timer(timer)
+    try:
+        with span("patch", file=profile_path):
+            return _patch_easy_quest_xml(sessions, profile_path, output_path or profile_path, workers)
+    finally:
+        set_active_timer(None)
+        dump_generation_timing(timer, trace_path=trace_path)
+
+def _patch_easy_quest_xml(sessions: List[ZoneSession], profile_path: str, output_path: str, workers: int) -> Dict[str, int]:
+    db = Database()
+    ET.register_namespace('xsi', XSI_URL)
+    ET.register_namespace('xsd', XSD_URL)
+
+    exists = os.path.exists(profile_path)
+    index = index_profile(profile_path) if exists else ProfileIndex()
+    manifest = load_manifest(manifest_path_for(profile_path)) if exists else {}
+
+    session_quests = load_session_quests(db, sessions)
+    all_selected = {q.entry for _, selected in session_quests for q in selected}
+    relations = resolve_relations(db, session_quests)
+    with span("objectives"):
+        quest_objectives = get_objectives_for_quests(db, list(all_selected))
+    quest_types = {q.entry: determine_quest_type(db, q, quest_objectives[q.entry])
+                   for _, selected in session_quests for q in selected}
+
+    with generation_pool(db, workers) as (executor, pool):
+        with span("resolve_targets"):
+            quest_targets = resolve_quest_targets(db, quest_objectives, executor, pool, prefetch=False)
+        group_of = target_group_index(quest_targets)
+        world, questie = db.fingerprint(), questie_fingerprint()
+
+        # Записи в порядке генерации: квесты сессии, затем ее гринд и маршрут
+        items: List[Dict[str, Any]] = []
+        for session, selected in session_quests:
+            for q in selected:
+                name = f"{clean_name(q.title)}{q.entry}"
+                steps = ['PickUp'] + (['Pulse'] if quest_types[q.entry] != "None" else []) + ['TurnIn']
+                # Входы квеста: он сам, цели и связи его группы общих целей (от них зависят хотспоты)
+                inputs = {'quest': q.entry, 'title': q.title, 'type': quest_types[q.entry], 'objectives': quest_objectives[q.entry]}
+                context = [[g, quest_targets[g], relations.get(g)] for g in group_of[q.entry]]
+                items.append({'id': f"quest:{q.entry}", 'name': name, 'quest': q,
+                              'key': session_cache_key(inputs, world, questie, context),
+                              'sorted': [ET.Element("QuestsSorted", Action=a, NameClass=name) for a in steps]})
+            # Гринд и маршрут строятся сразу — ключом служит их содержимое
+            extras = ET.Element("EasyQuests")
+            add_grind_to_xml(extras, session, XSI_URL)
+            add_follow_path_to_xml(extras, session, XSI_URL)
+            for eq in extras:
+                name = eq.findtext('Name')
+                items.append({'id': f"name:{name}", 'name': name, 'element': eq, 'key': element_digest(eq),
+                              'sorted': [ET.Element("QuestsSorted", Action="Pulse", NameClass=name)]})
+
+        actions = {item['id']: decide(item['key'], index.easy_quests.get(item['id'], {}).get('digest'), manifest.get(item['id']))
+                   for item in items}
+        for item_id, entry in index.easy_quests.items():
+            if item_id not in actions:
+                actions[item_id] = decide(None, entry['digest'], manifest.get(item_id))
+
+        rebuild = {item['quest'].entry for item in items if 'quest' in item and actions[item['id']] in (REPLACE, ADD)}
+        # Хотспоты квеста зависят от всей его группы общих целей — считаем группы целиком
+        shared_hotspots = build_shared_hotspots(db, relations, quest_targets, {g for q in rebuild for g in group_of[q]},
+                                                executor, pool)
+
+    with span("build_quests"):
+        npc_quests = NpcQuestMap()
+        for item in items:
+            q = item.get('quest')
+            if q is None or q.entry not in rebuild: continue
+            node = ET.Element("EasyQuests")
+            add_quest_to_xml(node, q, quest_objectives[q.entry], quest_types[q.entry], db, relations, XSI_URL,
+                             quest_targets[q.entry], shared_hotspots.get(q.entry))
+            item['element'] = node[0]
+            npc_quests.add_quest(q.entry, relations.get(q.entry))
+    changed_quests = rebuild | {int(i.split(':', 1)[1]) for i, a in actions.items() if a == REMOVE and i.startswith('quest:')}
+
+    registry = NPCRegistry()
+    for session, selected in session_quests:
+        for n in session_logistics(db, relations, session, selected):
+            registry.add_npc(n)
+    npc_items = []
+    for n in registry.get_all():
+        elem = build_npc_element(n)
+        npc_items.append({'id': f"npc:{n['Id']}", 'element': elem, 'key': element_digest(elem)})
+    for item in npc_items:
+        actions[item['id']] = decide(item['key'], index.npcs.get(item['id']), manifest.get(item['id']))
+    for item_id, digest in index.npcs.items():
+        if item_id not in actions:
+            actions[item_id] = decide(None, digest, manifest.get(item_id))
+
+    script = generate_csharp_script(sessions, db)
+    encoding = index.encoding if exists else 'utf-16'
+    tmp_path = output_path + '.tmp'
+    with span("write"):
+        source = open(profile_path, 'r', encoding=index.encoding) if exists else io.StringIO(_skeleton(script))
+        try:
+            with open(tmp_path, 'w', encoding=encoding) as f:
+                writer = XmlStreamWriter(f, "EasyQuestProfile", {'xsi': XSI_URL, 'xsd': XSD_URL})
+                ProfilePatcher(writer, index, items, npc_items, actions, npc_quests, changed_quests).write(source)
+        finally:
+            source.close()
+        os.replace(tmp_path, output_path)
+
+    # Что генератор теперь считает своим: новые и пересобранные записи с их содержимым, прочие — как было
+    records = {i: manifest[i] for i, a in actions.items() if a != REMOVE and i in manifest}
+    for item in items + npc_items:
+        if actions[item['id']] in (REPLACE, ADD):
+            records[item['id']] = {'key': item['key'], 'digest': element_digest(item['element'])}
+    save_manifest(manifest_path_for(output_path), records)
+
+    counts = {a: 0 for a in (KEEP, MANUAL, REPLACE, ADD, REMOVE, SKIP)}
+    for action in actions.values():
+        counts[action] += 1
+    logger.info("Обновление профиля " + output_path + ": " + ", ".join(f"{a} {n}" for a, n in counts.items()))
+    dump_generation_stats(db.stats)
+    db.close()
+    return counts
@@ -0,0 +1,80 @@
+# exporter/session_cache.py
+import gzip
+import hashlib
+import json
+import os
+from typing import Dict, Any, List, Optional
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Версия формата и логики: при изменении вывода сессии (XML, хотспоты, логистика) увеличить — кэш сбросится
+SESSION_CACHE_VERSION = 1
+SESSION_CACHE_DIR = os.path.join('cache', 'sessions')
+# Сколько файлов держать на диске (старые по времени изменения удаляются)
+SESSION_CACHE_MAX_FILES = 500
+
+# Готовые результаты в памяти: повторная генерация из UI не читает диск
+_SESSION_CACHE: Dict[str, Dict[str, Any]] = {}
+
+def session_cache_key(session: Dict[str, Any], world: str, questie: str, context: List[Any]) -> str:
+    """
+    sha256 входов сессии: dict ZoneSession, отпечаток БД, хэш файлов Questie и контекст —
+    цели и связи квестов, с которыми у сессии общие хотспоты (в том числе из других вкладок).
+    """
+    payload = json.dumps({'version': SESSION_CACHE_VERSION, 'session': session, 'world': world,
+                          'questie': questie, 'context': context}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _entry_path(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{key}.json.gz")
+
+def load_session_output(key: str, cache_dir: str = SESSION_CACHE_DIR) -> Optional[Dict[str, Any]]:
+    """{'easy_quests': [XML-фрагменты], 'npcs': [NPC логистики]} или None."""
+    entry = _SESSION_CACHE.get(key)
+    if entry is not None:
+        return entry
+    path = _entry_path(key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Кэш сессии {path} не читается ({e}), сессия будет пересчитана")
+        return None
+    if entry.get('version') != SESSION_CACHE_VERSION:
+        return None
+    _SESSION_CACHE[key] = entry
+    return entry
+
+def save_session_output(key: str, easy_quests: List[str], npcs: List[Dict[str, Any]], cache_dir: str = SESSION_CACHE_DIR):
+    entry = {'version': SESSION_CACHE_VERSION, 'easy_quests': easy_quests, 'npcs': npcs}
+    _SESSION_CACHE[key] = entry
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _entry_path(key, cache_dir)
+        tmp_path = path + '.tmp'
+        # Decimal из MySQL -> float: в XML координаты все равно форматируются через float
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, default=float)
+        os.replace(tmp_path, path)
+        _prune(cache_dir)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить кэш сессии: {e}")
+
+def _prune(cache_dir: str, max_files: int = SESSION_CACHE_MAX_FILES):
+    files = [os.path.join(cache_dir, n) for n in os.listdir(cache_dir) if n.endswith('.json.gz')]
+    if len(files) <= max_files:
+        return
+    files.sort(key=os.path.getmtime)
+    for path in files[:len(files) - max_files]:
+        os.remove(path)
+
+def clear_session_cache(cache_dir: Optional[str] = None):
+    """Сбрасывает кэш в памяти; с cache_dir — и файлы на диске."""
+    _SESSION_CACHE.clear()
+    if cache_dir and os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.endswith('.json.gz'):
+                os.remove(os.path.join(cache_dir, name))
@@ -0,0 +1,139 @@
+# exporter/split_output.py
+# Несколько профилей из одного прохода разрешения: по сессиям, уровневым диапазонам, континентам.
+import os
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
+
+from core.db import Database
+from core.logger import get_logger
+from core.query_stats import dump_generation_stats
+from core.timing import GenerationTimer, set_active_timer, span, dump_generation_timing
+from core.coord_converter import get_zone_continent
+from core.models import Quest
+from logic.session_manager import ZoneSession
+from exporter.easy_quest_xml import (
+    GENERATION_WORKERS, XSI_URL, XSD_URL, resolve_sessions, write_profile,
+)
+
+logger = get_logger(__name__)
+
+# Ключи разбивки; в имени файла части идут в порядке, заданном в спецификации ("bracket+continent" -> "58 - 67 Outland")
+SPLIT_KEYS = ('session', 'bracket', 'continent')
+DEFAULT_BRACKET_WIDTH = 10
+
+@dataclass
+class SplitSpec:
+    by: List[str]
+    # Явные диапазоны уровней; пусто — диапазоны по bracket_width (1-10, 11-20, ...)
+    brackets: List[Tuple[int, int]] = field(default_factory=list)
+    bracket_width: int = DEFAULT_BRACKET_WIDTH
+
+def parse_brackets(text: str) -> List[Tuple[int, int]]:
+    """'58-67,68-70' -> [(58, 67), (68, 70)]."""
+    brackets = []
+    for chunk in filter(None, (c.strip() for c in text.split(','))):
+        low, sep, high = chunk.partition('-')
+        if not sep or not low.strip().isdigit() or not high.strip().isdigit() or int(low) > int(high):
+            raise ValueError(f"Неверный диапазон уровней '{chunk}', ожидается 'мин-макс'")
+        brackets.append((int(low), int(high)))
+    return brackets
+
+def parse_split_spec(text: str, brackets: Optional[str] = None, bracket_width: int = DEFAULT_BRACKET_WIDTH) -> SplitSpec:
+    """'bracket+continent' (+ диапазоны '58-67,68-70') -> SplitSpec."""
+    by = [k.strip() for k in text.split('+') if k.strip()]
+    unknown = [k for k in by if k not in SPLIT_KEYS]
+    if not by or unknown:
+        raise ValueError(f"Неизвестная разбивка '{text}', ожидаются ключи {SPLIT_KEYS} через '+'")
+    if bracket_width < 1:
+        raise ValueError("Ширина диапазона уровней должна быть >= 1")
+    return SplitSpec(by, parse_brackets(brackets) if brackets else [], bracket_width)
+
+def quest_level(quest: Quest) -> int:
+    return quest.quest_level if quest.quest_level > 0 else quest.min_level
+
+def bracket_of(level: int, spec: SplitSpec) -> Optional[Tuple[int, int]]:
+    if spec.brackets:
+        return next((b for b in spec.brackets if b[0] <= level <= b[1]), None)
+    low = (max(level, 1) - 1) // spec.bracket_width * spec.bracket_width + 1
+    return (low, low + spec.bracket_width - 1)
+
+def continent_of(session: ZoneSession) -> str:
+    """Континент по географии (стартовые зоны Blood Elf/Draenei — в Азероте, хотя лежат на карте 530)."""
+    return get_zone_continent(session.zone_id) or "Unknown"
+
+def safe_file_name(name: str) -> str:
+    return re.sub(r'[<>:"/\\|?*]', '_', name).strip() or "profile"
+
+def split_parts(parts: List[Dict[str, Any]], spec: SplitSpec) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Части resolve_sessions -> {метка файла: части}. По диапазонам сессия делится по уровню квестов;
+    гринд и маршрут сессии попадают в диапазон ее последнего квеста, логистика — во все ее файлы.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for index, part in enumerate(parts):
+        session = part['session']
+        labels = {'session': f"{index + 1:02d} {session.zone_name}"}
+        if 'continent' in spec.by:
+            labels['continent'] = continent_of(session)
+
+        if 'bracket' in spec.by:
+            by_bracket: Dict[Tuple[int, int], List[Quest]] = {}
+            for q in part['quests']:
+                bracket = bracket_of(quest_level(q), spec)
+                if bracket is None:
+                    logger.warning(f"Квест {q.entry} (уровень {quest_level(q)}) вне диапазонов разбивки — пропущен")
+                    continue
+                by_bracket.setdefault(bracket, []).append(q)
+            if part['quests']:
+                extras_bracket = bracket_of(quest_level(part['quests'][-1]), spec)
+            else:
+                extras_bracket = bracket_of(session.grind_settings.target_level, spec)
+            if extras_bracket is not None:
+                by_bracket.setdefault(extras_bracket, [])
+            subparts = [(f"{low} - {high}", dict(part, quests=quests, extras=(low, high) == extras_bracket, cached=None, cache_key=None))
+                        for (low, high), quests in by_bracket.items()]
+        else:
+            subparts = [(None, part)]
+
+        for bracket_label, subpart in subparts:
+            labels['bracket'] = bracket_label
+            label = safe_file_name(" ".join(labels[k] for k in spec.by))
+            groups.setdefault(label, []).append(subpart)
+    return groups
+
+def generate_split_profiles(sessions: List[ZoneSession], spec: SplitSpec, output_dir: str, workers: int = GENERATION_WORKERS,
+                            trace_path: Optional[str] = None, use_cache: bool = True) -> List[str]:
+    """
+    Профиль на каждую группу разбивки. Квесты, связи, цели, хотспоты и логистика разрешаются один раз
+    для всех сессий (хотспоты — как в общем профиле), файлы пишутся из общих данных. Возвращает пути.
+    """
+    timer = GenerationTimer()
+    set_active_timer(timer)
+    try:
+        with span("generate_split", dir=output_dir):
+            return _generate_split_profiles(sessions, spec, output_dir, workers, use_cache)
+    finally:
+        set_active_timer(None)
+        dump_generation_timing(timer, trace_path=trace_path)
+
+def _generate_split_profiles(sessions: List[ZoneSession], spec: SplitSpec, output_dir: str, workers: int, use_cache: bool) -> List[str]:
+    db = Database()
+    ET.register_namespace('xsi', XSI_URL)
+    ET.register_namespace('xsd', XSD_URL)
+    # Кэш хранит вывод сессии целиком — при делении сессий по уровням он не подходит
+    resolved, parts = resolve_sessions(db, sessions, workers, use_cache and 'bracket' not in spec.by)
+    groups = split_parts(parts, spec)
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for label, group in groups.items():
+        path = os.path.join(output_dir, f"{label}.xml")
+        group_sessions = list({id(p['session']): p['session'] for p in group}.values())
+        write_profile(path, group, resolved, group_sessions)
+        logger.info(f"Профиль {path}: {sum(len(p['quests']) for p in group)} квестов")
+        paths.append(path)
+    dump_generation_stats(db.stats)
+    db.close()
+    return paths
@@ -0,0 +1,21 @@
+# exporter/world_caches.py
+# Кэши данных мира, которые живут весь процесс: сброс после изменения БД или Questie без перезапуска.
+from core.db_backends import clear_world_fingerprints
+from core.lua_loader import clear_questie_cache
+from data_access.quest_table import clear_quest_table
+from data_access.spawns_repo import clear_spawn_cache
+from logic.loot_index import clear_loot_index
+from logic.quest_graph import clear_quest_graph
+from logic.service_npcs import clear_service_npc_index
+from exporter.session_cache import clear_session_cache
+
+def clear_generation_caches():
+    """Все кэши мира в памяти — следующая генерация идет «с холодного старта» (индекс лута на диске остается)."""
+    clear_questie_cache()
+    clear_quest_table()
+    clear_quest_graph()
+    clear_loot_index()
+    clear_spawn_cache()
+    clear_service_npc_index()
+    clear_session_cache()
+    clear_world_fingerprints()
@@ -0,0 +1,79 @@
+# exporter/xml_writer.py
+import xml.etree.ElementTree as ET
+from typing import Dict, TextIO, Optional
+
+def indent(elem, level=0):
+    """Функция для красивого форматирования XML без использования minidom (который ломает текст)."""
+    i = "\n" + level*"  "
+    if len(elem):
+        if not elem.text or not elem.text.strip():
+            elem.text = i + "  "
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+        for elem in elem:
+            indent(elem, level+1)
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+    else:
+        if level and (not elem.tail or not elem.tail.strip()):
+            elem.tail = i
+
+class XmlStreamWriter:
+    """
+    Пишет документ прямо в поток: корень, секции первого уровня и их элементы по одному.
+    В памяти держится только текущий элемент. Отступы и пространства имен — те же,
+    что дают indent() + ET.tostring для целого дерева с корнем, объявляющим namespaces.
+    """
+    def __init__(self, stream: TextIO, root_tag: str, namespaces: Dict[str, str]):
+        self.stream = stream
+        self.root_tag = root_tag
+        self.namespaces = namespaces
+        self._section: Optional[str] = None
+        self._section_size = 0
+
+    def start_document(self):
+        ns = "".join(f' xmlns:{prefix}="{uri}"' for prefix, uri in self.namespaces.items())
+        self.stream.write(f'<?xml version="1.0" encoding="utf-16"?>\n<{self.root_tag}{ns}>')
+
+    def end_document(self):
+        self.stream.write(f"\n</{self.root_tag}>\n")
+
+    def _serialize(self, elem, level: int) -> str:
+        indent(elem, level)
+        elem.tail = None
+        xml = ET.tostring(elem, encoding='unicode')
+        # Namespaces уже объявлены на корне — ET повторил бы их на первом теге фрагмента
+        head, sep, rest = xml.partition('>')
+        for prefix, uri in self.namespaces.items():
+            head = head.replace(f' xmlns:{prefix}="{uri}"', '', 1)
+        return head + sep + rest
+
+    def element(self, elem):
+        """Готовая секция первого уровня целиком (маленькие секции: Script, Blackspots...)."""
+        self.stream.write("\n  " + self._serialize(elem, 1))
+
+    def start_section(self, tag: str):
+        self._section = tag
+        self._section_size = 0
+
+    def fragment(self, elem) -> str:
+        """Элемент секции в том виде, в каком его пишет child (для кэша готовых фрагментов)."""
+        return self._serialize(elem, 2)
+
+    def child(self, elem):
+        """Очередной элемент открытой секции."""
+        self.child_xml(self.fragment(elem))
+
+    def child_xml(self, xml: str):
+        """Готовый фрагмент из fragment()."""
+        if self._section_size == 0:
+            self.stream.write(f"\n  <{self._section}>")
+        self.stream.write("\n    " + xml)
+        self._section_size += 1
+
+    def end_section(self):
+        if self._section_size:
+            self.stream.write(f"\n  </{self._section}>")
+        else:
+            self.stream.write(f"\n  <{self._section} />")
+        self._section = None
@@ -0,0 +1,117 @@
+# logic/bracket_builder.py
+# Автосборка профиля по (фракция, диапазон уровней, континент): зоны и квесты без ручного выбора во вкладках.
+import heapq
+import statistics
+from typing import List, Dict, Set
+
+from core.db import Database
+from core.logger import get_logger
+from core.models import Quest
+from core.coord_converter import get_continent_zone_ids
+from data_access.quest_table import get_quest_table, races_allowed
+from data_access.zones_repo import get_zone_name
+from logic.faction_filter import get_faction_mask
+from logic.quest_graph import get_quest_graph, QuestGraph
+from logic.quest_sorter import sort_quests_with_dependencies
+from logic.session_manager import ZoneSession
+
+logger = get_logger(__name__)
+
+def bracket_profile_name(min_level: int, max_level: int, continent: str) -> str:
+    """Имя как у библиотечных профилей: '58 - 67 Outland'."""
+    return f"{min_level} - {max_level} {continent}"
+
+def select_bracket_quests(db: Database, faction: str, min_level: int, max_level: int, continent: str) -> List[Quest]:
+    """
+    Квесты фракции с QuestLevel в [min_level, max_level] в зонах континента — одна векторная выборка QuestTable.
+    Квест остается, только если его пре-квесты (все обязательные и один из preQuestSingle) выбраны или заведомо
+    выполнены раньше (уровнем ниже диапазона); пре-квесты другой фракции и неизвестные не требуются.
+    """
+    table = get_quest_table(db)
+    race_mask = get_faction_mask(faction)
+    zone_ids = get_continent_zone_ids(continent)
+    if not zone_ids:
+        raise ValueError(f"Неизвестный континент '{continent}'")
+    candidates = table.quests(table.mask(zone_ids=zone_ids, race_mask=race_mask, min_level=min_level, max_level=max_level))
+
+    # Уровни квестов, доступных фракции, — для проверки пре-квестов вне выборки
+    d = table.data
+    allowed = races_allowed(d['required_races'], race_mask)
+    faction_levels: Dict[int, int] = dict(zip(d['entry'][allowed].tolist(), d['quest_level'][allowed].tolist()))
+
+    graph = get_quest_graph(db)
+    selected = {q.entry for q in candidates}
+
+    def satisfied(parent: int) -> bool:
+        if parent in selected: return True
+        level = faction_levels.get(parent)
+        return level is None or level < min_level
+
+    # Отбрасывание квеста может сделать недоступными его потомков — до неподвижной точки
+    pending = list(selected)
+    while pending:
+        dropped = [q for q in pending if q in selected and not graph.prerequisites_met(q, satisfied)]
+        selected.difference_update(dropped)
+        pending = [c for q in dropped for c in graph.get_children(q) if c in selected]
+    if len(selected) < len(candidates):
+        logger.info(f"Авто-профиль: {len(candidates) - len(selected)} квестов без доступных пре-квестов исключено")
+    return [q for q in candidates if q.entry in selected]
+
+def order_zones(zone_quests: Dict[int, List[Quest]], graph: QuestGraph) -> List[int]:
+    """
+    Порядок зон: по медиане уровня квестов, но зона с пре-квестами другой зоны идет после нее.
+    При циклической зависимости зон первой берется зона с меньшим уровнем.
+    """
+    zone_of = {q.entry: z for z, quests in zone_quests.items() for q in quests}
+    level = {z: (statistics.median(q.quest_level for q in quests), z) for z, quests in zone_quests.items()}
+    after: Dict[int, Set[int]] = {z: set() for z in zone_quests}
+    in_degree = {z: 0 for z in zone_quests}
+    for entry, z in zone_of.items():
+        for parent in graph.ancestors(entry):
+            pz = zone_of.get(parent)
+            if pz is not None and pz != z and z not in after[pz]:
+                after[pz].add(z)
+                in_degree[z] += 1
+
+    order, done = [], set()
+    heap = [level[z] for z, n in in_degree.items() if n == 0]
+    heapq.heapify(heap)
+    while len(order) < len(zone_quests):
+        if not heap:
+            # Цикл: снимаем зону с наименьшим уровнем из оставшихся
+            z = min((level[z] for z in zone_quests if z not in done))[1]
+            logger.warning(f"Зоны с взаимными пре-квестами, зона {z} берется по уровню")
+            heapq.heappush(heap, level[z])
+            in_degree[z] = 0
+        _, z = heapq.heappop(heap)
+        if z in done: continue
+        done.add(z)
+        order.append(z)
+        for nxt in after[z]:
+            in_degree[nxt] -= 1
+            if in_degree[nxt] == 0 and nxt not in done:
+                heapq.heappush(heap, level[nxt])
+    return order
+
+def build_bracket_sessions(db: Database, faction: str, min_level: int, max_level: int, continent: str) -> List[ZoneSession]:
+    """
+    Набор ZoneSession для профиля диапазона: зоны континента в порядке уровня (и межзонных зависимостей),
+    в каждой — доступные квесты в порядке выполнения (sort_quests_with_dependencies).
+    """
+    if min_level > max_level:
+        raise ValueError(f"Неверный диапазон уровней {min_level}-{max_level}")
+    quests = select_bracket_quests(db, faction, min_level, max_level, continent)
+    graph = get_quest_graph(db)
+
+    zone_quests: Dict[int, List[Quest]] = {}
+    for q in quests:
+        zone_quests.setdefault(q.zone_or_sort, []).append(q)
+
+    sessions = []
+    for zone_id in order_zones(zone_quests, graph):
+        ordered = sort_quests_with_dependencies(zone_quests[zone_id], graph)
+        sessions.append(ZoneSession(zone_id=zone_id, zone_name=get_zone_name(zone_id), faction=faction.lower(),
+                                    selected_quest_ids=[q.entry for q in ordered]))
+    logger.info(f"Авто-профиль {bracket_profile_name(min_level, max_level, continent)} ({faction}): "
+                f"{len(quests)} квестов в {len(sessions)} зонах")
+    return sessions
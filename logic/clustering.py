@@ -2,9 +2,13 @@
 import numpy as np
 from sklearn.cluster import DBSCAN
 from core.models import FarmZone
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 def cluster_spawns(spawns: List[Dict[str, float]]) -> List[FarmZone]:
+    return [zone for zone, _ in cluster_spawn_groups(spawns)]
+
+def cluster_spawn_groups(spawns: List[Dict[str, float]]) -> List[Tuple[FarmZone, List[int]]]:
+    """Same as cluster_spawns, but each zone comes with the indices of the spawns it was built from."""
     if not spawns:
         return []
         
@@ -37,24 +41,24 @@ def cluster_spawns(spawns: List[Dict[str, float]]) -> List[FarmZone]:
         
         map_id = spawns[0]['map'] # Assume same map for cluster
         
-        zones.append(FarmZone(
+        zones.append((FarmZone(
             map_id=map_id,
             center_x=float(center[0]),
             center_y=float(center[1]),
             center_z=float(center_z),
             radius=float(radius)
-        ))
+        ), cluster_indices.tolist()))
 
     # If DBSCAN failed to cluster (too few points), return one big zone
     if not zones and spawns:
          center = np.mean(coords, axis=0)
          center_z = np.mean([float(s['position_z']) for s in spawns])
-         zones.append(FarmZone(
+         zones.append((FarmZone(
             map_id=spawns[0]['map'],
             center_x=float(center[0]),
             center_y=float(center[1]),
             center_z=float(center_z),
             radius=50.0
-         ))
+         ), list(range(len(spawns)))))
 
     return zones
\ No newline at end of file
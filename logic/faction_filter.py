@@ -1,7 +1,10 @@
 # logic/faction_filter.py
+import numpy as np
+from core.db import Database
 from core.logger import get_logger
 from core.models import Quest
-from typing import List
+from data_access.quest_table import get_quest_table, races_allowed
+from typing import List, Optional, Iterable
 
 logger = get_logger(__name__)
 
@@ -34,12 +37,20 @@ def filter_quests_by_faction(quests: List[Quest], mask: int) -> List[Quest]:
     if mask == 0:
         return list(quests)
 
-    filtered = []
-    for q in quests:
-        # Квест подходит, если требований к расе нет (0) 
-        # или есть пересечение битов расы квеста и маски фракции
-        if q.required_races == 0 or (q.required_races & mask) != 0:
-            filtered.append(q)
+    # Та же векторная проверка, что и в QuestTable.mask
+    races = np.fromiter((q.required_races for q in quests), dtype='i4', count=len(quests))
+    keep = races_allowed(races, mask)
+    filtered = [q for q, ok in zip(quests, keep.tolist()) if ok]
 
     logger.info(f"Фильтрация по фракции: {len(quests)} -> {len(filtered)} квестов (маска {mask})")
-    return filtered
\ No newline at end of file
+    return filtered
+
+def get_faction_quests(db: Database, faction: str, zone_ids: Optional[Iterable[int]] = None,
+                       min_level: Optional[int] = None, max_level: Optional[int] = None) -> List[Quest]:
+    """
+    Квесты фракции по набору зон и диапазону QuestLevel одним векторным запросом к QuestTable,
+    например все ордынские квесты 58-62 в Запределье: zone_ids=get_continent_zone_ids('Outland').
+    """
+    table = get_quest_table(db)
+    return table.quests(table.mask(zone_ids=zone_ids, race_mask=get_faction_mask(faction),
+                                   min_level=min_level, max_level=max_level))
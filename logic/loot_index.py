@@ -0,0 +1,159 @@
+# logic/loot_index.py
+import gzip
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Tuple, Optional
+from core.db import Database
+from core.logger import get_logger
+from core.timing import span
+
+logger = get_logger(__name__)
+
+# Версия формата индекса: при изменении расчета шансов увеличить — индекс пересоберется
+LOOT_INDEX_VERSION = 2
+LOOT_INDEX_PATH = os.path.join('cache', 'loot_index.json.gz')
+
+# Доноры сортируются по шансу; берутся первые, пока их суммарный шанс не наберет эту долю от общего
+LOOT_CUMULATIVE_CUTOFF = 0.95
+
+# Вложенность ссылок reference_loot_template (защита от циклов в кривых данных)
+MAX_REFERENCE_DEPTH = 8
+
+LOOT_SOURCES = (('npc', 'creature_loot_template'), ('go', 'gameobject_loot_template'))
+
+_LOOT_INDEX = {'index': None}
+
+def _load_template(db: Database, table: str) -> Dict[int, List[dict]]:
+    rows = db.execute(f"""
+    SELECT entry, item, ChanceOrQuestChance AS chance, groupid, mincountOrRef AS mincount_or_ref
+    FROM {table}
+    """)
+    by_entry = defaultdict(list)
+    for row in rows:
+        by_entry[int(row['entry'])].append(row)
+    return by_entry
+
+def _row_chances(rows: List[dict]) -> List[Tuple[dict, float]]:
+    """
+    Вероятность (0..1), что строка шаблона выпадет за один лут.
+    Отрицательный шанс — квестовый дроп (берется модуль). В группе с нулевым шансом
+    строки делят поровну то, что осталось от явных шансов группы.
+    """
+    result = []
+    groups = defaultdict(list)
+    for row in rows:
+        groups[int(row['groupid'] or 0)].append(row)
+    for group_id, group_rows in groups.items():
+        explicit = sum(abs(float(r['chance'])) for r in group_rows)
+        equal = [r for r in group_rows if float(r['chance']) == 0]
+        equal_share = max(0.0, 100.0 - explicit) / len(equal) if group_id and equal else 0.0
+        for r in group_rows:
+            chance = abs(float(r['chance'])) or equal_share
+            result.append((r, min(chance, 100.0) / 100.0))
+    return result
+
+def _combine(a: float, b: float) -> float:
+    # Независимые броски: шанс получить предмет хотя бы из одного
+    return 1.0 - (1.0 - a) * (1.0 - b)
+
+class _ReferenceExpander:
+    """Разворачивает ссылки reference_loot_template в {item: шанс} с мемоизацией по entry."""
+    def __init__(self, references: Dict[int, List[dict]]):
+        self.references = references
+        self.cache: Dict[int, Dict[int, float]] = {}
+
+    def items(self, rows: List[dict], depth: int = 0) -> Dict[int, float]:
+        items: Dict[int, float] = {}
+        for row, chance in _row_chances(rows):
+            ref = int(row['mincount_or_ref'] or 0)
+            if ref < 0:
+                for item, inner in self.reference(-ref, depth + 1).items():
+                    items[item] = _combine(items.get(item, 0.0), chance * inner)
+            else:
+                item = int(row['item'])
+                items[item] = _combine(items.get(item, 0.0), chance)
+        return items
+
+    def reference(self, ref_entry: int, depth: int) -> Dict[int, float]:
+        if ref_entry in self.cache:
+            return self.cache[ref_entry]
+        if depth > MAX_REFERENCE_DEPTH:
+            logger.warning(f"reference_loot_template {ref_entry}: слишком глубокая вложенность ссылок, пропускаем")
+            return {}
+        items = self.items(self.references.get(ref_entry, []), depth)
+        self.cache[ref_entry] = items
+        return items
+
+def build_loot_index(db: Database) -> Dict[int, List[Tuple[int, str, float]]]:
+    """item -> [(entry донора, 'npc'|'go', эффективный шанс)], по убыванию шанса."""
+    expander = _ReferenceExpander(_load_template(db, 'reference_loot_template'))
+    index = defaultdict(list)
+    for source_type, table in LOOT_SOURCES:
+        for entry, rows in _load_template(db, table).items():
+            for item, chance in expander.items(rows).items():
+                index[item].append((entry, source_type, round(chance, 6)))
+    for sources in index.values():
+        sources.sort(key=lambda s: (-s[2], s[1], s[0]))
+    logger.info(f"Индекс лута: {len(index)} предметов")
+    return dict(index)
+
+def save_loot_index(index: Dict, world: str, path: str = LOOT_INDEX_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump({'version': LOOT_INDEX_VERSION, 'world': world,
+                   'items': {str(k): v for k, v in index.items()}}, f)
+    os.replace(tmp_path, path)
+
+def read_loot_index(world: Optional[str] = None, path: str = LOOT_INDEX_PATH) -> Optional[Dict]:
+    """Читает индекс; None, если его нет, он поврежден, другой версии или собран по другим данным мира (db.fingerprint)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Индекс лута {path} не читается ({e}), будет пересобран")
+        return None
+    if data.get('version') != LOOT_INDEX_VERSION or (world is not None and data.get('world') != world):
+        return None
+    return {int(k): [tuple(s) for s in v] for k, v in data['items'].items()}
+
+def get_loot_index(db: Database, path: str = LOOT_INDEX_PATH) -> Dict[int, List[Tuple[int, str, float]]]:
+    """Индекс из памяти, с диска или собранный из БД (и сохраненный)."""
+    if _LOOT_INDEX['index'] is None:
+        world = db.fingerprint()
+        index = None
+        # При записи фикстуры индекс собирается всегда: его запросы нужны реплею, если индекса на диске не окажется
+        if db.mode != 'record':
+            with span("loot_index_read"):
+                index = read_loot_index(world, path)
+        if index is None:
+            with span("loot_index_build"):
+                index = build_loot_index(db)
+            try:
+                save_loot_index(index, world, path)
+            except OSError as e:
+                logger.warning(f"Не удалось сохранить индекс лута: {e}")
+        _LOOT_INDEX['index'] = index
+    return _LOOT_INDEX['index']
+
+def clear_loot_index():
+    _LOOT_INDEX['index'] = None
+
+def cut_by_cumulative_chance(sources: List[Tuple[int, str, float]], cutoff: float) -> List[Tuple[int, str, float]]:
+    """Первые доноры (по убыванию шанса), дающие долю cutoff от суммарного шанса; минимум один."""
+    total = sum(s[2] for s in sources)
+    if cutoff >= 1.0 or total <= 0:
+        return list(sources)
+    result, acc = [], 0.0
+    for source in sources:
+        result.append(source)
+        acc += source[2]
+        if acc >= cutoff * total:
+            break
+    return result
+
+def get_loot_sources(db: Database, item_id: int, cutoff: float = LOOT_CUMULATIVE_CUTOFF) -> List[Tuple[int, str, float]]:
+    return cut_by_cumulative_chance(get_loot_index(db).get(item_id, []), cutoff)
@@ -1,21 +1,17 @@
 # logic/loot_resolver.py
 from core.db import Database
 from core.logger import get_logger
+from logic.loot_index import get_loot_sources, LOOT_CUMULATIVE_CUTOFF
 from typing import List
 
 logger = get_logger(__name__)
 
-def resolve_loot_to_kills(db: Database, item_id: int) -> List[int]:
+def resolve_loot_to_kills(db: Database, item_id: int, cutoff: float = LOOT_CUMULATIVE_CUTOFF) -> List[int]:
     """
-    Возвращает список creature_entry, которые дропают item_id.
+    Возвращает список creature_entry, которые дропают item_id (с учетом reference_loot_template),
+    по убыванию шанса; доноры с редким дропом отсекаются порогом cutoff.
     """
-    query = """
-    SELECT DISTINCT entry
-    FROM creature_loot_template
-    WHERE item = %s
-    """
-    results = db.execute(query, (item_id,))
-    entries = [row['entry'] for row in results]
+    entries = [entry for entry, source_type, _ in get_loot_sources(db, item_id, cutoff) if source_type == 'npc']
     
     # Можно добавить логирование для отладки
     if entries:
@@ -23,19 +19,13 @@ def resolve_loot_to_kills(db: Database, item_id: int) -> List[int]:
         
     return entries
 
-def resolve_loot_to_gos(db: Database, item_id: int) -> List[int]:
-    """
-    Возвращает список gameobject_entry, которые дропают item_id.
+def resolve_loot_to_gos(db: Database, item_id: int, cutoff: float = LOOT_CUMULATIVE_CUTOFF) -> List[int]:
     """
-    query = """
-    SELECT DISTINCT entry
-    FROM gameobject_loot_template
-    WHERE item = %s
+    Возвращает список gameobject_entry, которые дропают item_id (с учетом reference_loot_template).
     """
-    results = db.execute(query, (item_id,))
-    entries = [row['entry'] for row in results]
+    entries = [entry for entry, source_type, _ in get_loot_sources(db, item_id, cutoff) if source_type == 'go']
     
     if entries:
         logger.info(f"Для item {item_id} найдено {len(entries)} GO-доноров")
         
-    return entries
\ No newline at end of file
+    return entries
@@ -0,0 +1,139 @@
+# logic/quest_graph.py
+from collections import defaultdict
+from typing import Dict, Set, List, Iterable, Optional, FrozenSet, DefaultDict, Callable
+from core.db import Database
+from core.logger import get_logger
+from core.models import Quest
+from core.lua_loader import load_questie_quest_prereqs
+from data_access.quest_table import get_quest_table
+
+logger = get_logger(__name__)
+
+_EMPTY: FrozenSet[int] = frozenset()
+
+# Кэш глобального графа: строится один раз по всей quest_template + Questie
+_QUEST_GRAPH = {'graph': None}
+
+class QuestGraph:
+    """
+    Граф зависимостей квестов. Ребро parent -> child: parent нужно выполнить (или взять) раньше child.
+    Источники: PrevQuestId, NextQuestId, NextQuestInChain и Questie preQuestGroup/preQuestSingle.
+    Для порядка все ребра равны; для доступности квеста preQuestSingle — альтернативы (нужен любой из них),
+    остальные пре-квесты обязательны все (prerequisites_met).
+    Все обходы итеративные — длинные цепочки не упираются в лимит рекурсии.
+    """
+    def __init__(self):
+        self.parents: DefaultDict[int, Set[int]] = defaultdict(set)
+        self.children: DefaultDict[int, Set[int]] = defaultdict(set)
+        # Пре-квесты, нужные все (все источники, кроме preQuestSingle)
+        self.required: DefaultDict[int, Set[int]] = defaultdict(set)
+        # Questie preQuestSingle: достаточно выполнить любой из них
+        self.single: Dict[int, FrozenSet[int]] = {}
+        self._ancestors: Dict[int, FrozenSet[int]] = {}
+        self._chain_ids: Optional[Dict[int, int]] = None
+
+    def add_edge(self, parent: int, child: int, required: bool = True):
+        if parent <= 0 or child <= 0 or parent == child: return
+        if required: self.required[child].add(parent)
+        if parent in self.parents[child]: return
+        self.parents[child].add(parent)
+        self.children[parent].add(child)
+        self._ancestors.clear()
+        self._chain_ids = None
+
+    def add_quest(self, entry: int, prev_quest_id: int = 0, next_quest_id: int = 0, next_quest_in_chain: int = 0):
+        # PrevQuestId < 0: предыдущий квест должен быть лишь взят — порядок от этого не меняется
+        if prev_quest_id: self.add_edge(abs(prev_quest_id), entry)
+        if next_quest_id > 0: self.add_edge(entry, next_quest_id)
+        if next_quest_in_chain > 0: self.add_edge(entry, next_quest_in_chain)
+
+    def add_questie_prereqs(self, prereqs: Dict[int, Dict[str, List[int]]]):
+        for entry, pre in prereqs.items():
+            for parent in pre['group']: self.add_edge(parent, entry)
+            for parent in pre['single']: self.add_edge(parent, entry, required=False)
+            single = frozenset(p for p in pre['single'] if p > 0 and p != entry)
+            if single: self.single[entry] = single
+
+    @classmethod
+    def from_quests(cls, quests: Iterable[Quest]) -> 'QuestGraph':
+        """Локальный граф только по полям переданных квестов (без Questie)."""
+        graph = cls()
+        for q in quests:
+            graph.add_quest(q.entry, q.prev_quest_id, q.next_quest_id, q.next_quest_in_chain)
+        return graph
+
+    def get_parents(self, entry: int) -> Set[int]:
+        return self.parents.get(entry, _EMPTY)
+
+    def get_children(self, entry: int) -> Set[int]:
+        return self.children.get(entry, _EMPTY)
+
+    def prerequisites_met(self, entry: int, done: Callable[[int], bool]) -> bool:
+        """Выполнены (по done) все обязательные пре-квесты и хотя бы один из preQuestSingle, если они есть."""
+        if not all(done(p) for p in self.required.get(entry, _EMPTY)): return False
+        single = self.single.get(entry)
+        return single is None or any(done(p) for p in single)
+
+    def _reachable(self, entry: int, edges: Dict[int, Set[int]]) -> Set[int]:
+        seen: Set[int] = set()
+        stack = list(edges.get(entry, _EMPTY))
+        while stack:
+            node = stack.pop()
+            if node in seen: continue
+            seen.add(node)
+            stack.extend(edges.get(node, _EMPTY))
+        seen.discard(entry)
+        return seen
+
+    def ancestors(self, entry: int) -> FrozenSet[int]:
+        """Транзитивное замыкание пре-квестов (мемоизируется до следующего изменения графа)."""
+        result = self._ancestors.get(entry)
+        if result is None:
+            result = self._ancestors[entry] = frozenset(self._reachable(entry, self.parents))
+        return result
+
+    def descendants(self, entry: int) -> FrozenSet[int]:
+        return frozenset(self._reachable(entry, self.children))
+
+    def chain_id(self, entry: int) -> int:
+        """ID цепочки = минимальный entry в компоненте связности; одиночный квест — сам себе цепочка."""
+        if self._chain_ids is None:
+            self._chain_ids = self._build_chain_ids()
+        return self._chain_ids.get(entry, entry)
+
+    def _build_chain_ids(self) -> Dict[int, int]:
+        # Union-Find по всем ребрам
+        root: Dict[int, int] = {}
+
+        def find(x: int) -> int:
+            root.setdefault(x, x)
+            while root[x] != x:
+                root[x] = root[root[x]]
+                x = root[x]
+            return x
+
+        for parent, children in self.children.items():
+            for child in children:
+                a, b = find(parent), find(child)
+                if a != b:
+                    # Корнем делаем меньший entry — он и будет ID цепочки
+                    root[max(a, b)] = min(a, b)
+        return {node: find(node) for node in root}
+
+def build_quest_graph(db: Database) -> QuestGraph:
+    table = get_quest_table(db)
+    graph = QuestGraph()
+    fields = table.data[['entry', 'prev_quest_id', 'next_quest_id', 'next_quest_in_chain']].tolist()
+    for entry, prev_id, next_id, next_in_chain in fields:
+        graph.add_quest(entry, prev_id, next_id, next_in_chain)
+    graph.add_questie_prereqs(load_questie_quest_prereqs())
+    logger.info(f"Граф зависимостей квестов: {len(graph.children)} квестов с последователями")
+    return graph
+
+def get_quest_graph(db: Database) -> QuestGraph:
+    if _QUEST_GRAPH['graph'] is None:
+        _QUEST_GRAPH['graph'] = build_quest_graph(db)
+    return _QUEST_GRAPH['graph']
+
+def clear_quest_graph():
+    _QUEST_GRAPH['graph'] = None
@@ -0,0 +1,109 @@
+# logic/quest_relations.py
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, List, Optional, Tuple, Set
+from core.db import Database
+from core.logger import get_logger
+from data_access.npc_repo import get_quest_relations_bulk
+from logic.spawn_selector import SpawnSelector
+
+logger = get_logger(__name__)
+
+class QuestRelationResolver:
+    """
+    Стартеры/завершители квестов, загруженные пачкой для всего набора выбранных квестов.
+    Если у сущности несколько спавнов, берется ближайший к опорной точке квеста (центр зоны сессии).
+    """
+    def __init__(self, db: Database):
+        self.db = db
+        self.candidates: Dict[int, Dict[str, List[Dict[str, Any]]]] = {}
+        self.relations: Dict[int, Dict[str, Optional[Dict[str, Any]]]] = {}
+        self.anchors: Dict[int, Tuple[int, float, float]] = {}
+        self.selector = SpawnSelector()
+
+    def resolve(self, quest_ids: List[int]):
+        missing = [q for q in set(quest_ids) if q not in self.candidates]
+        if missing:
+            loaded = get_quest_relations_bulk(self.db, missing)
+            for rels in loaded.values():
+                for rel_key, is_go, _ in NpcQuestMap.TARGETS:
+                    self.selector.add_spawns(rels[rel_key], is_go)
+            self.candidates.update(loaded)
+            logger.info(f"Связи NPC загружены для {len(missing)} квестов")
+
+    def set_anchor(self, quest_ids: List[int], anchor: Optional[Tuple[int, float, float]]):
+        """Опорная точка (map, x, y) для выбора спавнов; первая заданная для квеста сохраняется."""
+        if anchor is None: return
+        for q in quest_ids:
+            self.anchors.setdefault(q, anchor)
+
+    def get(self, quest_id: int) -> Dict[str, Optional[Dict[str, Any]]]:
+        rel = self.relations.get(quest_id)
+        if rel is None:
+            if quest_id not in self.candidates:
+                self.resolve([quest_id])
+            anchor = self.anchors.get(quest_id)
+            rel = self.relations[quest_id] = {
+                rel_key: self.selector.nearest(self.candidates[quest_id][rel_key], is_go, anchor)
+                for rel_key, is_go, _ in NpcQuestMap.TARGETS
+            }
+        return rel
+
+    def starter(self, quest_id: int) -> Optional[Dict[str, Any]]:
+        """Стартер квеста: сначала NPC, затем объект (как get_quest_starter_npc or get_quest_starter_go)."""
+        rel = self.get(quest_id)
+        return rel['starter_npc'] or rel['starter_go']
+
+class NpcQuestMap:
+    """
+    Накопитель секции <NpcQuest>: сущность -> (PickUp, TurnIn) квесты.
+    Сохраняет порядок первого появления сущностей и квестов, дедупликация через множества.
+    """
+    # (ключ связи, это GameObject, действие) — в порядке добавления в XML
+    TARGETS = [
+        ('starter_npc', False, 'PickUp'),
+        ('starter_go', True, 'PickUp'),
+        ('ender_npc', False, 'TurnIn'),
+        ('ender_go', True, 'TurnIn'),
+    ]
+
+    def __init__(self):
+        self.entities: Dict[Tuple[int, bool], Dict[str, Any]] = {}
+
+    def add_quest(self, quest_id: int, relations: Dict[str, Optional[Dict[str, Any]]]):
+        for rel_key, is_go, action in self.TARGETS:
+            target = relations.get(rel_key)
+            if not target: continue
+            key = (target['entity_id'], is_go)
+            entity = self.entities.get(key)
+            if entity is None:
+                entity = self.entities[key] = {
+                    'target': target, 'is_go': is_go,
+                    'PickUp': [], 'TurnIn': [], 'PickUp_set': set(), 'TurnIn_set': set()
+                }
+            seen: Set[int] = entity[f'{action}_set']
+            if quest_id not in seen:
+                seen.add(quest_id)
+                entity[action].append(quest_id)
+
+    def write_section(self, npc_quest_section):
+        """Заполняет <NpcQuest> за один проход."""
+        for nq in self.elements():
+            npc_quest_section.append(nq)
+
+    def elements(self):
+        """Элементы <NPCQuest> по одному (для потоковой записи)."""
+        for (entity_id, is_go), entity in self.entities.items():
+            target = entity['target']
+            nq = ET.Element("NPCQuest", Id=str(entity_id), Name=target['entity_name'], GameObject="true" if is_go else "false")
+            pickups = ET.SubElement(nq, "PickUpQuests")
+            for q in entity['PickUp']:
+                ET.SubElement(pickups, "int").text = str(q)
+            turnins = ET.SubElement(nq, "TurnInQuests")
+            for q in entity['TurnIn']:
+                ET.SubElement(turnins, "int").text = str(q)
+
+            x_str = f"{float(target['x']):.4f}".replace(',', '.')
+            y_str = f"{float(target['y']):.4f}".replace(',', '.')
+            z_str = f"{float(target['z']):.4f}".replace(',', '.')
+            ET.SubElement(nq, "Position", X=x_str, Y=y_str, Z=z_str)
+            yield nq
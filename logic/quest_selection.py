@@ -0,0 +1,79 @@
+# logic/quest_selection.py
+from typing import List, Dict, Iterable, Optional
+from core.models import Quest
+from logic.quest_graph import QuestGraph
+from logic.quest_sorter import sort_quests_with_dependencies
+
+class QuestSelection:
+    """
+    Выбор квестов вкладки зоны: множество выбранных, заполненность цепочек и порядок выполнения.
+    Переключение квеста стоит O(затронутых) — дерево целиком не обходится.
+    Порядок совпадает с sort_quests_with_dependencies по выбранным: квест без связей с выбранными
+    вставляется/удаляется точечно, иначе порядок пересчитывается по выбранным при следующем запросе.
+    """
+    def __init__(self, quests: List[Quest], chains: List[List[int]], graph: Optional[QuestGraph] = None):
+        self.quest_map: Dict[int, Quest] = {q.entry: q for q in quests}
+        self.graph = graph if graph is not None else QuestGraph.from_quests(quests)
+        self.chains = chains
+        self.chain_of: Dict[int, int] = {entry: idx for idx, chain in enumerate(chains) for entry in chain}
+        self.chain_selected: List[int] = [0] * len(chains)
+        self.selected: Dict[int, None] = {}  # dict как упорядоченное множество
+        self._order: List[int] = []
+        self._dirty = False
+
+    def is_selected(self, entry: int) -> bool:
+        return entry in self.selected
+
+    def chain_complete(self, chain_idx: int) -> bool:
+        return self.chain_selected[chain_idx] == len(self.chains[chain_idx])
+
+    def _has_selected_relatives(self, entry: int) -> bool:
+        if not self.graph.ancestors(entry).isdisjoint(self.selected): return True
+        return not self.graph.descendants(entry).isdisjoint(self.selected)
+
+    def _sort_key(self, entry: int):
+        q = self.quest_map[entry]
+        return (q.min_level, q.quest_level, q.entry)
+
+    def set_selected(self, entries: Iterable[int], value: bool) -> List[int]:
+        """Ставит/снимает выбор. Возвращает индексы цепочек, у которых изменилась заполненность."""
+        touched = []
+        for entry in entries:
+            if entry not in self.quest_map or (entry in self.selected) == value: continue
+            if value:
+                self.selected[entry] = None
+                self._insert(entry)
+            else:
+                del self.selected[entry]
+                self._remove(entry)
+            idx = self.chain_of.get(entry)
+            if idx is not None:
+                self.chain_selected[idx] += 1 if value else -1
+                touched.append(idx)
+        return touched
+
+    def _insert(self, entry: int):
+        if self._dirty: return
+        if self._has_selected_relatives(entry):
+            self._dirty = True
+            return
+        # Несвязанный квест Кан вынимает из кучи на первом шаге, где его ключ меньше вынутого
+        key = self._sort_key(entry)
+        pos = next((i for i, e in enumerate(self._order) if key < self._sort_key(e)), len(self._order))
+        self._order.insert(pos, entry)
+
+    def _remove(self, entry: int):
+        if self._dirty: return
+        if self._has_selected_relatives(entry):
+            self._dirty = True
+            return
+        # Несвязанный квест никого не блокирует — остальной порядок не меняется
+        self._order.remove(entry)
+
+    def ordered_ids(self) -> List[int]:
+        """Выбранные квесты в порядке выполнения (как в итоговом профиле)."""
+        if self._dirty:
+            quests = [self.quest_map[e] for e in self.selected]
+            self._order = [q.entry for q in sort_quests_with_dependencies(quests, self.graph)]
+            self._dirty = False
+        return list(self._order)
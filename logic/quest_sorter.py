@@ -1,32 +1,38 @@
 # logic/quest_sorter.py
 import heapq
-from typing import List, Dict, Set, DefaultDict
+from typing import List, Dict, Set, DefaultDict, Optional
 from collections import defaultdict
 from core.models import Quest
 from core.logger import get_logger
+from logic.quest_graph import QuestGraph
 
 logger = get_logger(__name__)
 
-def sort_quests_with_dependencies(quests: List[Quest]) -> List[Quest]:
+def sort_quests_with_dependencies(quests: List[Quest], graph: Optional[QuestGraph] = None) -> List[Quest]:
     """
     Сортирует список квестов так, чтобы преквесты всегда шли ПЕРЕД следующими квестами.
     Использует топологическую сортировку с приоритетной очередью по уровню.
+    С глобальным графом (get_quest_graph) учитываются и зависимости через квесты вне списка
+    (например, пре-квест из другой зоны между двумя выбранными).
     """
     if not quests:
         return []
 
+    if graph is None:
+        graph = QuestGraph.from_quests(quests)
+
     # 1. Создаем карту для быстрого доступа по ID
     quest_map = {q.entry: q for q in quests}
     selected_ids = set(quest_map.keys())
 
-    # 2. Строим граф зависимостей (Adjacency List)
-    graph: DefaultDict[int, List[int]] = defaultdict(list)
+    # 2. Строим граф зависимостей внутри списка: предки квеста из транзитивного замыкания
+    graph_edges: DefaultDict[int, List[int]] = defaultdict(list)
     in_degree: Dict[int, int] = {q_id: 0 for q_id in selected_ids}
 
     for q in quests:
-        parent_id = q.prev_quest_id
-        if parent_id > 0 and parent_id in selected_ids:
-            graph[parent_id].append(q.entry)
+        for parent_id in graph.ancestors(q.entry) & selected_ids:
+            if parent_id == q.entry: continue
+            graph_edges[parent_id].append(q.entry)
             in_degree[q.entry] += 1
 
     # 3. Инициализируем приоритетную очередь квестами без зависимостей
@@ -44,8 +50,8 @@ def sort_quests_with_dependencies(quests: List[Quest]) -> List[Quest]:
         min_lvl, q_lvl, current_id = heapq.heappop(priority_queue)
         sorted_result.append(quest_map[current_id])
 
-        if current_id in graph:
-            for child_id in graph[current_id]:
+        if current_id in graph_edges:
+            for child_id in graph_edges[current_id]:
                 in_degree[child_id] -= 1
                 if in_degree[child_id] == 0:
                     child = quest_map[child_id]
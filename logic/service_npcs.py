@@ -0,0 +1,143 @@
+# logic/service_npcs.py
+import math
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple, DefaultDict
+from core.db import Database
+from core.logger import get_logger
+from core.coord_converter import get_zone_bounds, get_zone_dimensions, is_coords_in_bounds
+from data_access.npc_repo import get_service_npc_spawns
+
+logger = get_logger(__name__)
+
+# Размер ячейки сетки в ярдах
+GRID_CELL_SIZE = 250.0
+
+# Кэш индексов по картам: мир в БД не меняется за время работы приложения
+_SERVICE_NPC_INDEX: Dict[int, 'ServiceNpcIndex'] = {}
+
+def resolve_trainer_type(subname: str) -> str:
+    """
+    Определяет точный тип тренера для wRobot на основе SubName (подзаголовка NPC).
+    wRobot требует точные типы: RogueTrainer, WarriorTrainer и т.д.
+    Если тип не найден, возвращает 'None', чтобы избежать краша.
+    """
+    if not subname:
+        return "None"
+
+    s = subname.lower()
+    if "rogue" in s: return "RogueTrainer"
+    if "warrior" in s: return "WarriorTrainer"
+    if "paladin" in s: return "PaladinTrainer"
+    if "hunter" in s: return "HunterTrainer"
+    if "priest" in s: return "PriestTrainer"
+    if "shaman" in s: return "ShamanTrainer"
+    if "mage" in s: return "MageTrainer"
+    if "warlock" in s: return "WarlockTrainer"
+    if "druid" in s: return "DruidTrainer"
+    if "demon" in s and "hunter" in s: return "DemonHunterTrainer" # На будущее
+    if "death" in s and "knight" in s: return "DeathKnightTrainer" # WotLK
+
+    # Можно добавить профессии, если wRobot их поддерживает в этом списке
+    # Но для безопасности пока возвращаем None для всего остального
+    return "None"
+
+def _is_placeholder_name(name: Optional[str]) -> bool:
+    return bool(name) and name.startswith('[') and name.endswith(']')
+
+class ServiceNpcIndex:
+    """
+    Все сервисные NPC одной карты (тренеры, вендоры, ремонт, мастера полетов) в сетке GRID_CELL_SIZE.
+    Строки хранятся в порядке guid, выборки по зоне/радиусу возвращают их в том же порядке.
+    """
+    def __init__(self, map_id: int, rows: List[Dict[str, Any]]):
+        self.map_id = map_id
+        self.rows = rows
+        self.grid: DefaultDict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, row in enumerate(rows):
+            row['TrainerType'] = resolve_trainer_type(row['SubName']) if row['NpcFlags'] & 16 else "None"
+            self.grid[self._cell(row['position_x'], row['position_y'])].append(i)
+
+    @staticmethod
+    def _cell(x: float, y: float) -> Tuple[int, int]:
+        return int(math.floor(x / GRID_CELL_SIZE)), int(math.floor(y / GRID_CELL_SIZE))
+
+    def _in_rect(self, min_x: float, max_x: float, min_y: float, max_y: float) -> List[int]:
+        cx0, cy0 = self._cell(min_x, min_y)
+        cx1, cy1 = self._cell(max_x, max_y)
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for i in self.grid.get((cx, cy), ()):
+                    row = self.rows[i]
+                    if min_x <= row['position_x'] <= max_x and min_y <= row['position_y'] <= max_y:
+                        found.append(i)
+        return sorted(found)
+
+    def query(self, flag_mask: int, indices: Optional[List[int]] = None, skip_placeholders: bool = True) -> List[Dict[str, Any]]:
+        """Фильтр по флагам; skip_placeholders отбрасывает служебных NPC с именем '[...]' (как Name NOT LIKE '[%]')."""
+        rows = self.rows if indices is None else [self.rows[i] for i in indices]
+        return [
+            r for r in rows
+            if r['NpcFlags'] & flag_mask and not (skip_placeholders and _is_placeholder_name(r['Name']))
+        ]
+
+    def in_zone(self, zone_id: int, flag_mask: int, skip_placeholders: bool = True) -> List[Dict[str, Any]]:
+        """NPC в границах зоны (с тем же буфером, что и is_coords_in_bounds)."""
+        bounds = get_zone_bounds(zone_id)
+        if not bounds:
+            return self.query(flag_mask, skip_placeholders=skip_placeholders)
+        indices = [i for i in self._in_rect(*bounds) if is_coords_in_bounds(zone_id, self.rows[i]['position_x'], self.rows[i]['position_y'])]
+        return self.query(flag_mask, indices, skip_placeholders)
+
+    def in_radius(self, x: float, y: float, radius: float, flag_mask: int, skip_placeholders: bool = True) -> List[Dict[str, Any]]:
+        indices = [
+            i for i in self._in_rect(x - radius, x + radius, y - radius, y + radius)
+            if (self.rows[i]['position_x'] - x) ** 2 + (self.rows[i]['position_y'] - y) ** 2 <= radius ** 2
+        ]
+        return self.query(flag_mask, indices, skip_placeholders)
+
+def get_service_npc_index(db: Database, map_id: int) -> ServiceNpcIndex:
+    """Индекс сервисных NPC карты: один запрос на карту за время работы приложения."""
+    index = _SERVICE_NPC_INDEX.get(map_id)
+    if index is None:
+        rows = get_service_npc_spawns(db, map_id)
+        index = _SERVICE_NPC_INDEX[map_id] = ServiceNpcIndex(map_id, rows)
+        logger.info(f"Индекс сервисных NPC для карты {map_id}: {len(rows)} спавнов")
+    return index
+
+def clear_service_npc_index():
+    _SERVICE_NPC_INDEX.clear()
+
+def _unique_by_entry(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    seen = set()
+    unique = []
+    for row in rows:
+        if row['id'] not in seen:
+            seen.add(row['id'])
+            unique.append(row)
+    return unique
+
+def get_zone_vendors(db: Database, zone_id: int) -> List[Dict[str, Any]]:
+    """Вендоры/ремонтники зоны, по одному спавну на entry."""
+    dims = get_zone_dimensions(zone_id)
+    if not dims: return []
+    vendors = []
+    for row in _unique_by_entry(get_service_npc_index(db, dims['map']).in_zone(zone_id, 128 | 4096, skip_placeholders=False)):
+        flags = row['NpcFlags']
+        t = "VendorRepair" if (flags&128 and flags&4096) else ("Vendor" if flags&128 else "Repair")
+        vendors.append({'Id': row['id'], 'Name': row['Name'], 'Type': t, 'X': row['position_x'], 'Y': row['position_y'], 'Z': row['position_z']})
+    return vendors
+
+def get_continent_flight_masters(db: Database, map_id: int) -> List[Dict[str, Any]]:
+    return [
+        {'Id': row['id'], 'Name': row['Name'], 'Type': "FlightMaster", 'X': row['position_x'], 'Y': row['position_y'], 'Z': row['position_z']}
+        for row in _unique_by_entry(get_service_npc_index(db, map_id).query(8192, skip_placeholders=False))
+    ]
+
+def get_class_trainers(db: Database, map_id: int) -> List[Dict[str, Any]]:
+    """Учителя классов на континенте. NPC Flag 16 (0x10) = Trainer."""
+    return [
+        {'Id': row['id'], 'Name': row['Name'], 'SubName': row['SubName'], 'Type': "Trainer",
+         'X': row['position_x'], 'Y': row['position_y'], 'Z': row['position_z']}
+        for row in _unique_by_entry(get_service_npc_index(db, map_id).query(16, skip_placeholders=False))
+    ]
@@ -0,0 +1,137 @@
+# logic/shared_hotspots.py
+import math
+from concurrent.futures import Executor
+from collections import defaultdict
+from typing import List, Dict, Tuple, FrozenSet, Optional
+from core.db import Database
+from core.parallel import parallel_map
+from core.logger import get_logger
+from core.timing import span
+from core.models import FarmZone
+from data_access.spawns_repo import get_creature_spawns, get_gameobject_spawns
+from logic.clustering import cluster_spawn_groups
+from logic.quest_relations import QuestRelationResolver
+
+logger = get_logger(__name__)
+
+# Спавны дальше этого расстояния от стартера квеста не участвуют в хотспотах
+MAX_SPAWN_DISTANCE = 3000
+
+def quest_target_spawns(db: Database, relations: QuestRelationResolver, quest_id: int,
+                        mobs: List[int], gos: List[int]) -> List[Dict[str, float]]:
+    """Спавны целей квеста на карте стартера в радиусе MAX_SPAWN_DISTANCE (если таких нет — все)."""
+    raw_spawns = []
+    for tid in gos: raw_spawns.extend(get_gameobject_spawns(db, tid))
+    for tid in mobs: raw_spawns.extend(get_creature_spawns(db, tid))
+
+    starter = relations.starter(quest_id)
+    if starter and raw_spawns:
+        sx, sy, smap = float(starter['x']), float(starter['y']), int(starter['map'])
+        valid = [s for s in raw_spawns if int(s['map']) == smap
+                 and math.sqrt((sx - s['position_x'])**2 + (sy - s['position_y'])**2) <= MAX_SPAWN_DISTANCE]
+        return valid if valid else raw_spawns
+    return raw_spawns
+
+def target_groups(quest_targets: Dict[int, Tuple[List[int], List[int]]]) -> List[List[int]]:
+    """
+    Квесты, связанные общими целями (транзитивно): Union-Find по индексу цель -> квесты.
+    Группы и квесты внутри них — по возрастанию id первого квеста.
+    """
+    target_quests: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+    for q, (mobs, gos) in quest_targets.items():
+        for m in mobs: target_quests[('npc', m)].append(q)
+        for g in gos: target_quests[('go', g)].append(q)
+
+    root = {q: q for q in quest_targets}
+
+    def find(x: int) -> int:
+        while root[x] != x:
+            root[x] = root[root[x]]
+            x = root[x]
+        return x
+
+    for quests in target_quests.values():
+        first, *rest = quests
+        for q in rest:
+            a, b = find(first), find(q)
+            if a != b: root[max(a, b)] = min(a, b)
+    groups = defaultdict(list)
+    for q in sorted(quest_targets):
+        groups[find(q)].append(q)
+    return list(groups.values())
+
+class SharedHotspots:
+    """
+    Хотспоты выбранных квестов с общими целями. Обратный индекс цель -> квесты связывает квесты
+    с пересекающимися целями в группы; спавны группы кластеризуются один раз (по каждой карте),
+    и квест получает те общие кластеры, в которые попали спавны его целей.
+    Одинаковые наборы спавнов кластеризуются один раз.
+    """
+    def __init__(self, db: Database, relations: QuestRelationResolver):
+        self.db = db
+        self.relations = relations
+        self.quest_spawns: Dict[int, List[Dict[str, float]]] = {}
+        self.quest_targets: Dict[int, Tuple[List[int], List[int]]] = {}
+        self.hotspots: Dict[int, List[FarmZone]] = {}
+        self._clusters: Dict[FrozenSet[int], List[Tuple[FarmZone, List[int]]]] = {}
+
+    def add_quest(self, quest_id: int, mobs: List[int], gos: List[int]):
+        with span("quest_spawns", quest=quest_id):
+            self.quest_spawns[quest_id] = quest_target_spawns(self.db, self.relations, quest_id, mobs, gos)
+        self.quest_targets[quest_id] = (mobs, gos)
+
+    def _cluster(self, spawns: List[Dict[str, float]]) -> List[Tuple[FarmZone, List[int]]]:
+        key = frozenset(id(s) for s in spawns)
+        if key not in self._clusters:
+            self._clusters[key] = self._cluster_by_map(spawns)
+        return self._clusters[key]
+
+    @staticmethod
+    def _cluster_by_map(spawns: List[Dict[str, float]]) -> List[Tuple[FarmZone, List[int]]]:
+        """Кластеры по каждой карте отдельно; индексы — позиции в spawns."""
+        by_map = defaultdict(list)
+        for i, s in enumerate(spawns):
+            by_map[int(s['map'])].append(i)
+        result = []
+        with span("clustering", spawns=len(spawns)):
+            for indices in by_map.values():
+                for zone, members in cluster_spawn_groups([spawns[i] for i in indices]):
+                    result.append((zone, [indices[m] for m in members]))
+        return result
+
+    def build(self, executor: Optional[Executor] = None):
+        """Кластеризация групп (параллельно, если передан пул потоков); результат не зависит от пула."""
+        shared = 0
+        prepared = []
+        for group in target_groups(self.quest_targets):
+            # Общий список спавнов группы без повторов (один спавн может быть целью нескольких квестов)
+            spawns, position = [], {}
+            for q in group:
+                for s in self.quest_spawns[q]:
+                    if id(s) not in position:
+                        position[id(s)] = len(spawns)
+                        spawns.append(s)
+            prepared.append((group, spawns, position))
+
+        # Каждый различный набор спавнов кластеризуется один раз
+        unique = {}
+        for _, spawns, _ in prepared:
+            unique.setdefault(frozenset(id(s) for s in spawns), spawns)
+        pending = [(key, spawns) for key, spawns in unique.items() if key not in self._clusters]
+        for (key, _), clusters in zip(pending, parallel_map(executor, lambda item: self._cluster_by_map(item[1]), pending)):
+            self._clusters[key] = clusters
+
+        for group, spawns, position in prepared:
+            clusters = self._cluster(spawns)
+            if len(group) > 1: shared += len(group)
+            for q in group:
+                own = {position[id(s)] for s in self.quest_spawns[q]}
+                zones = [zone for zone, members in clusters if own.intersection(members)]
+                if not zones and own:
+                    # Спавны квеста целиком ушли в шум общего кластера — считаем их отдельно
+                    zones = [zone for zone, _ in self._cluster(self.quest_spawns[q])]
+                self.hotspots[q] = zones
+        logger.info(f"Хотспоты: {len(self.hotspots)} квестов, {shared} из них делят цели с другими")
+
+    def get(self, quest_id: int) -> List[FarmZone]:
+        return self.hotspots.get(quest_id, [])
@@ -0,0 +1,68 @@
+# logic/spawn_selector.py
+import numpy as np
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple, Set, DefaultDict
+from sklearn.neighbors import KDTree
+
+# Ключ сущности: (entry, это GameObject)
+EntityKey = Tuple[int, bool]
+
+class SpawnSelector:
+    """
+    Выбор ближайшего спавна сущности к опорной точке.
+    Все загруженные спавны раскладываются по картам, на каждую карту строится одно KD-дерево.
+    """
+    def __init__(self):
+        self.spawns: DefaultDict[int, List[Dict[str, Any]]] = defaultdict(list)
+        self.keys: DefaultDict[int, List[EntityKey]] = defaultdict(list)
+        self.seen: Set[Tuple[EntityKey, int, float, float]] = set()
+        self.trees: Dict[int, KDTree] = {}
+
+    def add_spawns(self, spawns: List[Dict[str, Any]], is_go: bool):
+        for s in spawns:
+            key = (int(s['entity_id']), is_go)
+            map_id = int(s['map'])
+            sig = (key, map_id, s['x'], s['y'])
+            if sig in self.seen: continue
+            self.seen.add(sig)
+            self.spawns[map_id].append(s)
+            self.keys[map_id].append(key)
+            # Дерево карты перестроится при следующем запросе
+            self.trees.pop(map_id, None)
+
+    def _tree(self, map_id: int) -> KDTree:
+        tree = self.trees.get(map_id)
+        if tree is None:
+            coords = np.array([[s['x'], s['y']] for s in self.spawns[map_id]])
+            tree = self.trees[map_id] = KDTree(coords)
+        return tree
+
+    def nearest(self, candidates: List[Dict[str, Any]], is_go: bool, anchor: Optional[Tuple[int, float, float]]) -> Optional[Dict[str, Any]]:
+        """
+        Из спавнов-кандидатов (одна или несколько сущностей) возвращает ближайший к anchor = (map, x, y).
+        Без опорной точки или без кандидатов на ее карте — первый кандидат, как раньше с LIMIT 1.
+        """
+        if not candidates:
+            return None
+        if anchor is None or len(candidates) == 1:
+            return candidates[0]
+
+        map_id, x, y = anchor
+        wanted = {int(s['entity_id']) for s in candidates if int(s['map']) == map_id}
+        if not wanted or map_id not in self.spawns:
+            return candidates[0]
+
+        # Запрашиваем k ближайших и удваиваем k, пока не встретится спавн нужной сущности
+        tree = self._tree(map_id)
+        keys = self.keys[map_id]
+        total = len(keys)
+        k = min(8, total)
+        while True:
+            _, idx = tree.query([[x, y]], k=k)
+            for i in idx[0]:
+                entity_id, go = keys[i]
+                if go == is_go and entity_id in wanted:
+                    return self.spawns[map_id][i]
+            if k >= total:
+                return candidates[0]
+            k = min(k * 2, total)
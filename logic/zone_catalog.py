@@ -0,0 +1,130 @@
+# logic/zone_catalog.py
+import gzip
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+from core.db import Database
+from core.logger import get_logger
+from core.lua_loader import questie_fingerprint
+from core.models import Quest, Objective
+from data_access.quests_repo import get_quests_by_zone, get_objectives_for_quests
+from data_access.npc_repo import get_quest_starter_types_bulk
+from data_access.zones_repo import ZONE_NAMES
+from logic.faction_filter import get_faction_mask, filter_quests_by_faction
+from logic.quest_chains import build_quest_chains
+from logic.quest_graph import get_quest_graph
+
+logger = get_logger(__name__)
+
+# Версия формата пака: при изменении структуры/логики фильтрации увеличить — старые паки пересоберутся
+ZONE_PACK_VERSION = 3
+ZONE_PACK_DIR = os.path.join('cache', 'zone_packs')
+FACTIONS = ('alliance', 'horde')
+
+@dataclass
+class ZoneCatalog:
+    """Все, что нужно вкладке зоны: отфильтрованные квесты, цели, типы стартеров и цепочки."""
+    zone_id: int
+    faction: str
+    quests: List[Quest] = field(default_factory=list)
+    objectives: Dict[int, List[Objective]] = field(default_factory=dict)
+    starter_types: Dict[int, str] = field(default_factory=dict)
+    chains: List[List[int]] = field(default_factory=list)
+
+    def chain_quests(self) -> List[List[Quest]]:
+        by_id = {q.entry: q for q in self.quests}
+        return [[by_id[e] for e in chain] for chain in self.chains]
+
+    def to_dict(self, inputs: str) -> Dict:
+        return {
+            'version': ZONE_PACK_VERSION,
+            'inputs': inputs,
+            'zone_id': self.zone_id,
+            'faction': self.faction,
+            'quests': [asdict(q) for q in self.quests],
+            'objectives': {str(k): [asdict(o) for o in v] for k, v in self.objectives.items()},
+            'starter_types': {str(k): v for k, v in self.starter_types.items()},
+            'chains': self.chains,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ZoneCatalog':
+        return cls(
+            zone_id=data['zone_id'],
+            faction=data['faction'],
+            quests=[Quest(**q) for q in data['quests']],
+            objectives={int(k): [Objective(**o) for o in v] for k, v in data['objectives'].items()},
+            starter_types={int(k): v for k, v in data['starter_types'].items()},
+            chains=data['chains'],
+        )
+
+def zone_pack_inputs(db: Database) -> str:
+    """Входы пака: данные мира (квесты, стартеры, цели) и Questie (пре-квесты в цепочках) — как у кэша сессий."""
+    return f"{db.fingerprint()}|questie:{questie_fingerprint()}"
+
+def zone_pack_path(zone_id: int, faction: str, pack_dir: str = ZONE_PACK_DIR) -> str:
+    return os.path.join(pack_dir, f"{zone_id}_{faction}.json.gz")
+
+def build_zone_catalog(db: Database, zone_id: int, faction: str) -> ZoneCatalog:
+    """
+    Та же выборка, что делала вкладка зоны: квесты зоны -> фильтр фракции -> без стартующих с предмета.
+    Типы стартеров и цели грузятся пачкой на всю зону.
+    """
+    raw_quests = filter_quests_by_faction(get_quests_by_zone(db, zone_id), get_faction_mask(faction))
+    starter_types = get_quest_starter_types_bulk(db, [q.entry for q in raw_quests]) if raw_quests else {}
+    # Исключаем квесты, начинающиеся с предметов (пока сложно обрабатывать)
+    quests = [q for q in raw_quests if starter_types[q.entry] != 'item']
+    objectives = get_objectives_for_quests(db, [q.entry for q in quests]) if quests else {}
+    chains = [[q.entry for q in chain] for chain in build_quest_chains(quests, get_quest_graph(db))]
+    return ZoneCatalog(zone_id, faction, quests, objectives,
+                       {q.entry: starter_types[q.entry] for q in quests}, chains)
+
+def save_zone_catalog(catalog: ZoneCatalog, inputs: str, pack_dir: str = ZONE_PACK_DIR):
+    os.makedirs(pack_dir, exist_ok=True)
+    path = zone_pack_path(catalog.zone_id, catalog.faction, pack_dir)
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(catalog.to_dict(inputs), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def read_zone_pack(zone_id: int, faction: str, inputs: Optional[str] = None, pack_dir: str = ZONE_PACK_DIR) -> Optional[ZoneCatalog]:
+    """Читает пак; None, если его нет, он поврежден, другой версии или собран по другим данным (zone_pack_inputs)."""
+    path = zone_pack_path(zone_id, faction, pack_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Пак зоны {path} не читается ({e}), будет пересобран")
+        return None
+    if data.get('version') != ZONE_PACK_VERSION or (inputs is not None and data.get('inputs') != inputs):
+        return None
+    return ZoneCatalog.from_dict(data)
+
+def load_zone_catalog(db: Database, zone_id: int, faction: str, pack_dir: str = ZONE_PACK_DIR) -> ZoneCatalog:
+    """Каталог зоны из пака на диске; при промахе собирается из БД и сохраняется."""
+    inputs = zone_pack_inputs(db)
+    catalog = read_zone_pack(zone_id, faction, inputs, pack_dir)
+    if catalog is not None:
+        return catalog
+    catalog = build_zone_catalog(db, zone_id, faction)
+    try:
+        save_zone_catalog(catalog, inputs, pack_dir)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить пак зоны {zone_id}/{faction}: {e}")
+    return catalog
+
+def build_all_zone_packs(db: Database, pack_dir: str = ZONE_PACK_DIR, force: bool = False) -> int:
+    """Собирает паки для всех зон из ZONE_NAMES и обеих фракций. Возвращает число собранных паков."""
+    inputs = zone_pack_inputs(db)
+    built = 0
+    for zone_id in sorted(ZONE_NAMES):
+        for faction in FACTIONS:
+            if not force and read_zone_pack(zone_id, faction, inputs, pack_dir) is not None:
+                continue
+            save_zone_catalog(build_zone_catalog(db, zone_id, faction), inputs, pack_dir)
+            built += 1
+    logger.info(f"Паки зон: собрано {built} в {pack_dir}")
+    return built
@@ -0,0 +1,134 @@
+# tests/test_loot_index.py
+# Шансы дропа и индекс лута (logic.loot_index). Запуск из корня: python -m unittest tests.test_loot_index
+import os
+import shutil
+import tempfile
+import unittest
+
+from logic.loot_index import (
+    _row_chances, _ReferenceExpander, cut_by_cumulative_chance, build_loot_index, save_loot_index, read_loot_index,
+    get_loot_index, clear_loot_index, MAX_REFERENCE_DEPTH,
+)
+
+def row(item: int, chance: float, groupid: int = 0, ref: int = 1, entry: int = 1) -> dict:
+    return {'entry': entry, 'item': item, 'chance': chance, 'groupid': groupid, 'mincount_or_ref': ref}
+
+class FakeDatabase:
+    """Шаблоны лута по имени таблицы из запроса; считает запросы."""
+    mode = 'live'
+
+    def __init__(self, tables, world: str = 'world:1'):
+        self.tables = tables
+        self.world = world
+        self.queries = 0
+
+    def execute(self, query, params=None):
+        self.queries += 1
+        return [dict(r) for table, rows in self.tables.items() if f"FROM {table}" in query for r in rows]
+
+    def fingerprint(self) -> str:
+        return self.world
+
+class RowChancesTest(unittest.TestCase):
+    def chances(self, rows):
+        return [round(c, 6) for _, c in _row_chances(rows)]
+
+    def test_plain_negative_and_capped(self):
+        # Отрицательный шанс — квестовый дроп (по модулю), больше 100% не бывает
+        self.assertEqual(self.chances([row(1, 50), row(2, -30), row(3, 150)]), [0.5, 0.3, 1.0])
+
+    def test_group_shares_rest_equally(self):
+        self.assertEqual(self.chances([row(1, 40, groupid=1), row(2, 0, groupid=1), row(3, 0, groupid=1)]), [0.4, 0.3, 0.3])
+
+    def test_group_without_rest(self):
+        self.assertEqual(self.chances([row(1, 70, groupid=2), row(2, 40, groupid=2), row(3, 0, groupid=2)]), [0.7, 0.4, 0.0])
+
+    def test_zero_chance_outside_group(self):
+        self.assertEqual(self.chances([row(1, 0)]), [0.0])
+
+class ReferenceExpanderTest(unittest.TestCase):
+    def test_reference_scaled_by_its_chance(self):
+        expander = _ReferenceExpander({100: [row(5, 50, entry=100), row(6, 100, entry=100)]})
+        items = expander.items([row(0, 50, ref=-100)])
+        self.assertAlmostEqual(items[5], 0.25)
+        self.assertAlmostEqual(items[6], 0.5)
+        self.assertIn(100, expander.cache)
+
+    def test_direct_and_referenced_combined_independently(self):
+        expander = _ReferenceExpander({100: [row(5, 50, entry=100)]})
+        items = expander.items([row(5, 50), row(0, 100, ref=-100)])
+        self.assertAlmostEqual(items[5], 1 - 0.5 * 0.5)
+
+    def test_nested_references(self):
+        expander = _ReferenceExpander({100: [row(0, 50, ref=-200, entry=100)], 200: [row(7, 50, entry=200)]})
+        self.assertAlmostEqual(expander.items([row(0, 100, ref=-100)])[7], 0.25)
+
+    def test_reference_cycle_stops(self):
+        expander = _ReferenceExpander({300: [row(0, 100, ref=-300, entry=300), row(8, 100, entry=300)]})
+        with self.assertLogs('logic.loot_index', level='WARNING'):
+            items = expander.items([row(0, 100, ref=-300)])
+        self.assertAlmostEqual(items[8], 1.0)
+        self.assertLessEqual(len(expander.cache), MAX_REFERENCE_DEPTH + 1)
+
+class CutByCumulativeChanceTest(unittest.TestCase):
+    SOURCES = [(1, 'npc', 0.5), (2, 'npc', 0.3), (3, 'go', 0.15), (4, 'npc', 0.05)]
+
+    def test_cut_at_cutoff(self):
+        self.assertEqual(cut_by_cumulative_chance(self.SOURCES, 0.75), self.SOURCES[:2])
+
+    def test_at_least_one(self):
+        self.assertEqual(cut_by_cumulative_chance(self.SOURCES, 0.1), self.SOURCES[:1])
+
+    def test_full_cutoff_and_zero_total_keep_all(self):
+        self.assertEqual(cut_by_cumulative_chance(self.SOURCES, 1.0), self.SOURCES)
+        zero = [(1, 'npc', 0.0), (2, 'go', 0.0)]
+        self.assertEqual(cut_by_cumulative_chance(zero, 0.5), zero)
+        self.assertEqual(cut_by_cumulative_chance([], 0.5), [])
+
+class LootIndexTest(unittest.TestCase):
+    TABLES = {
+        'reference_loot_template': [row(11, 50, ref=1, entry=900)],
+        'creature_loot_template': [row(10, 25, entry=1), row(0, 100, ref=-900, entry=1), row(10, 75, entry=2)],
+        'gameobject_loot_template': [row(10, 25, entry=3)],
+    }
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='loot_test_')
+        self.path = os.path.join(self.tmp, 'loot_index.json.gz')
+        clear_loot_index()
+
+    def tearDown(self):
+        clear_loot_index()
+        shutil.rmtree(self.tmp)
+
+    def test_build_sorted_by_chance(self):
+        index = build_loot_index(FakeDatabase(self.TABLES))
+        self.assertEqual(index[10], [(2, 'npc', 0.75), (3, 'go', 0.25), (1, 'npc', 0.25)])
+        self.assertEqual(index[11], [(1, 'npc', 0.5)])
+
+    def test_read_checks_world(self):
+        index = build_loot_index(FakeDatabase(self.TABLES))
+        save_loot_index(index, 'world:1', self.path)
+        self.assertEqual(read_loot_index('world:1', self.path), index)
+        self.assertIsNone(read_loot_index('world:2', self.path))
+
+    def test_rebuilt_when_world_changes(self):
+        save_loot_index({10: [(99, 'npc', 1.0)]}, 'world:1', self.path)
+        db = FakeDatabase(self.TABLES, world='world:1')
+        self.assertEqual(get_loot_index(db, self.path)[10], [(99, 'npc', 1.0)])
+        self.assertEqual(db.queries, 0)
+
+        clear_loot_index()
+        db = FakeDatabase(self.TABLES, world='world:2')
+        self.assertEqual(get_loot_index(db, self.path)[10][0], (2, 'npc', 0.75))
+        self.assertGreater(db.queries, 0)
+        self.assertIsNotNone(read_loot_index('world:2', self.path))
+
+    def test_record_mode_always_builds(self):
+        save_loot_index({10: [(99, 'npc', 1.0)]}, 'world:1', self.path)
+        db = FakeDatabase(self.TABLES, world='world:1')
+        db.mode = 'record'
+        self.assertEqual(get_loot_index(db, self.path)[10][0], (2, 'npc', 0.75))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,327 @@
+# tests/test_profile_patch.py
+# Обновление профиля на месте (exporter.profile_patch). Запуск из корня: python -m unittest tests.test_profile_patch
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from types import SimpleNamespace
+
+from core.db import configure_database, configure_fixtures
+from logic.quest_relations import NpcQuestMap
+from logic.session_manager import SessionManager
+from exporter.xml_writer import XmlStreamWriter
+from exporter.easy_quest_xml import XSI_URL, XSD_URL, generate_easy_quest_xml
+from exporter.profile_patch import (
+    KEEP, MANUAL, REPLACE, ADD, REMOVE, SKIP, decide, _placement, element_digest, easy_quest_id,
+    index_profile, load_manifest, save_manifest, manifest_path_for, ProfilePatcher, ProfileIndex, patch_easy_quest_xml,
+)
+from exporter.world_caches import clear_generation_caches
+from tools.synthetic_world import build_synthetic_world
+
+NAMESPACES = {'xsi': XSI_URL, 'xsd': XSD_URL}
+
+def easy_quest(entry: int, name: str, note: str = '') -> ET.Element:
+    eq = ET.Element("EasyQuest")
+    ET.SubElement(eq, "Name").text = name
+    ET.SubElement(ET.SubElement(eq, "QuestId"), "int").text = str(entry)
+    ET.SubElement(eq, "Comment").text = note
+    return eq
+
+def quest_item(entry: int, key: str = 'k1', note: str = '') -> dict:
+    """Запись так, как ее готовит _patch_easy_quest_xml: элемент, ключ входов, шаги QuestsSorted."""
+    name = f"Q{entry}"
+    return {'id': f"quest:{entry}", 'name': name, 'quest': SimpleNamespace(entry=entry), 'key': key,
+            'element': easy_quest(entry, name, note),
+            'sorted': [ET.Element("QuestsSorted", Action=a, NameClass=name) for a in ('PickUp', 'TurnIn')]}
+
+def npc_quest(entity_id: int, pickups, turnins) -> ET.Element:
+    nq = ET.Element("NPCQuest", Id=str(entity_id), Name=f"N{entity_id}", GameObject="false")
+    for tag, quests in (('PickUpQuests', pickups), ('TurnInQuests', turnins)):
+        container = ET.SubElement(nq, tag)
+        for q in quests:
+            ET.SubElement(container, "int").text = str(q)
+    ET.SubElement(nq, "Position", X="0.0000", Y="0.0000", Z="0.0000")
+    return nq
+
+def render_profile(easy_quests, npc_quests=()) -> str:
+    """Профиль в формате генератора из готовых элементов (QuestsSorted — по шагам PickUp/TurnIn каждого квеста)."""
+    buf = io.StringIO()
+    writer = XmlStreamWriter(buf, "EasyQuestProfile", NAMESPACES)
+    writer.start_document()
+    writer.start_section("QuestsSorted")
+    for eq in easy_quests:
+        for action in ('PickUp', 'TurnIn'):
+            writer.child(ET.Element("QuestsSorted", Action=action, NameClass=eq.findtext('Name')))
+    writer.end_section()
+    writer.start_section("NpcQuest")
+    for nq in npc_quests:
+        writer.child(nq)
+    writer.end_section()
+    writer.start_section("Npc")
+    writer.end_section()
+    writer.start_section("EasyQuests")
+    for eq in easy_quests:
+        writer.child(eq)
+    writer.end_section()
+    writer.end_document()
+    return buf.getvalue()
+
+class DecideTest(unittest.TestCase):
+    RECORD = {'key': 'k1', 'digest': 'd1'}
+
+    def test_keep_unchanged_inputs(self):
+        self.assertEqual(decide('k1', 'd1', self.RECORD), KEEP)
+
+    def test_replace_changed_inputs(self):
+        self.assertEqual(decide('k2', 'd1', self.RECORD), REPLACE)
+
+    def test_add_new_entry(self):
+        self.assertEqual(decide('k1', None, None), ADD)
+
+    def test_remove_deselected_entry(self):
+        self.assertEqual(decide(None, 'd1', self.RECORD), REMOVE)
+
+    def test_manual_entry_not_generated(self):
+        self.assertEqual(decide('k1', 'd1', None), MANUAL)
+        self.assertEqual(decide(None, 'd1', None), MANUAL)
+
+    def test_manual_entry_edited_by_hand(self):
+        self.assertEqual(decide('k1', 'edited', self.RECORD), MANUAL)
+        self.assertEqual(decide('k2', 'edited', self.RECORD), MANUAL)
+        self.assertEqual(decide(None, 'edited', self.RECORD), MANUAL)
+
+    def test_skip_deleted_by_hand(self):
+        self.assertEqual(decide('k1', None, self.RECORD), SKIP)
+
+    def test_skip_absent_everywhere(self):
+        self.assertEqual(decide(None, None, None), SKIP)
+
+class PlacementTest(unittest.TestCase):
+    @staticmethod
+    def ids(groups):
+        return {k: [i['id'] for i in v] for k, v in groups.items()} if isinstance(groups, dict) else [i['id'] for i in groups]
+
+    def place(self, actions, present):
+        items = [{'id': i} for i in actions]
+        before, after, tail = _placement(items, actions, set(present))
+        return self.ids(before), self.ids(after), self.ids(tail)
+
+    def test_after_previous_present(self):
+        before, after, tail = self.place({'a': KEEP, 'b': ADD, 'c': ADD, 'd': KEEP}, ['a', 'd'])
+        self.assertEqual((before, after, tail), ({}, {'a': ['b', 'c']}, []))
+
+    def test_before_next_present_when_no_previous(self):
+        before, after, tail = self.place({'a': ADD, 'b': ADD, 'c': KEEP, 'd': ADD}, ['c'])
+        self.assertEqual((before, after, tail), ({'c': ['a', 'b']}, {'c': ['d']}, []))
+
+    def test_tail_when_nothing_present(self):
+        before, after, tail = self.place({'a': ADD, 'b': SKIP, 'c': ADD}, [])
+        self.assertEqual((before, after, tail), ({}, {}, ['a', 'c']))
+
+    def test_removed_entry_is_not_an_anchor(self):
+        before, after, tail = self.place({'a': REMOVE, 'b': ADD, 'c': KEEP}, ['c'])
+        self.assertEqual((before, after, tail), ({'c': ['b']}, {}, []))
+
+class PatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='patch_test_')
+        self.path = os.path.join(self.tmp, 'profile.xml')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write_profile(self, text: str):
+        with open(self.path, 'w', encoding='utf-16') as f:
+            f.write(text)
+
+    def patch(self, items, manifest, npc_quests=None, changed_quests=frozenset()) -> ET.Element:
+        """Второй проход так, как его запускает _patch_easy_quest_xml; возвращает корень результата."""
+        index = index_profile(self.path) if os.path.exists(self.path) else ProfileIndex()
+        actions = {item['id']: decide(item['key'], index.easy_quests.get(item['id'], {}).get('digest'), manifest.get(item['id']))
+                   for item in items}
+        for item_id, entry in index.easy_quests.items():
+            actions.setdefault(item_id, decide(None, entry['digest'], manifest.get(item_id)))
+        self.actions = actions
+        out = io.StringIO()
+        writer = XmlStreamWriter(out, "EasyQuestProfile", NAMESPACES)
+        with open(self.path, 'r', encoding=index.encoding) as source:
+            ProfilePatcher(writer, index, items, [], actions, npc_quests or NpcQuestMap(), set(changed_quests)).write(source)
+        return ET.fromstring(out.getvalue().split('\n', 1)[1])
+
+    @staticmethod
+    def generated(items):
+        return {item['id']: {'key': item['key'], 'digest': element_digest(item['element'])} for item in items}
+
+    @staticmethod
+    def easy_quest_ids(root):
+        return [easy_quest_id(eq) for eq in root.find('EasyQuests')]
+
+    @staticmethod
+    def sorted_steps(root):
+        return [(e.get('Action'), e.get('NameClass')) for e in root.find('QuestsSorted')]
+
+    def test_noop_patch_keeps_entries(self):
+        items = [quest_item(1), quest_item(2)]
+        self.write_profile(render_profile([i['element'] for i in items]))
+        root = self.patch(items, self.generated(items))
+        self.assertEqual(set(self.actions.values()), {KEEP})
+        self.assertEqual(self.easy_quest_ids(root), ['quest:1', 'quest:2'])
+        self.assertEqual(len(self.sorted_steps(root)), 4)
+
+    def test_added_quest_goes_after_previous(self):
+        old = [quest_item(1), quest_item(3)]
+        self.write_profile(render_profile([i['element'] for i in old]))
+        items = [quest_item(1), quest_item(2), quest_item(3)]
+        root = self.patch(items, self.generated(old))
+        self.assertEqual(self.actions['quest:2'], ADD)
+        self.assertEqual(self.easy_quest_ids(root), ['quest:1', 'quest:2', 'quest:3'])
+        self.assertEqual([n for _, n in self.sorted_steps(root)], ['Q1', 'Q1', 'Q2', 'Q2', 'Q3', 'Q3'])
+
+    def test_added_first_quest_goes_before_next(self):
+        old = [quest_item(2)]
+        self.write_profile(render_profile([i['element'] for i in old]))
+        root = self.patch([quest_item(1), quest_item(2)], self.generated(old))
+        self.assertEqual(self.easy_quest_ids(root), ['quest:1', 'quest:2'])
+        self.assertEqual([n for _, n in self.sorted_steps(root)], ['Q1', 'Q1', 'Q2', 'Q2'])
+
+    def test_replaced_quest_keeps_position(self):
+        old = [quest_item(1), quest_item(2), quest_item(3)]
+        self.write_profile(render_profile([i['element'] for i in old]))
+        items = [quest_item(1), quest_item(2, key='k2', note='rebuilt'), quest_item(3)]
+        root = self.patch(items, self.generated(old))
+        self.assertEqual(self.actions['quest:2'], REPLACE)
+        self.assertEqual(self.easy_quest_ids(root), ['quest:1', 'quest:2', 'quest:3'])
+        self.assertEqual(root.find('EasyQuests')[1].findtext('Comment'), 'rebuilt')
+
+    def test_deselected_quest_removed_with_steps(self):
+        old = [quest_item(1), quest_item(2)]
+        self.write_profile(render_profile([i['element'] for i in old]))
+        root = self.patch([quest_item(1)], self.generated(old))
+        self.assertEqual(self.actions['quest:2'], REMOVE)
+        self.assertEqual(self.easy_quest_ids(root), ['quest:1'])
+        self.assertNotIn('Q2', {n for _, n in self.sorted_steps(root)})
+
+    def test_hand_edits_preserved(self):
+        old = [quest_item(1), quest_item(2)]
+        manifest = self.generated(old)
+        edited = quest_item(2, note='edited by hand')['element']
+        handmade = easy_quest(9, 'Handmade9', 'manual')
+        self.write_profile(render_profile([old[0]['element'], edited, handmade]))
+        # Входы квеста 2 изменились, а квест 1 больше не выбран — но правленную запись и ручную генератор не трогает
+        root = self.patch([quest_item(2, key='k2', note='rebuilt')], manifest)
+        self.assertEqual((self.actions['quest:1'], self.actions['quest:2'], self.actions['quest:9']), (REMOVE, MANUAL, MANUAL))
+        self.assertEqual(self.easy_quest_ids(root), ['quest:2', 'quest:9'])
+        self.assertEqual(root.find('EasyQuests')[0].findtext('Comment'), 'edited by hand')
+        self.assertEqual([n for _, n in self.sorted_steps(root)], ['Q2', 'Q2', 'Handmade9', 'Handmade9'])
+
+    def test_quest_deleted_by_hand_not_restored(self):
+        old = [quest_item(1), quest_item(2)]
+        self.write_profile(render_profile([old[0]['element']]))
+        root = self.patch(old, self.generated(old))
+        self.assertEqual(self.actions['quest:2'], SKIP)
+        self.assertEqual(self.easy_quest_ids(root), ['quest:1'])
+
+    def test_npc_quest_patched_in_generation_order(self):
+        old = [quest_item(1), quest_item(3)]
+        # 7 — квест, дописанный в список NPC руками: остается на месте
+        self.write_profile(render_profile([i['element'] for i in old], [npc_quest(100, [1, 7, 3], [1])]))
+        items = [quest_item(1), quest_item(2), quest_item(3)]
+        npc_quests = NpcQuestMap()
+        target = {'entity_id': 100, 'entity_name': 'N100', 'x': 0, 'y': 0, 'z': 0}
+        npc_quests.add_quest(2, {'starter_npc': target, 'ender_npc': target})
+        root = self.patch(items, self.generated(old), npc_quests, changed_quests={2})
+        nq = root.find('NpcQuest')[0]
+        self.assertEqual([int(i.text) for i in nq.find('PickUpQuests')], [1, 2, 7, 3])
+        self.assertEqual([int(i.text) for i in nq.find('TurnInQuests')], [1, 2])
+
+    def test_npc_quest_dropped_when_emptied(self):
+        old = [quest_item(1)]
+        self.write_profile(render_profile([i['element'] for i in old], [npc_quest(100, [1], [1])]))
+        root = self.patch([], self.generated(old), changed_quests={1})
+        self.assertEqual(len(root.find('NpcQuest')), 0)
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='manifest_test_')
+        self.path = manifest_path_for(os.path.join(self.tmp, 'profile.xml'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        items = {'quest:1': {'key': 'k', 'digest': 'd'}, 'npc:5': {'key': 'k5', 'digest': 'd5'}}
+        save_manifest(self.path, items)
+        self.assertTrue(self.path.endswith('profile.gen.json'))
+        self.assertEqual(load_manifest(self.path), items)
+
+    def test_missing_or_broken_means_manual(self):
+        self.assertEqual(load_manifest(self.path), {})
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{broken')
+        self.assertEqual(load_manifest(self.path), {})
+
+    def test_other_version_ignored(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"version": 0, "items": {"quest:1": {"key": "k", "digest": "d"}}}')
+        self.assertEqual(load_manifest(self.path), {})
+
+class SyntheticWorldTest(unittest.TestCase):
+    """Генерация и обновление на синтетическом мире (tools.synthetic_world) в SQLite."""
+    @classmethod
+    def setUpClass(cls):
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.mkdtemp(prefix='patch_world_')
+        world, cls.project = os.path.join(cls.tmp, 'world.sqlite'), os.path.join(cls.tmp, 'project.json')
+        build_synthetic_world(world, cls.project)
+        config = os.path.join(cls.tmp, 'db.yaml')
+        with open(config, 'w', encoding='utf-8') as f:
+            f.write(f"database:\n  backend: sqlite\n  sqlite:\n    path: {world!r}\n")
+        configure_database(config, 'sqlite')
+        configure_fixtures('live')
+        # cache/ и logs/ генерации — во временном каталоге
+        os.chdir(cls.tmp)
+        clear_generation_caches()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        clear_generation_caches()
+        configure_database(None, None)
+        configure_fixtures(None)
+        shutil.rmtree(cls.tmp)
+
+    def sessions(self):
+        return SessionManager(self.project).load()
+
+    @staticmethod
+    def read(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_patch_of_missing_file_equals_generation(self):
+        generated, patched = os.path.join(self.tmp, 'generated.xml'), os.path.join(self.tmp, 'patched.xml')
+        generate_easy_quest_xml(self.sessions(), generated, workers=1, use_cache=False)
+        counts = patch_easy_quest_xml(self.sessions(), patched, workers=1)
+        self.assertEqual(self.read(patched), self.read(generated))
+        self.assertEqual((counts[KEEP], counts[MANUAL], counts[REMOVE]), (0, 0, 0))
+        self.assertGreater(counts[ADD], 0)
+
+        # Повторное обновление без изменений ничего не пересобирает и не меняет файл
+        counts = patch_easy_quest_xml(self.sessions(), patched, workers=1)
+        self.assertEqual(self.read(patched), self.read(generated))
+        self.assertEqual((counts[REPLACE], counts[ADD], counts[REMOVE]), (0, 0, 0))
+
+    def test_deselect_after_create(self):
+        path = os.path.join(self.tmp, 'deselect.xml')
+        sessions = self.sessions()
+        patch_easy_quest_xml(sessions, path, workers=1)
+        dropped = sessions[0].selected_quest_ids.pop()
+        counts = patch_easy_quest_xml(sessions, path, workers=1)
+        self.assertEqual(counts[REMOVE], 1)
+        root = ET.fromstring(self.read(path).decode('utf-16').split('\n', 1)[1])
+        self.assertNotIn(f"quest:{dropped}", [easy_quest_id(eq) for eq in root.find('EasyQuests')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,312 @@
+# tools/benchmark.py
+# Бенчмарки конвейера генерации на воспроизводимых данных: файлы Questie из resources/questie
+# и синтетический мир в SQLite (tools.synthetic_world) или записанный экспорт (--world/--project).
+# Результаты сохраняются как базовые линии (по умолчанию с именем коммита) и сравниваются между коммитами.
+# Запуск: python -m tools.benchmark [--only cluster_spawns ...] [--repeat 5] [--compare <коммит>] [--save <имя>]
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from core.db import Database, configure_database, configure_fixtures
+from core.logger import get_logger
+from core.models import Quest
+from core.coord_converter import questie_to_world_coords, ZONE_DIMENSIONS
+from core.lua_loader import load_questie_data, load_questie_quest_prereqs, clear_questie_cache
+from logic.bracket_builder import build_bracket_sessions
+from logic.clustering import cluster_spawns
+from logic.faction_filter import filter_quests_by_faction, get_faction_mask
+from logic.quest_chains import build_quest_chains
+from logic.quest_sorter import sort_quests_with_dependencies
+from logic.session_manager import SessionManager
+from exporter.easy_quest_xml import generate_easy_quest_xml, GENERATION_WORKERS
+from exporter.matrix import generate_profile_matrix, parse_matrix
+from exporter.world_caches import clear_generation_caches
+from tools.synthetic_world import build_synthetic_world, SYNTHETIC_WORLD_VERSION, SYNTHETIC_SEED
+
+logger = get_logger(__name__)
+
+RESULTS_VERSION = 1
+BENCH_DIR = os.path.join('cache', 'benchmarks')
+DEFAULT_REPEAT = 5
+# Медиана дольше базовой больше чем на эту долю — регрессия
+DEFAULT_THRESHOLD = 0.10
+
+# Размеры синтетических входов для микробенчмарков
+COORD_POINTS = 100000
+CLUSTER_BLOBS, CLUSTER_BLOB_SIZE, CLUSTER_NOISE = 60, 30, 200
+SORT_QUESTS = 3000
+FACTION_QUESTS = 20000
+
+class BenchContext:
+    """Общие входы бенчмарков: проект, рабочий каталог для профилей и детерминированный генератор."""
+    def __init__(self, project_path: str, work_dir: str, seed: int):
+        self.sessions = SessionManager(project_path).load()
+        self.work_dir = work_dir
+        self.seed = seed
+
+    def random(self) -> random.Random:
+        return random.Random(self.seed)
+
+# Бенчмарк: setup(ctx) -> (что замерять, что делать перед каждым замером или None)
+Setup = Callable[[BenchContext], Tuple[Callable[[], Any], Optional[Callable[[], None]]]]
+
+def _questie_parse(loader: Callable[[], Any]) -> Setup:
+    return lambda ctx: (loader, clear_questie_cache)
+
+def _coord_convert(ctx: BenchContext):
+    # Точки в процентах карты по всем зонам с известными размерами (формат координат Questie)
+    rnd = ctx.random()
+    zones = sorted(ZONE_DIMENSIONS)
+    points = [(rnd.choice(zones), rnd.uniform(0, 100), rnd.uniform(0, 100)) for _ in range(COORD_POINTS)]
+    return (lambda: [questie_to_world_coords(z, x, y) for z, x, y in points]), None
+
+def _cluster_spawns(ctx: BenchContext):
+    rnd = ctx.random()
+    spawns = []
+    for _ in range(CLUSTER_BLOBS):
+        cx, cy = rnd.uniform(-4000, 4000), rnd.uniform(-4000, 4000)
+        spawns.extend({'map': 1, 'position_x': cx + rnd.gauss(0, 40), 'position_y': cy + rnd.gauss(0, 40), 'position_z': 50.0}
+                      for _ in range(CLUSTER_BLOB_SIZE))
+    spawns.extend({'map': 1, 'position_x': rnd.uniform(-4000, 4000), 'position_y': rnd.uniform(-4000, 4000), 'position_z': 50.0}
+                  for _ in range(CLUSTER_NOISE))
+    return (lambda: cluster_spawns(spawns)), None
+
+def _synthetic_quests(rnd: random.Random, count: int) -> List[Quest]:
+    # Цепочки: примерно половина квестов продолжает один из предыдущих
+    quests = []
+    for i in range(count):
+        entry = 20000 + i
+        prev = rnd.choice(quests).entry if quests and rnd.random() < .5 else 0
+        level = rnd.randint(1, 70)
+        quests.append(Quest(entry=entry, title=f"Q{entry}", min_level=level, quest_level=level + rnd.randint(0, 3),
+                            zone_or_sort=rnd.choice([12, 141, 188, 3483]), required_races=rnd.choice([0, 0, 1101, 690, 8, 512]),
+                            prev_quest_id=prev))
+    return quests
+
+def _quest_sort(ctx: BenchContext):
+    quests = _synthetic_quests(ctx.random(), SORT_QUESTS)
+    return (lambda: sort_quests_with_dependencies(quests)), None
+
+def _quest_chains(ctx: BenchContext):
+    quests = _synthetic_quests(ctx.random(), SORT_QUESTS)
+    return (lambda: build_quest_chains(quests)), None
+
+def _faction_filter(ctx: BenchContext):
+    quests = _synthetic_quests(ctx.random(), FACTION_QUESTS)
+    mask = get_faction_mask('horde')
+    return (lambda: filter_quests_by_faction(quests, mask)), None
+
+def _bracket_builder(ctx: BenchContext):
+    # После разогрева таблица квестов и граф в памяти — замеряется выборка, проверка пре-квестов и порядок зон
+    db = Database()
+    return (lambda: build_bracket_sessions(db, 'alliance', 1, 70, 'Kalimdor')), None
+
+def _generate(workers: int, cold: bool, use_cache: bool = False) -> Setup:
+    def setup(ctx: BenchContext):
+        output = os.path.join(ctx.work_dir, f"profile_w{workers}.xml")
+        run = lambda: generate_easy_quest_xml(ctx.sessions, output, workers=workers, use_cache=use_cache)
+        return run, (clear_generation_caches if cold else None)
+    return setup
+
+def _generate_matrix(ctx: BenchContext):
+    # 2 фракции x 9 классов одним проходом — сравнивать с generate_warm (один профиль)
+    variants = parse_matrix('all', 'all')
+    output_dir = os.path.join(ctx.work_dir, 'matrix')
+    return (lambda: generate_profile_matrix(ctx.sessions, variants, output_dir)), None
+
+# Порядок — порядок прогона и отчета
+BENCHMARKS: Dict[str, Setup] = {
+    'lua_parse_npc': _questie_parse(lambda: load_questie_data('npc')),
+    'lua_parse_object': _questie_parse(lambda: load_questie_data('object')),
+    'lua_parse_quest_prereqs': _questie_parse(load_questie_quest_prereqs),
+    'coord_convert': _coord_convert,
+    'cluster_spawns': _cluster_spawns,
+    'quest_sort': _quest_sort,
+    'quest_chains': _quest_chains,
+    'faction_filter': _faction_filter,
+    'bracket_builder': _bracket_builder,
+    'generate_cold': _generate(1, cold=True),
+    'generate_warm': _generate(1, cold=False),
+    'generate_parallel': _generate(GENERATION_WORKERS, cold=False),
+    # Повторная генерация без изменений: все сессии из кэша
+    'generate_cached': _generate(1, cold=False, use_cache=True),
+    'generate_matrix': _generate_matrix,
+}
+
+def run_benchmark(ctx: BenchContext, name: str, repeat: int) -> Dict[str, float]:
+    """Один прогон для разогрева, затем repeat замеров; время в мс."""
+    func, before = BENCHMARKS[name](ctx)
+    if before: before()
+    func()
+    times = []
+    for _ in range(repeat):
+        if before: before()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return {
+        'runs': repeat,
+        'min_ms': min(times),
+        'median_ms': statistics.median(times),
+        'mean_ms': statistics.fmean(times),
+        'stdev_ms': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+def current_commit() -> str:
+    """Короткий хэш HEAD (с пометкой -dirty при незакоммиченных изменениях) или 'local' вне git."""
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo, capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'local'
+
+def results_path(label: str, bench_dir: str = BENCH_DIR) -> str:
+    return os.path.join(bench_dir, 'results', f"{label}.json")
+
+def save_results(data: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+def load_results(label_or_path: str, bench_dir: str = BENCH_DIR) -> Dict[str, Any]:
+    path = label_or_path if label_or_path.endswith('.json') else results_path(label_or_path, bench_dir)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != RESULTS_VERSION:
+        raise ValueError(f"{path}: другая версия формата результатов ({data.get('version')})")
+    return data
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Сравнение медиан по общим бенчмаркам: [{name, base_ms, current_ms, delta, status}]."""
+    rows = []
+    for name, cur in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            rows.append({'name': name, 'base_ms': None, 'current_ms': cur['median_ms'], 'delta': None, 'status': 'new'})
+            continue
+        delta = cur['median_ms'] / base['median_ms'] - 1.0 if base['median_ms'] > 0 else 0.0
+        status = 'REGRESSION' if delta > threshold else ('faster' if delta < -threshold else 'ok')
+        rows.append({'name': name, 'base_ms': base['median_ms'], 'current_ms': cur['median_ms'], 'delta': delta, 'status': status})
+    return rows
+
+def format_comparison(rows: List[Dict[str, Any]], baseline_label: str) -> str:
+    lines = [f"Сравнение с {baseline_label} (медианы, мс):", f"{'бенчмарк':<26} {'база':>10} {'сейчас':>10} {'изм.':>8}"]
+    for r in rows:
+        base = f"{r['base_ms']:.2f}" if r['base_ms'] is not None else '-'
+        delta = f"{r['delta'] * 100:+.1f}%" if r['delta'] is not None else '-'
+        lines.append(f"{r['name']:<26} {base:>10} {r['current_ms']:>10.2f} {delta:>8}  {r['status']}")
+    return "\n".join(lines)
+
+def format_results(data: Dict[str, Any]) -> str:
+    lines = [f"Бенчмарки {data['label']} (мир: {data['world']['source']}, повторов: {data['repeat']}):",
+             f"{'бенчмарк':<26} {'min':>10} {'median':>10} {'stdev':>8}"]
+    for name, r in data['results'].items():
+        lines.append(f"{name:<26} {r['min_ms']:>10.2f} {r['median_ms']:>10.2f} {r['stdev_ms']:>8.2f}")
+    return "\n".join(lines)
+
+def prepare_world(bench_dir: str, world: Optional[str], project: Optional[str], seed: int) -> Tuple[str, str, str]:
+    """(база, проект, описание источника). Синтетический мир собирается один раз на версию генератора и seed."""
+    if world:
+        if not project:
+            raise ValueError("Для своей базы (--world) нужен и проект (--project)")
+        return os.path.abspath(world), os.path.abspath(project), f"file:{os.path.basename(world)}"
+    name = f"world_v{SYNTHETIC_WORLD_VERSION}_s{seed}"
+    world_path = os.path.abspath(os.path.join(bench_dir, f"{name}.sqlite"))
+    project_path = os.path.abspath(os.path.join(bench_dir, f"{name}_project.json"))
+    if not (os.path.exists(world_path) and os.path.exists(project_path)):
+        build_synthetic_world(world_path, project_path, seed)
+    return world_path, project_path, f"synthetic:v{SYNTHETIC_WORLD_VERSION}:s{seed}"
+
+def run_suite(names: List[str], repeat: int = DEFAULT_REPEAT, bench_dir: str = BENCH_DIR, world: Optional[str] = None,
+              project: Optional[str] = None, seed: int = SYNTHETIC_SEED, label: Optional[str] = None) -> Dict[str, Any]:
+    """Прогоняет бенчмарки names на базе world (по умолчанию синтетической) и возвращает результаты."""
+    world_path, project_path, source = prepare_world(bench_dir, world, project, seed)
+
+    # Генерация читает config через configure_database: отдельный конфиг на базу бенчмарка, без записи фикстур
+    config_path = os.path.abspath(os.path.join(bench_dir, 'db.yaml'))
+    with open(config_path, 'w', encoding='utf-8') as f:
+        f.write(f"database:\n  backend: sqlite\n  sqlite:\n    path: {json.dumps(world_path)}\n")
+    configure_database(config_path, 'sqlite')
+    configure_fixtures('live')
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_') as work_dir:
+        # Относительные пути генерации (индекс лута в cache/, отчеты в logs/) уходят во временный каталог,
+        # рабочий cache/ проекта не перезаписывается данными синтетического мира
+        os.chdir(work_dir)
+        try:
+            ctx = BenchContext(project_path, work_dir, seed)
+            clear_generation_caches()
+            for name in names:
+                logger.info(f"Бенчмарк {name}...")
+                results[name] = run_benchmark(ctx, name, repeat)
+        finally:
+            os.chdir(cwd)
+            clear_generation_caches()
+    return {
+        'version': RESULTS_VERSION,
+        'label': label or current_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'world': {'source': source, 'seed': seed},
+        'repeat': repeat,
+        'results': results,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки конвейера генерации с базовыми линиями.")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Только эти бенчмарки")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Замеров на бенчмарк (после разогрева)")
+    parser.add_argument('--save', help="Имя базовой линии (по умолчанию — короткий хэш коммита)")
+    parser.add_argument('--no-save', action='store_true', help="Не сохранять результаты")
+    parser.add_argument('--compare', help="Имя базовой линии или путь к .json для сравнения")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Порог регрессии (доля медианы)")
+    parser.add_argument('--world', help="Своя SQLite-база (например, из tools.export_sqlite) вместо синтетической")
+    parser.add_argument('--project', help="project.json для --world")
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_SEED, help="Seed синтетического мира")
+    parser.add_argument('--bench-dir', default=BENCH_DIR, help="Каталог мира и результатов")
+    parser.add_argument('--list', action='store_true', help="Список бенчмарков и сохраненных базовых линий")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("Бенчмарки: " + ", ".join(BENCHMARKS))
+        saved_dir = os.path.join(args.bench_dir, 'results')
+        saved = sorted(os.path.splitext(n)[0] for n in os.listdir(saved_dir)) if os.path.isdir(saved_dir) else []
+        print("Базовые линии: " + (", ".join(saved) if saved else "нет"))
+        return 0
+    if args.repeat < 1:
+        parser.error("--repeat должен быть >= 1")
+
+    # База для сравнения читается до прогона — ошибка в имени не стоит целого прогона
+    baseline = load_results(args.compare, args.bench_dir) if args.compare else None
+    data = run_suite(args.only or list(BENCHMARKS), args.repeat, args.bench_dir, args.world, args.project, args.seed, args.save)
+    print(format_results(data))
+    if not args.no_save:
+        path = results_path(data['label'], args.bench_dir)
+        save_results(data, path)
+        print(f"Результаты сохранены: {path}")
+
+    if baseline is None:
+        return 0
+    if baseline['world'] != data['world']:
+        print(f"Внимание: база сравнения снята на другом мире ({baseline['world']['source']})", file=sys.stderr)
+    rows = compare_results(baseline, data, args.threshold)
+    print(format_comparison(rows, baseline['label']))
+    return 1 if any(r['status'] == 'REGRESSION' for r in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# tools/build_bracket_profile.py
+# Авто-профиль по фракции, диапазону уровней и континенту: зоны и квесты выбираются сами.
+# Запуск: python -m tools.build_bracket_profile --faction horde --levels 58-67 --continent Outland
+#         [--project "58 - 67 Outland.json"] [--xml "58 - 67 Outland.xml"] [--split bracket --brackets 58-62,63-67]
+import argparse
+import os
+import sys
+
+from core.db import Database, configure_database
+from core.logger import get_logger
+from logic.bracket_builder import build_bracket_sessions, bracket_profile_name
+from logic.session_manager import SessionManager
+from exporter.easy_quest_xml import generate_easy_quest_xml, GENERATION_WORKERS
+from exporter.split_output import SPLIT_KEYS, DEFAULT_BRACKET_WIDTH, parse_brackets, parse_split_spec, generate_split_profiles
+
+logger = get_logger(__name__)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Автосборка профиля по фракции, диапазону уровней и континенту.")
+    parser.add_argument('--faction', required=True, choices=['alliance', 'horde'])
+    parser.add_argument('--levels', required=True, help="Диапазон QuestLevel: '58-67'")
+    parser.add_argument('--continent', required=True, help="Eastern Kingdoms, Kalimdor или Outland")
+    parser.add_argument('--project', help="Сохранить набор зон как project.json (для доработки в UI)")
+    parser.add_argument('--xml', help="Сгенерировать профиль (по умолчанию '<мин> - <макс> <континент>.xml', если не задан --project)")
+    parser.add_argument('--split', help=f"Вместо одного XML — набор (ключи {', '.join(SPLIT_KEYS)} через '+') в каталоге --xml")
+    parser.add_argument('--brackets', help="Диапазоны уровней для --split bracket: '58-62,63-67'")
+    parser.add_argument('--bracket-width', type=int, default=DEFAULT_BRACKET_WIDTH)
+    parser.add_argument('--workers', type=int, default=GENERATION_WORKERS, help="Потоков на разрешение квестов (1 — без пула)")
+    parser.add_argument('--db-config', help="Файл конфигурации БД (вместо config/db.yaml)")
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], help="Бэкенд БД")
+    args = parser.parse_args(argv)
+
+    try:
+        (min_level, max_level), = parse_brackets(args.levels)
+        split = parse_split_spec(args.split, args.brackets, args.bracket_width) if args.split else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers < 1:
+        parser.error("--workers должен быть >= 1")
+    if args.db_config or args.backend:
+        configure_database(args.db_config, args.backend)
+
+    db = Database()
+    try:
+        sessions = build_bracket_sessions(db, args.faction, min_level, max_level, args.continent)
+    except ValueError as e:
+        print(f"ОШИБКА {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    if not sessions:
+        print("Подходящих квестов не найдено", file=sys.stderr)
+        return 1
+    for s in sessions:
+        print(f"  {s.zone_name} ({s.zone_id}): {len(s.selected_quest_ids)} квестов")
+
+    name = bracket_profile_name(min_level, max_level, args.continent)
+    if args.project:
+        manager = SessionManager(args.project)
+        manager.sessions = sessions
+        manager.save()
+        print(f"Проект: {args.project}")
+    if args.xml or not args.project:
+        output = args.xml or (name if split else f"{name}.xml")
+        if split:
+            paths = generate_split_profiles(sessions, split, output, workers=args.workers)
+        else:
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+            generate_easy_quest_xml(sessions, output, workers=args.workers)
+            paths = [output]
+        for path in paths:
+            print(f"Профиль: {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+# tools/build_loot_index.py
+# Предрасчет индекса лута item -> доноры (с разворотом reference_loot_template).
+# Запуск: python -m tools.build_loot_index [--path cache/loot_index.json.gz] [--item 12345 [--cutoff 0.95]]
+import argparse
+import time
+
+from core.db import Database
+from core.logger import get_logger
+from logic.loot_index import (build_loot_index, save_loot_index, cut_by_cumulative_chance,
+                              LOOT_INDEX_PATH, LOOT_CUMULATIVE_CUTOFF)
+
+logger = get_logger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка индекса лута (предмет -> мобы/объекты с шансами).")
+    parser.add_argument('--path', default=LOOT_INDEX_PATH, help="Файл индекса")
+    parser.add_argument('--item', type=int, help="Показать доноров предмета после сборки")
+    parser.add_argument('--cutoff', type=float, default=LOOT_CUMULATIVE_CUTOFF, help="Порог суммарного шанса для --item")
+    args = parser.parse_args()
+
+    db = Database()
+    start = time.perf_counter()
+    try:
+        index = build_loot_index(db)
+        save_loot_index(index, db.fingerprint(), args.path)
+    finally:
+        db.close()
+    print(f"Индекс лута: {len(index)} предметов за {time.perf_counter() - start:.1f} с ({args.path})")
+
+    if args.item is not None:
+        sources = index.get(args.item, [])
+        kept = cut_by_cumulative_chance(sources, args.cutoff)
+        for entry, source_type, chance in sources:
+            mark = '' if (entry, source_type, chance) in kept else '  (отсечен)'
+            print(f"  {source_type:3} {entry:>8}  {chance * 100:7.3f}%{mark}")
+
+if __name__ == "__main__":
+    main()
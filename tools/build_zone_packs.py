@@ -0,0 +1,28 @@
+# tools/build_zone_packs.py
+# Предрасчет каталогов квестов для всех зон из ZONE_NAMES и обеих фракций.
+# Запуск: python -m tools.build_zone_packs [--force] [--dir cache/zone_packs]
+import argparse
+import time
+
+from core.db import Database
+from core.logger import get_logger
+from logic.zone_catalog import build_all_zone_packs, ZONE_PACK_DIR
+
+logger = get_logger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка паков зон (квесты, цели, стартеры, цепочки).")
+    parser.add_argument('--dir', default=ZONE_PACK_DIR, help="Каталог паков")
+    parser.add_argument('--force', action='store_true', help="Пересобрать даже актуальные паки")
+    args = parser.parse_args()
+
+    db = Database()
+    start = time.perf_counter()
+    try:
+        built = build_all_zone_packs(db, args.dir, force=args.force)
+    finally:
+        db.close()
+    print(f"Собрано паков: {built} за {time.perf_counter() - start:.1f} с ({args.dir})")
+
+if __name__ == "__main__":
+    main()
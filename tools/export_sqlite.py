@@ -0,0 +1,95 @@
+# tools/export_sqlite.py
+# Копирует таблицы мира, которые читает генератор, из MySQL в локальный SQLite-файл.
+# Запуск: python -m tools.export_sqlite [--output data/world.sqlite]
+import argparse
+import os
+import sqlite3
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from core.db import Database
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Таблица -> (колонки или None = все, индексы)
+EXPORT_TABLES: Dict[str, Tuple[Optional[List[str]], List[Tuple[str, ...]]]] = {
+    'quest_template': (None, [('entry',), ('ZoneOrSort',)]),
+    'creature': (['guid', 'id', 'map', 'position_x', 'position_y', 'position_z'],
+                 [('id',), ('map', 'position_x', 'position_y')]),
+    'creature_template': (['entry', 'Name', 'SubName', 'NpcFlags'], [('entry',)]),
+    'gameobject': (['guid', 'id', 'map', 'position_x', 'position_y', 'position_z'],
+                   [('id',), ('map', 'position_x', 'position_y')]),
+    'gameobject_template': (['entry', 'name'], [('entry',)]),
+    'creature_questrelation': (None, [('id',), ('quest',)]),
+    'creature_involvedrelation': (None, [('id',), ('quest',)]),
+    'gameobject_questrelation': (None, [('id',), ('quest',)]),
+    'gameobject_involvedrelation': (None, [('id',), ('quest',)]),
+    'item_template': (['entry', 'name', 'startquest'], [('entry',), ('startquest',)]),
+    'creature_loot_template': (None, [('entry',), ('item',)]),
+    'gameobject_loot_template': (None, [('entry',), ('item',)]),
+    'reference_loot_template': (None, [('entry',)]),
+}
+
+BATCH_SIZE = 5000
+
+def _sqlite_value(value):
+    # SQLite не знает Decimal; репозитории все равно приводят координаты к float
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def export_table(src: Database, dst: sqlite3.Connection, table: str, columns: Optional[List[str]], indexes) -> int:
+    select_cols = ", ".join(f"`{c}`" for c in columns) if columns else "*"
+    rows = src.execute(f"SELECT {select_cols} FROM `{table}`")
+    if not rows:
+        logger.warning(f"{table}: таблица пуста, пропускаем")
+        return 0
+
+    names = list(rows[0].keys())
+    dst.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+    dst.execute(f'CREATE TABLE {_quote(table)} ({", ".join(_quote(n) for n in names)})')
+    insert = f'INSERT INTO {_quote(table)} VALUES ({", ".join("?" for _ in names)})'
+    for i in range(0, len(rows), BATCH_SIZE):
+        batch = rows[i:i + BATCH_SIZE]
+        dst.executemany(insert, [tuple(_sqlite_value(row[n]) for n in names) for row in batch])
+
+    for cols in indexes:
+        idx_name = f"idx_{table}_{'_'.join(cols)}"
+        dst.execute(f'CREATE INDEX {_quote(idx_name)} ON {_quote(table)} ({", ".join(_quote(c) for c in cols)})')
+    dst.commit()
+    logger.info(f"{table}: {len(rows)} строк")
+    return len(rows)
+
+def export_world(src: Database, output_path: str, tables: Dict = EXPORT_TABLES):
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        for table, (columns, indexes) in tables.items():
+            export_table(src, dst, table, columns, indexes)
+        dst.execute("ANALYZE")
+        dst.commit()
+    finally:
+        dst.close()
+    os.replace(tmp_path, output_path)
+    logger.info(f"SQLite база записана: {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт мира из MySQL в SQLite для оффлайн-генерации.")
+    parser.add_argument('--output', default=os.path.join('data', 'world.sqlite'), help="Путь к SQLite-файлу")
+    args = parser.parse_args()
+
+    src = Database(backend='mysql')
+    try:
+        export_world(src, args.output)
+    finally:
+        src.close()
+
+if __name__ == "__main__":
+    main()
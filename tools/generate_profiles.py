@@ -0,0 +1,68 @@
+# tools/generate_profiles.py
+# Генерация профилей из командной строки (без Tk): по XML на каждый project.json.
+# Запуск: python -m tools.generate_profiles project.json "projects/**/*.json" [--output-dir out] [--workers 4] [--trace]
+#         [--split bracket+continent --brackets 58-67,68-70] [--factions horde,alliance --classes Rogue,Mage]
+import argparse
+import sys
+
+from core.db import configure_database
+from core.logger import get_logger
+from exporter.batch import generate_profiles
+from exporter.easy_quest_xml import GENERATION_WORKERS
+from exporter.split_output import SPLIT_KEYS, DEFAULT_BRACKET_WIDTH, parse_split_spec
+from exporter.matrix import FACTIONS, parse_matrix
+
+logger = get_logger(__name__)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Генерация EasyQuest профилей по project.json без UI.")
+    parser.add_argument('projects', nargs='+', help="Пути или glob-шаблоны project.json")
+    parser.add_argument('--output-dir', help="Каталог для XML с путями проектов относительно каталога шаблона (по умолчанию — рядом с проектом)")
+    parser.add_argument('--workers', type=int, default=GENERATION_WORKERS, help="Потоков на разрешение квестов (1 — без пула)")
+    parser.add_argument('--trace', action='store_true', help="Сохранить Chrome trace генерации рядом с каждым XML (*.trace.json)")
+    parser.add_argument('--no-cache', action='store_true', help="Пересчитать все сессии (не брать готовые из cache/sessions)")
+    parser.add_argument('--split', help=f"Несколько профилей на проект: ключи {', '.join(SPLIT_KEYS)} через '+' "
+                                         "(файлы — в каталоге с именем проекта)")
+    parser.add_argument('--brackets', help="Диапазоны уровней для --split bracket: '58-67,68-70'")
+    parser.add_argument('--bracket-width', type=int, default=DEFAULT_BRACKET_WIDTH,
+                        help="Ширина диапазона уровней, если --brackets не задан")
+    parser.add_argument('--factions', help=f"Матрица профилей: фракции ({', '.join(FACTIONS)}) через ',' или 'all' "
+                                           "(файлы 'Horde Rogue.xml' — в каталоге с именем проекта)")
+    parser.add_argument('--classes', help="Классы для --factions через ',' или 'all'; без них — по профилю на фракцию")
+    parser.add_argument('--db-config', help="Файл конфигурации БД (вместо config/db.yaml)")
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], help="Бэкенд БД")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers должен быть >= 1")
+    split = None
+    if args.split:
+        try:
+            split = parse_split_spec(args.split, args.brackets, args.bracket_width)
+        except ValueError as e:
+            parser.error(str(e))
+    matrix = None
+    if args.classes and not args.factions:
+        parser.error("--classes задается вместе с --factions")
+    if args.factions:
+        if split is not None:
+            parser.error("--split и --factions не совмещаются")
+        try:
+            matrix = parse_matrix(args.factions, args.classes)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.db_config or args.backend:
+        configure_database(args.db_config, args.backend)
+
+    done, failed = generate_profiles(args.projects, args.output_dir, args.workers, args.trace, not args.no_cache, split, matrix)
+    for project, output in done:
+        print(f"{project} -> {output}")
+    for project, error in failed:
+        print(f"{project}: ОШИБКА {error}", file=sys.stderr)
+    if not done and not failed:
+        print("Проекты не найдены", file=sys.stderr)
+        return 1
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# tools/index_advisor.py
+# EXPLAIN по всем формам запросов из data_access/, logic/loot_index.py и exporter/easy_quest_xml.py.
+# Запуск: python -m tools.index_advisor [--migration indexes.sql] [--apply]
+import argparse
+import re
+import statistics
+import time
+from typing import List, Dict, Tuple, Callable, Any, Optional
+
+from core.db import Database
+from core.logger import get_logger
+from data_access import npc_repo, quests_repo, quest_table, spawns_repo, zones_repo
+from logic import loot_index
+from exporter import easy_quest_xml
+
+logger = get_logger(__name__)
+
+# Вторичные индексы, которых нет в стоковой схеме CMaNGOS: (таблица, имя индекса, колонки)
+RECOMMENDED_INDEXES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ('item_template', 'idx_startquest', ('startquest',)),
+    ('quest_template', 'idx_zone_or_sort', ('ZoneOrSort',)),
+    # Загрузка сервисных NPC карты: фильтр c.map = %s, соединение с creature_template по c.id
+    ('creature', 'idx_map_id', ('map', 'id')),
+    ('creature_questrelation', 'idx_quest', ('quest',)),
+    ('creature_involvedrelation', 'idx_quest', ('quest',)),
+    ('gameobject_questrelation', 'idx_quest', ('quest',)),
+    ('gameobject_involvedrelation', 'idx_quest', ('quest',)),
+]
+
+_SQL_KEYWORDS = {'WHERE', 'JOIN', 'ON', 'LEFT', 'RIGHT', 'INNER', 'ORDER', 'GROUP', 'LIMIT', 'AND', 'OR'}
+_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+
+class _CaptureDb:
+    """Подставляется вместо Database: запоминает запросы и возвращает пустой результат."""
+    def __init__(self):
+        self.queries: List[Tuple[str, Any]] = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        return []
+
+def build_probes(quest_id: int, item_id: int, map_id: int) -> List[Tuple[str, Callable, tuple]]:
+    """Список (метка, функция, аргументы без db) — по одному вызову на каждую форму запроса."""
+    return [
+        ('npc_repo.get_quest_starter_type', npc_repo.get_quest_starter_type, (quest_id,)),
+        ('npc_repo.get_quest_starter_npc', npc_repo.get_quest_starter_npc, (quest_id,)),
+        ('npc_repo.get_quest_ender_npc', npc_repo.get_quest_ender_npc, (quest_id,)),
+        ('npc_repo.get_quest_starter_go', npc_repo.get_quest_starter_go, (quest_id,)),
+        ('npc_repo.get_quest_ender_go', npc_repo.get_quest_ender_go, (quest_id,)),
+        ('npc_repo.get_quest_relations_bulk', npc_repo.get_quest_relations_bulk, ([quest_id],)),
+        ('npc_repo.get_quest_starter_types_bulk', npc_repo.get_quest_starter_types_bulk, ([quest_id],)),
+        ('npc_repo.get_service_npc_spawns', npc_repo.get_service_npc_spawns, (map_id,)),
+        # Квесты зоны (quests_repo.get_quests_by_zone) берутся из этой таблицы в памяти — отдельного запроса нет
+        ('quest_table.load_quest_table', quest_table.load_quest_table, ()),
+        ('quests_repo.get_objectives_for_quest', quests_repo.get_objectives_for_quest, (quest_id,)),
+        ('quests_repo.get_objectives_for_quests', quests_repo.get_objectives_for_quests, ([quest_id],)),
+        ('quests_repo.get_quest_details', quests_repo.get_quest_details, (quest_id,)),
+        # entry 0 нет в Questie -> гарантированно уходим в фоллбек на БД
+        ('spawns_repo.get_creature_spawns', spawns_repo.get_creature_spawns, (0,)),
+        ('spawns_repo.get_gameobject_spawns', spawns_repo.get_gameobject_spawns, (0,)),
+        ('zones_repo.get_all_zone_ids', zones_repo.get_all_zone_ids, ()),
+        ('loot_index.build_loot_index', loot_index.build_loot_index, ()),
+        ('easy_quest_xml.is_gameobject', easy_quest_xml.is_gameobject, (item_id,)),
+    ]
+
+def collect_query_shapes(probes) -> List[Tuple[str, str, Any]]:
+    """Вызывает функции репозиториев на _CaptureDb и возвращает (метка, запрос, параметры)."""
+    shapes = []
+    for label, func, args in probes:
+        capture = _CaptureDb()
+        try:
+            func(capture, *args)
+        except Exception as e:
+            logger.warning(f"{label}: не удалось собрать запросы ({e})")
+        for i, (query, params) in enumerate(capture.queries):
+            suffix = f"#{i + 1}" if len(capture.queries) > 1 else ""
+            shapes.append((label + suffix, query, params))
+    return shapes
+
+def table_aliases(query: str) -> Dict[str, str]:
+    """Сопоставляет алиасы (и сами имена) таблиц из FROM/JOIN с именами таблиц."""
+    aliases = {}
+    for table, alias in _TABLE_RE.findall(query):
+        aliases[table] = table
+        if alias and alias.upper() not in _SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+def explain_query(db: Database, query: str, params) -> List[Dict[str, Any]]:
+    """EXPLAIN по запросу; для каждой строки плана добавляет список проблем."""
+    aliases = table_aliases(query)
+    plan = db.execute("EXPLAIN " + query, params)
+    for row in plan:
+        problems = []
+        access = (row.get('type') or '').upper()
+        extra = row.get('Extra') or ''
+        if access == 'ALL':
+            problems.append('full scan')
+        elif access == 'INDEX':
+            problems.append('full index scan')
+        if 'filesort' in extra:
+            problems.append('filesort')
+        if 'temporary' in extra:
+            problems.append('temporary')
+        row['real_table'] = aliases.get(row.get('table'), row.get('table'))
+        row['problems'] = problems
+    return plan
+
+def time_query(db: Database, query: str, params, repeat: int) -> float:
+    """Медиана времени выполнения запроса в мс."""
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        db.execute(query, params)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(timings)
+
+def existing_index_columns(db: Database, table: str) -> List[Tuple[str, ...]]:
+    """Списки колонок всех индексов таблицы (в порядке Seq_in_index)."""
+    indexes: Dict[str, List[Tuple[int, str]]] = {}
+    for row in db.execute(f"SHOW INDEX FROM `{table}`"):
+        indexes.setdefault(row['Key_name'], []).append((int(row['Seq_in_index']), row['Column_name']))
+    return [tuple(col for _, col in sorted(cols)) for cols in indexes.values()]
+
+def missing_indexes(db: Database, flagged_tables) -> List[Tuple[str, str, Tuple[str, ...]]]:
+    """Рекомендованные индексы для проблемных таблиц, которых еще нет (по префиксу колонок)."""
+    result = []
+    for table, name, columns in RECOMMENDED_INDEXES:
+        if table not in flagged_tables:
+            continue
+        try:
+            existing = existing_index_columns(db, table)
+        except Exception as e:
+            logger.warning(f"SHOW INDEX FROM {table}: {e}")
+            continue
+        if any(idx[:len(columns)] == columns for idx in existing):
+            continue
+        result.append((table, name, columns))
+    return result
+
+def migration_sql(indexes) -> str:
+    lines = ["-- Рекомендованные вторичные индексы (tools/index_advisor.py)"]
+    for table, name, columns in indexes:
+        cols = ", ".join(f"`{c}`" for c in columns)
+        lines.append(f"ALTER TABLE `{table}` ADD INDEX `{name}` ({cols});")
+    return "\n".join(lines) + "\n"
+
+def run_advisor(db: Database, probes, repeat: int = 3, migration_path: Optional[str] = None, apply: bool = False) -> str:
+    shapes = collect_query_shapes(probes)
+    report = []
+    flagged_tables = set()
+    before: Dict[str, float] = {}
+
+    report.append(f"Проверено форм запросов: {len(shapes)}")
+    for label, query, params in shapes:
+        try:
+            plan = explain_query(db, query, params)
+            before[label] = time_query(db, query, params, repeat)
+        except Exception as e:
+            report.append(f"[ERR ] {label}: {e}")
+            continue
+
+        problems = [f"{row['real_table']}: {', '.join(row['problems'])} (~{row.get('rows')} строк)" for row in plan if row['problems']]
+        for row in plan:
+            if row['problems']:
+                flagged_tables.add(row['real_table'])
+        status = "WARN" if problems else " OK "
+        report.append(f"[{status}] {label}  {before[label]:.2f} мс")
+        for p in problems:
+            report.append(f"         - {p}")
+
+    recommended = missing_indexes(db, flagged_tables)
+    if not recommended:
+        report.append("Недостающих рекомендованных индексов не найдено.")
+        return "\n".join(report)
+
+    sql = migration_sql(recommended)
+    report.append("Рекомендованные индексы:")
+    report.extend("  " + line for line in sql.strip().splitlines()[1:])
+
+    if migration_path:
+        with open(migration_path, 'w', encoding='utf-8') as f:
+            f.write(sql)
+        report.append(f"Миграция записана в {migration_path}")
+
+    if apply:
+        for statement in sql.strip().splitlines()[1:]:
+            logger.info(f"Применяем: {statement}")
+            db.execute(statement)
+
+        report.append("Время до / после индексов:")
+        for label, query, params in shapes:
+            if label not in before:
+                continue
+            after = time_query(db, query, params, repeat)
+            speedup = before[label] / after if after > 0 else 0.0
+            report.append(f"  {label:<55} {before[label]:>9.2f} -> {after:>9.2f} мс  (x{speedup:.1f})")
+
+    return "\n".join(report)
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN по всем запросам генератора и рекомендации индексов.")
+    parser.add_argument('--quest', type=int, default=456, help="ID квеста для примеров запросов")
+    parser.add_argument('--item', type=int, default=5166, help="ID предмета для запросов лута")
+    parser.add_argument('--map', type=int, default=1, help="ID карты для поиска NPC")
+    parser.add_argument('--repeat', type=int, default=3, help="Сколько раз выполнять каждый запрос для замера")
+    parser.add_argument('--migration', help="Записать SQL-миграцию с рекомендованными индексами в файл")
+    parser.add_argument('--apply', action='store_true', help="Применить индексы и замерить время после")
+    args = parser.parse_args()
+
+    db = Database()
+    if db.backend.name != 'mysql':
+        db.close()
+        parser.error(f"EXPLAIN/SHOW INDEX поддерживаются только для MySQL, текущий бэкенд: {db.backend.describe()}")
+    try:
+        probes = build_probes(args.quest, args.item, args.map)
+        print(run_advisor(db, probes, repeat=args.repeat, migration_path=args.migration, apply=args.apply))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# tools/patch_profile.py
+# Обновление готового (в том числе правленного руками) профиля: пересобираются только изменившиеся квесты.
+# Запуск: python -m tools.patch_profile project.json Elf2.xml [--output Elf2_new.xml] [--workers 4] [--trace]
+import argparse
+import sys
+
+from core.db import configure_database
+from core.logger import get_logger
+from exporter.batch import patch_profile
+from exporter.easy_quest_xml import GENERATION_WORKERS
+from exporter.profile_patch import manifest_path_for
+
+logger = get_logger(__name__)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Обновление EasyQuest профиля по project.json с сохранением ручных правок.")
+    parser.add_argument('project', help="project.json")
+    parser.add_argument('profile', help="XML профиля (если его нет — будет создан)")
+    parser.add_argument('--output', help="Куда записать результат (по умолчанию — поверх профиля)")
+    parser.add_argument('--workers', type=int, default=GENERATION_WORKERS, help="Потоков на разрешение квестов (1 — без пула)")
+    parser.add_argument('--trace', action='store_true', help="Сохранить Chrome trace рядом с профилем (*.trace.json)")
+    parser.add_argument('--db-config', help="Файл конфигурации БД (вместо config/db.yaml)")
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], help="Бэкенд БД")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers должен быть >= 1")
+    if args.db_config or args.backend:
+        configure_database(args.db_config, args.backend)
+
+    try:
+        counts = patch_profile(args.project, args.profile, args.output, args.workers, args.trace)
+    except Exception as e:
+        print(f"{args.project}: ОШИБКА {e}", file=sys.stderr)
+        return 1
+    output = args.output or args.profile
+    print(f"{args.project} -> {output} ({manifest_path_for(output)})")
+    print("  " + ", ".join(f"{action} {n}" for action, n in counts.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# tools/replay_run.py
+# Прогон генерации проекта с записью фикстуры БД или оффлайн-реплеем из нее.
+# Запись:  python -m tools.replay_run project.json out.xml --record fixtures/run.json.gz
+# Реплей:  python -m tools.replay_run project.json out.xml --replay fixtures/run.json.gz
+import argparse
+import time
+
+from core.db import configure_fixtures
+from core.logger import get_logger
+from logic.session_manager import SessionManager
+from exporter.easy_quest_xml import generate_easy_quest_xml
+
+logger = get_logger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация профиля с записью/реплеем фикстуры БД.")
+    parser.add_argument('project', help="Путь к project.json")
+    parser.add_argument('output', help="Путь к выходному XML")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--record', metavar='FIXTURE', help="Работать с MySQL и записать фикстуру")
+    group.add_argument('--replay', metavar='FIXTURE', help="Работать без сервера, из фикстуры")
+    args = parser.parse_args()
+
+    if args.record:
+        configure_fixtures('record', args.record)
+    else:
+        configure_fixtures('replay', args.replay)
+
+    sessions = SessionManager(args.project).load()
+    if not sessions:
+        parser.error(f"В проекте {args.project} нет зон")
+
+    start = time.perf_counter()
+    # Кэш сессий в режимах record/replay отключается в resolve_sessions
+    generate_easy_quest_xml(sessions, args.output)
+    logger.info(f"Профиль {args.output} сгенерирован за {time.perf_counter() - start:.2f} с")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# tools/synthetic_world.py
+# Детерминированный синтетический мир в SQLite (схема как у tools.export_sqlite) и проект к нему.
+# Нужен бенчмаркам и проверкам без MySQL. Запуск: python -m tools.synthetic_world [--output cache/benchmarks/world.sqlite]
+import argparse
+import json
+import os
+import random
+import sqlite3
+from typing import Dict, List, Any
+
+from core.coord_converter import ZONE_DIMENSIONS
+from core.logger import get_logger
+from tools.export_sqlite import EXPORT_TABLES, _quote
+
+logger = get_logger(__name__)
+
+# Увеличить при любом изменении генератора — бенчмарки не сравнивают результаты разных версий мира
+SYNTHETIC_WORLD_VERSION = 1
+SYNTHETIC_SEED = 7
+
+# Зона -> карта: по одной зоне на каждый континент и вторая зона Калимдора
+SYNTHETIC_ZONES = {188: 1, 141: 1, 3483: 530, 12: 0}
+QUESTS_PER_ZONE = 30
+SELECTED_PER_ZONE = 25
+
+SCHEMA = """
+CREATE TABLE quest_template(entry, Title, MinLevel, QuestLevel, ZoneOrSort, RequiredRaces, PrevQuestId, NextQuestId,
+ NextQuestInChain, SpecialFlags, SuggestedPlayers,
+ ReqCreatureOrGOId1, ReqCreatureOrGOId2, ReqCreatureOrGOId3, ReqCreatureOrGOId4, ReqItemId1, ReqItemId2, ReqItemId3, ReqItemId4,
+ ReqCreatureOrGOCount1, ReqCreatureOrGOCount2, ReqCreatureOrGOCount3, ReqCreatureOrGOCount4,
+ ReqItemCount1, ReqItemCount2, ReqItemCount3, ReqItemCount4, Details, Objectives);
+CREATE TABLE creature(guid, id, map, position_x, position_y, position_z);
+CREATE TABLE creature_template(entry, Name, SubName, NpcFlags);
+CREATE TABLE gameobject(guid, id, map, position_x, position_y, position_z);
+CREATE TABLE gameobject_template(entry, name);
+CREATE TABLE creature_questrelation(id, quest);
+CREATE TABLE creature_involvedrelation(id, quest);
+CREATE TABLE gameobject_questrelation(id, quest);
+CREATE TABLE gameobject_involvedrelation(id, quest);
+CREATE TABLE item_template(entry, name, startquest);
+CREATE TABLE creature_loot_template(entry, item, ChanceOrQuestChance, groupid, mincountOrRef, maxcount);
+CREATE TABLE gameobject_loot_template(entry, item, ChanceOrQuestChance, groupid, mincountOrRef, maxcount);
+CREATE TABLE reference_loot_template(entry, item, ChanceOrQuestChance, groupid, mincountOrRef, maxcount);
+"""
+
+SERVICE_SUBNAMES = ['Rogue Trainer', 'Warrior Trainer', 'Mage Trainer', 'Innkeeper', 'Druid Trainer']
+SERVICE_FLAGS = [16, 128, 4096, 128 | 4096, 8192, 2]
+
+class _WorldWriter:
+    def __init__(self, conn: sqlite3.Connection, rnd: random.Random):
+        self.conn = conn
+        self.rnd = rnd
+        self.guid = 1
+        self.npc_entry = 900000
+        self.item = 50000
+        self.quest = 10000
+
+    def spawn(self, table: str, entry: int, map_id: int, x: float, y: float, z: float = 50.0):
+        self.conn.execute(f"INSERT INTO {table} VALUES (?,?,?,?,?,?)", (self.guid, entry, map_id, x, y, z))
+        self.guid += 1
+
+    def zone_point(self, zone_id: int):
+        d = ZONE_DIMENSIONS[zone_id]
+        return self.rnd.uniform(d['bottom'], d['top']), self.rnd.uniform(d['right'], d['left'])
+
+    def creature(self, name: str, subname: str = '', flags: int = 0) -> int:
+        entry = self.npc_entry
+        self.conn.execute("INSERT INTO creature_template VALUES (?,?,?,?)", (entry, f"{name}{entry}", subname, flags))
+        self.npc_entry += 1
+        return entry
+
+    def zone(self, zone_id: int, map_id: int) -> List[int]:
+        rnd = self.rnd
+        # Моб/объект с id около zone*1000 часто есть и в Questie — оба источника спавнов участвуют
+        mobs = list(range(zone_id * 1000, zone_id * 1000 + 40))
+        gos = list(range(zone_id * 1000 + 500, zone_id * 1000 + 515))
+
+        for _ in range(25):
+            entry = self.creature(rnd.choice(['Bob', 'Ann', '[DND] x', 'Tom']), rnd.choice(SERVICE_SUBNAMES), rnd.choice(SERVICE_FLAGS))
+            for _ in range(rnd.choice([1, 1, 2])):
+                self.spawn('creature', entry, map_id, *self.zone_point(zone_id))
+        givers = []
+        for _ in range(8):
+            entry = self.creature("Giver", flags=2)
+            for _ in range(rnd.choice([1, 2, 3])):
+                self.spawn('creature', entry, map_id, *self.zone_point(zone_id))
+            givers.append(entry)
+        for entry in mobs:
+            self.conn.execute("INSERT OR IGNORE INTO creature_template VALUES (?,?,?,?)", (entry, f"Mob{entry}", '', 0))
+            cx, cy = self.zone_point(zone_id)
+            for _ in range(rnd.randint(1, 12)):
+                self.spawn('creature', entry, map_id, cx + rnd.uniform(-60, 60), cy + rnd.uniform(-60, 60))
+        for entry in gos:
+            self.conn.execute("INSERT INTO gameobject_template VALUES (?,?)", (entry, f"Obj{entry}"))
+            self.spawn('gameobject', entry, map_id, *self.zone_point(zone_id))
+        # Мобы только из БД (без Questie)
+        db_mobs = []
+        for _ in range(5):
+            entry = self.creature("DbMob")
+            cx, cy = self.zone_point(zone_id)
+            for _ in range(6):
+                self.spawn('creature', entry, map_id, cx + rnd.uniform(-40, 40), cy + rnd.uniform(-40, 40))
+            db_mobs.append(entry)
+
+        ids, prev = [], 0
+        for _ in range(QUESTS_PER_ZONE):
+            q = self.quest
+            self.quest += 1
+            ids.append(q)
+            reqs, items, req_counts, item_counts = [0] * 4, [0] * 4, [0] * 4, [0] * 4
+            kind = rnd.choice(['kill', 'loot', 'gather', 'talk', 'mix'])
+            if kind in ('kill', 'mix'):
+                reqs[0] = rnd.choice(mobs + db_mobs)
+                req_counts[0] = rnd.randint(1, 10)
+            if kind in ('loot', 'mix'):
+                items[1], item_counts[1] = self.item, 5
+                for e in rnd.sample(mobs, 3):
+                    self.conn.execute("INSERT INTO creature_loot_template VALUES (?,?,?,?,?,?)",
+                                      (e, self.item, rnd.choice([-80, -35, 0.5, 20]), 0, 1, 1))
+                if rnd.random() < .5:
+                    self.conn.execute("INSERT INTO gameobject_loot_template VALUES (?,?,?,?,?,?)",
+                                      (rnd.choice(gos), self.item, -100, 0, 1, 1))
+                self.item += 1
+            if kind == 'gather':
+                reqs[2], req_counts[2] = -rnd.choice(gos), 3
+            prev_quest = prev if rnd.random() < .4 else 0
+            min_level = rnd.randint(1, 12)
+            races = rnd.choice([0, 0, 1101, 690, 8])
+            self.conn.execute("INSERT INTO quest_template VALUES (" + ",".join("?" * 29) + ")",
+                              (q, f"Quest {q} the 'Great'", min_level, min_level + 1, zone_id, races, prev_quest, 0, 0, 0, 0,
+                               *reqs, *items, *req_counts, *item_counts, "details", "obj"))
+            prev = q
+            giver = rnd.choice(givers)
+            self.conn.execute("INSERT INTO creature_questrelation VALUES (?,?)", (giver, q))
+            self.conn.execute("INSERT INTO creature_involvedrelation VALUES (?,?)", (rnd.choice(givers + [giver]), q))
+            if rnd.random() < .15:
+                self.conn.execute("INSERT INTO gameobject_questrelation VALUES (?,?)", (rnd.choice(gos), q))
+        # Квест, который берется с предмета
+        self.conn.execute("INSERT INTO item_template VALUES (?,?,?)", (self.item, 'Starter', ids[-1]))
+        return ids
+
+def synthetic_project(zone_quests: Dict[int, List[int]]) -> List[Dict[str, Any]]:
+    """Сессии проекта (формат project.json) по квестам синтетических зон."""
+    sessions = []
+    for zone_id, ids in zone_quests.items():
+        sessions.append({
+            "zone_id": zone_id, "zone_name": f"Z{zone_id}", "faction": "alliance",
+            "selected_quest_ids": ids[:SELECTED_PER_ZONE],
+            "grind_settings": {"mob_id": 2007, "mob_name": "x", "min_level": 1, "target_level": 10,
+                               "hotspots": [{"x": 1.0, "y": 2.0, "z": 3.0}]},
+            "run_to_points": [{"x": 1.5, "y": 2.5, "z": 3.5, "name": "RunTo 1"}] if zone_id == 188 else [],
+            "include_vendors": True, "include_trainers": True, "include_flight_masters": zone_id != 12,
+        })
+    return sessions
+
+def build_synthetic_world(output_path: str, project_path: str, seed: int = SYNTHETIC_SEED):
+    """Пишет мир в output_path и проект к нему в project_path. Одинаковый seed — побайтно одинаковые данные."""
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        writer = _WorldWriter(conn, random.Random(seed))
+        zone_quests = {zone_id: writer.zone(zone_id, map_id) for zone_id, map_id in SYNTHETIC_ZONES.items()}
+        for table, (_, indexes) in EXPORT_TABLES.items():
+            for cols in indexes:
+                conn.execute(f'CREATE INDEX {_quote("idx_" + table + "_" + "_".join(cols))} ON {_quote(table)} '
+                             f'({", ".join(_quote(c) for c in cols)})')
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, output_path)
+
+    os.makedirs(os.path.dirname(project_path) or '.', exist_ok=True)
+    with open(project_path, 'w', encoding='utf-8') as f:
+        json.dump(synthetic_project(zone_quests), f, indent=1)
+    logger.info(f"Синтетический мир записан: {output_path} ({writer.quest - 10000} квестов), проект: {project_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетический мир в SQLite для бенчмарков и оффлайн-проверок.")
+    parser.add_argument('--output', default=os.path.join('cache', 'benchmarks', 'world.sqlite'), help="Путь к SQLite-файлу")
+    parser.add_argument('--project', help="Куда записать project.json (по умолчанию рядом с базой)")
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_SEED)
+    args = parser.parse_args()
+    project = args.project or os.path.join(os.path.dirname(args.output) or '.', 'project.json')
+    build_synthetic_world(args.output, project, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,31 @@
 # ui/app.py
 import tkinter as tk
-from tkinter import ttk, messagebox
-from typing import Optional
+from tkinter import ttk, messagebox, filedialog
+from typing import Optional, List
 import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
 from core.db import Database
 from core.logger import get_logger
 from logic.session_manager import SessionManager, ZoneSession
 from ui.zone_panel import ZonePanel
+from ui.query_stats_dialog import QueryStatsDialog
+from ui.bracket_dialog import BracketDialog
 from exporter.easy_quest_xml import generate_easy_quest_xml
+from exporter.profile_patch import patch_easy_quest_xml
+from exporter.split_output import SplitSpec, generate_split_profiles
+from exporter.world_caches import clear_generation_caches
 
 logger = get_logger(__name__)
 
+# Варианты разбивки вывода: подпись -> ключи SplitSpec (None — один общий файл)
+SPLIT_OPTIONS = {
+    "Один файл": None,
+    "По зонам": ['session'],
+    "По уровням (10)": ['bracket'],
+    "По континентам": ['continent'],
+    "По уровням и континентам": ['bracket', 'continent'],
+}
+
 class QuesterApp(ttkb.Window):
     def __init__(self):
         super().__init__(themename="superhero")
@@ -43,8 +57,14 @@ class QuesterApp(ttkb.Window):
         toolbar.pack(fill=tk.X)
         
         ttkb.Button(toolbar, text="＋ Добавить зону", bootstyle=SUCCESS, command=self.add_zone_tab).pack(side=tk.LEFT, padx=5)
+        ttkb.Button(toolbar, text="⚡ Авто-профиль", bootstyle=SUCCESS, command=self.open_bracket_builder).pack(side=tk.LEFT, padx=5)
         ttkb.Button(toolbar, text="💾 Сохранить проект", bootstyle=INFO, command=self.save_project).pack(side=tk.LEFT, padx=5)
         ttkb.Button(toolbar, text="🚀 Генерировать XML", bootstyle=PRIMARY, command=self.generate_xml).pack(side=tk.LEFT, padx=5)
+        self.split_var = tk.StringVar(value="Один файл")
+        ttkb.Combobox(toolbar, textvariable=self.split_var, values=list(SPLIT_OPTIONS), state="readonly", width=24).pack(side=tk.LEFT, padx=5)
+        ttkb.Button(toolbar, text="🩹 Обновить профиль", bootstyle=PRIMARY, command=self.patch_xml).pack(side=tk.LEFT, padx=5)
+        ttkb.Button(toolbar, text="📊 Статистика SQL", bootstyle=SECONDARY, command=self.show_query_stats).pack(side=tk.LEFT, padx=5)
+        ttkb.Button(toolbar, text="♻ Сбросить кэши мира", bootstyle=SECONDARY, command=self.reset_world_caches).pack(side=tk.LEFT, padx=5)
         
         self.notebook = ttkb.Notebook(self, bootstyle=PRIMARY)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -61,6 +81,16 @@ class QuesterApp(ttkb.Window):
         self.notebook.select(panel)
         return panel
 
+    def open_bracket_builder(self):
+        BracketDialog(self, self.db, self.add_built_sessions)
+
+    def add_built_sessions(self, sessions: List[ZoneSession]):
+        """Вкладки зон авто-профиля дописываются к проекту (квесты уже выбраны, порядок — по уровню)."""
+        for session in sessions:
+            self.session_manager.add_session(session)
+            self.add_zone_tab(session)
+        self.save_project(show_msg=False)
+
     def close_current_tab(self):
         idx = self.notebook.index("current")
         if idx < 0: return
@@ -94,13 +124,42 @@ class QuesterApp(ttkb.Window):
             return
         
         filename = "Global_Quester_Profile.xml"
+        split_by = SPLIT_OPTIONS.get(self.split_var.get())
         try:
+            if split_by:
+                # Все файлы — из одного прохода разрешения квестов
+                paths = generate_split_profiles(self.session_manager.sessions, SplitSpec(split_by), "Global_Quester_Profile")
+                messagebox.showinfo("Успех", "Профили сгенерированы:\n" + "\n".join(paths))
+                return
             generate_easy_quest_xml(self.session_manager.sessions, filename)
             messagebox.showinfo("Успех", f"Профиль сгенерирован: {filename}")
         except Exception as e:
             logger.error(f"Generation error: {e}")
             messagebox.showerror("Ошибка", f"Ошибка при генерации: {e}")
 
+    def patch_xml(self):
+        """Обновляет выбранный профиль: изменившиеся квесты пересобираются, ручные правки остаются."""
+        self.save_project(show_msg=False)
+        filename = filedialog.askopenfilename(title="Профиль для обновления", filetypes=[("EasyQuest XML", "*.xml")])
+        if not filename:
+            return
+        try:
+            counts = patch_easy_quest_xml(self.session_manager.sessions, filename)
+            messagebox.showinfo("Успех", f"Профиль обновлен: {filename}\n"
+                                f"пересобрано {counts['replace']}, добавлено {counts['add']}, удалено {counts['remove']}, "
+                                f"ручных правок сохранено {counts['manual']}")
+        except Exception as e:
+            logger.error(f"Patch error: {e}")
+            messagebox.showerror("Ошибка", f"Ошибка при обновлении: {e}")
+
+    def reset_world_caches(self):
+        """После правок БД мира или Questie: следующая генерация перечитает таблицы, граф, спавны и индекс лута."""
+        clear_generation_caches()
+        messagebox.showinfo("Кэши", "Кэши мира сброшены — следующая генерация прочитает данные заново")
+
+    def show_query_stats(self):
+        QueryStatsDialog(self, self.db.stats)
+
     def destroy(self):
         self.db.close()
         super().destroy()
@@ -0,0 +1,68 @@
+# ui/bracket_dialog.py
+import tkinter as tk
+from tkinter import messagebox
+import ttkbootstrap as ttkb
+from ttkbootstrap.constants import *
+from typing import Callable, List
+from core.db import Database
+from core.logger import get_logger
+from logic.bracket_builder import build_bracket_sessions
+from logic.session_manager import ZoneSession
+
+logger = get_logger(__name__)
+
+CONTINENTS = ["Eastern Kingdoms", "Kalimdor", "Outland"]
+
+class BracketDialog(ttkb.Toplevel):
+    """Авто-профиль: фракция, диапазон уровней и континент -> вкладки зон с уже выбранными квестами."""
+    def __init__(self, master, db: Database, on_built: Callable[[List[ZoneSession]], None]):
+        super().__init__(master)
+        self.title("Авто-профиль по уровням")
+        self.geometry("420x230")
+        self.transient(master)
+        self.db = db
+        self.on_built = on_built
+
+        main_frame = ttkb.Frame(self, padding=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        row = ttkb.Frame(main_frame)
+        row.pack(fill=tk.X, pady=5)
+        self.faction_var = tk.StringVar(value="horde")
+        ttkb.Radiobutton(row, text="Альянс", variable=self.faction_var, value="alliance", bootstyle=INFO).pack(side=tk.LEFT, padx=5)
+        ttkb.Radiobutton(row, text="Орда", variable=self.faction_var, value="horde", bootstyle=DANGER).pack(side=tk.LEFT, padx=5)
+
+        row = ttkb.Frame(main_frame)
+        row.pack(fill=tk.X, pady=5)
+        ttkb.Label(row, text="Уровни:").pack(side=tk.LEFT, padx=5)
+        self.min_var = tk.StringVar(value="58")
+        self.max_var = tk.StringVar(value="67")
+        ttkb.Entry(row, textvariable=self.min_var, width=5).pack(side=tk.LEFT)
+        ttkb.Label(row, text="—").pack(side=tk.LEFT, padx=5)
+        ttkb.Entry(row, textvariable=self.max_var, width=5).pack(side=tk.LEFT)
+
+        row = ttkb.Frame(main_frame)
+        row.pack(fill=tk.X, pady=5)
+        ttkb.Label(row, text="Континент:").pack(side=tk.LEFT, padx=5)
+        self.continent_var = tk.StringVar(value="Outland")
+        ttkb.Combobox(row, textvariable=self.continent_var, values=CONTINENTS, state="readonly", width=20).pack(side=tk.LEFT)
+
+        btn_frame = ttkb.Frame(main_frame)
+        btn_frame.pack(pady=15)
+        ttkb.Button(btn_frame, text="Собрать", command=self.build, bootstyle=SUCCESS).pack(side=tk.LEFT, padx=5)
+        ttkb.Button(btn_frame, text="Закрыть", command=self.destroy, bootstyle=SECONDARY).pack(side=tk.LEFT, padx=5)
+
+        self.bind("<Escape>", lambda e: self.destroy())
+
+    def build(self):
+        try:
+            min_level, max_level = int(self.min_var.get()), int(self.max_var.get())
+            sessions = build_bracket_sessions(self.db, self.faction_var.get(), min_level, max_level, self.continent_var.get())
+        except ValueError as e:
+            messagebox.showerror("Ошибка", f"Неверные параметры: {e}", parent=self)
+            return
+        if not sessions:
+            messagebox.showwarning("Внимание", "Подходящих квестов не найдено", parent=self)
+            return
+        self.on_built(sessions)
+        self.destroy()
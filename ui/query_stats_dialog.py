@@ -0,0 +1,51 @@
+# ui/query_stats_dialog.py
+import tkinter as tk
+import ttkbootstrap as ttkb
+from ttkbootstrap.constants import *
+from typing import Optional
+from core.query_stats import QueryStats, get_last_generation_stats
+
+class QueryStatsDialog(ttkb.Toplevel):
+    """Окно со сводкой SQL: последняя генерация и запросы интерфейса."""
+    def __init__(self, master, ui_stats: Optional[QueryStats] = None):
+        super().__init__(master)
+        self.title("Статистика SQL")
+        self.geometry("1100x650")
+        self.transient(master)
+        self.ui_stats = ui_stats
+
+        main_frame = ttkb.Frame(self, padding=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        ttkb.Label(main_frame, text="Последняя генерация:", font=("Segoe UI Bold", 11)).pack(anchor=tk.W)
+        self.gen_text = tk.Text(main_frame, height=15, font=("Consolas", 9), wrap=tk.NONE, padx=5, pady=5)
+        self.gen_text.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+
+        ttkb.Label(main_frame, text="Интерфейс (загрузка зон, инфо квестов):", font=("Segoe UI Bold", 11)).pack(anchor=tk.W)
+        self.ui_text = tk.Text(main_frame, height=10, font=("Consolas", 9), wrap=tk.NONE, padx=5, pady=5)
+        self.ui_text.pack(fill=tk.BOTH, expand=True)
+
+        btn_frame = ttkb.Frame(main_frame)
+        btn_frame.pack(pady=10)
+        ttkb.Button(btn_frame, text="Обновить", command=self.refresh, bootstyle=INFO).pack(side=tk.LEFT, padx=5)
+        ttkb.Button(btn_frame, text="Сбросить UI", command=self.reset_ui_stats, bootstyle=WARNING).pack(side=tk.LEFT, padx=5)
+        ttkb.Button(btn_frame, text="Закрыть", command=self.destroy, bootstyle=SECONDARY).pack(side=tk.LEFT, padx=5)
+
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.refresh()
+
+    def _fill(self, widget: tk.Text, text: str):
+        widget.config(state=tk.NORMAL)
+        widget.delete("1.0", tk.END)
+        widget.insert(tk.END, text)
+        widget.config(state=tk.DISABLED)
+
+    def refresh(self):
+        gen_stats = get_last_generation_stats()
+        self._fill(self.gen_text, gen_stats.format_summary() if gen_stats else "Генерация еще не запускалась.")
+        self._fill(self.ui_text, self.ui_stats.format_summary() if self.ui_stats else "Нет данных.")
+
+    def reset_ui_stats(self):
+        if self.ui_stats:
+            self.ui_stats.reset()
+        self.refresh()
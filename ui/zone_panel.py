@@ -10,12 +10,11 @@ from typing import List, Dict, Optional
 from core.db import Database
 from core.logger import get_logger
 from data_access.zones_repo import search_zones_by_name, get_zone_name, ZONE_NAMES
-from data_access.quests_repo import get_quests_by_zone, get_objectives_for_quest, get_quest_details
-from data_access.npc_repo import get_quest_starter_type 
-from logic.faction_filter import get_faction_mask, filter_quests_by_faction
-from logic.quest_chains import build_quest_chains
+from data_access.quests_repo import get_quest_details
+from logic.zone_catalog import load_zone_catalog
 from logic.session_manager import ZoneSession
-from logic.quest_sorter import sort_quests_with_dependencies
+from logic.quest_graph import get_quest_graph
+from logic.quest_selection import QuestSelection
 from logic.vector_parser import parse_vector3_strings
 from core.models import Hotspot
 from ui.quest_info_dialog import QuestInfoDialog
@@ -34,6 +33,10 @@ class ZonePanel(ttkb.Frame):
         self.quests: List = []
         self.objectives: Dict = {}
         self.check_vars: Dict[str, tk.BooleanVar] = {}
+        self.selection: Optional[QuestSelection] = None
+        self.node_entries: Dict[str, int] = {}  # узел дерева -> ID квеста
+        self.quest_nodes: Dict[int, str] = {}  # ID квеста -> узел дерева
+        self.chain_nodes: Dict[int, str] = {}  # индекс цепочки -> узел дерева
         self._loading = False  # Флаг для предотвращения автосохранения при загрузке
         
         self.create_widgets()
@@ -380,28 +383,28 @@ class ZonePanel(ttkb.Frame):
             notebook.tab(current_tab, text=self.session.zone_name)
         except: pass
 
-        mask = get_faction_mask(self.session.faction)
         try:
-            raw_quests = get_quests_by_zone(self.db, zone_id)
-            valid_quests = []
-            for q in filter_quests_by_faction(raw_quests, mask):
-                # Исключаем квесты, начинающиеся с предметов (пока сложно обрабатывать)
-                if get_quest_starter_type(self.db, q.entry) != 'item':
-                    valid_quests.append(q)
+            # Квесты, цели, типы стартеров и цепочки — из пака зоны (при промахе собирается из БД)
+            catalog = load_zone_catalog(self.db, zone_id, self.session.faction)
+            self.quests = catalog.quests
+            self.objectives = catalog.objectives
             
-            self.quests = valid_quests
-            self.objectives = {q.entry: get_objectives_for_quest(self.db, q.entry) for q in valid_quests}
+            self.selection = QuestSelection(catalog.quests, catalog.chains, get_quest_graph(self.db))
             
-            chains = build_quest_chains(valid_quests)
+            chains = catalog.chain_quests()
             self.tree.delete(*self.tree.get_children())
             self.check_vars.clear()
+            self.node_entries.clear()
+            self.quest_nodes.clear()
+            self.chain_nodes.clear()
             
-            for chain in chains:
+            for idx, chain in enumerate(chains):
                 if len(chain) == 1:
                     self.add_quest_node("", chain[0])
                 else:
                     chain_node = self.tree.insert("", "end", text=f"{chain[0].title} (Цепочка)", values=("☐", "", "", ""), tags=("chain",))
                     self.check_vars[chain_node] = tk.BooleanVar(value=False)
+                    self.chain_nodes[idx] = chain_node
                     for q in chain:
                         self.add_quest_node(chain_node, q)
             self.restore_selection()
@@ -414,6 +417,8 @@ class ZonePanel(ttkb.Frame):
         type_str = ", ".join(set(o.type for o in objs)) if objs else "Talk"
         node = self.tree.insert(parent, "end", text=q.title, values=("☐", q.entry, q.quest_level, type_str))
         self.check_vars[node] = tk.BooleanVar(value=False)
+        self.node_entries[node] = q.entry
+        self.quest_nodes[q.entry] = node
 
     def on_tree_click(self, event):
         item = self.tree.identify_row(event.y)
@@ -425,36 +430,38 @@ class ZonePanel(ttkb.Frame):
         item = self.tree.identify_row(event.y)
         if item: self.toggle_check(item)
 
+    def set_check(self, node, value: bool):
+        self.check_vars[node].set(value)
+        self.tree.set(node, "Check", "☑" if value else "☐")
+
     def toggle_check(self, item):
-        if item in self.check_vars:
-            var = self.check_vars[item]
-            new_val = not var.get()
-            var.set(new_val)
-            self.tree.set(item, "Check", "☑" if new_val else "☐")
-            
-            # Если это цепочка, выделяем все дочерние
-            if self.tree.tag_has("chain", item):
-                for child in self.tree.get_children(item):
-                    if child in self.check_vars:
-                        self.check_vars[child].set(new_val)
-                        self.tree.set(child, "Check", "☑" if new_val else "☐")
-            
-            self.update_session_selection()
+        if item not in self.check_vars or self.selection is None: return
+        new_val = not self.check_vars[item].get()
+        self.set_check(item, new_val)
+        
+        # Если это цепочка, выделяем все дочерние
+        if self.tree.tag_has("chain", item):
+            entries = [self.node_entries[child] for child in self.tree.get_children(item)]
+        else:
+            entries = [self.node_entries[item]]
+        self.apply_selection(entries, new_val)
+        self.update_session_selection()
+
+    def apply_selection(self, entries: List[int], value: bool):
+        """Обновляет модель и только затронутые узлы (квесты и их цепочки)."""
+        for idx in set(self.selection.set_selected(entries, value)):
+            if idx in self.chain_nodes:
+                self.set_check(self.chain_nodes[idx], self.selection.chain_complete(idx))
+        for entry in entries:
+            self.set_check(self.quest_nodes[entry], value)
 
     def update_session_selection(self):
-        selected = []
-        for node, var in self.check_vars.items():
-            if var.get():
-                vals = self.tree.item(node, "values")
-                if vals and vals[1]: selected.append(int(vals[1]))
-        self.session.selected_quest_ids = list(set(selected))
+        # Выбранные квесты хранятся в порядке выполнения
+        self.session.selected_quest_ids = self.selection.ordered_ids()
 
     def restore_selection(self):
-        for node, var in self.check_vars.items():
-            vals = self.tree.item(node, "values")
-            if vals and vals[1] and int(vals[1]) in self.session.selected_quest_ids:
-                var.set(True)
-                self.tree.set(node, "Check", "☑")
+        entries = [e for e in self.session.selected_quest_ids if e in self.quest_nodes]
+        self.apply_selection(entries, True)
 
     def on_right_click(self, event):
         item = self.tree.identify_row(event.y)